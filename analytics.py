@@ -0,0 +1,189 @@
+"""Pace and forecast analytics per goal, computed column-wise with NumPy.
+
+All of a user's entries and archived months come back from one query as flat
+arrays (goal index, day ordinal, value), sorted by goal and date in NumPy; every figure
+below is a segmented reduction over those arrays, so the cost is a handful of
+NumPy passes no matter how many goals or years of history there are.
+"""
+from collections import namedtuple
+from datetime import date
+
+import numpy as np
+from sqlalchemy import select, literal, union_all, Integer
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+from models import db, Goal, ProgressArchive, ProgressEntry
+
+GoalAnalytics = namedtuple('GoalAnalytics', [
+    'goal_id',
+    'remaining',             # units left to reach total_units
+    'days_left',             # days from today through target_date (0 once it has passed)
+    'required_pace',         # units per day needed to finish by target_date; None if impossible
+    'average_7',             # units per calendar day over the last 7 / 30 days
+    'average_30',
+    'projected_date',        # when the goal was or will be completed at the recent pace; None if stalled
+    'on_track',              # projected_date <= target_date
+    'schedule_delta_days',   # days ahead (+) or behind (-) of daily_target since the first entry
+    'current_streak',        # consecutive days with progress, ending today or yesterday
+    'longest_streak',
+])
+
+WINDOWS = (7, 30)
+
+
+class day_number(FunctionElement):
+    """A date column as its proleptic Gregorian ordinal (date.toordinal()), computed in SQL.
+
+    Skips building a datetime.date per row, which dominates loading long histories.
+    """
+    type = Integer()
+    inherit_cache = True
+
+
+@compiles(day_number, 'sqlite')
+def _day_number_sqlite(element, compiler, **kw):
+    return 'CAST(julianday(%s) - 1721424.5 AS INTEGER)' % compiler.process(element.clauses, **kw)
+
+
+@compiles(day_number, 'postgresql')
+def _day_number_postgresql(element, compiler, **kw):
+    return "(%s - DATE '0001-01-01' + 1)" % compiler.process(element.clauses, **kw)
+
+
+def analytics_query(user_id):
+    """(goal_id, day, value, first day) for raw entries and archived months.
+
+    An archived month counts as one entry on its last logged day; its first day
+    is kept for the schedule, and it takes no part in streaks.
+    """
+    raw = (
+        select(ProgressEntry.goal_id, day_number(ProgressEntry.date), ProgressEntry.value,
+               literal(None, Integer))
+        .join(Goal, Goal.id == ProgressEntry.goal_id)
+        .where(Goal.user_id == user_id)
+    )
+    archived = (
+        select(ProgressArchive.goal_id, day_number(ProgressArchive.last_date), ProgressArchive.total,
+               day_number(ProgressArchive.first_date))
+        .join(Goal, Goal.id == ProgressArchive.goal_id)
+        .where(Goal.user_id == user_id)
+    )
+    # A SELECT around the union: the session only routes SELECTs to the replica
+    return select(union_all(raw, archived).subquery())
+
+
+def load_arrays(rows, goal_ids):
+    """(goal index, day ordinal, value, first day ordinal) arrays from analytics_query rows,
+    sorted by goal and day. First days are -1 for raw entries; rows of goals not
+    in goal_ids are skipped.
+    """
+    position = {goal_id: i for i, goal_id in enumerate(goal_ids)}
+    # A goal created after the (cached) report rows were built is left out
+    rows = [r for r in rows if r[0] in position]
+    index = np.fromiter((position[r[0]] for r in rows), dtype=np.int64, count=len(rows))
+    days = np.fromiter((r[1] for r in rows), dtype=np.int64, count=len(rows))
+    values = np.fromiter((r[2] for r in rows), dtype=np.float64, count=len(rows))
+    firsts = np.fromiter((-1 if r[3] is None else r[3] for r in rows), dtype=np.int64, count=len(rows))
+    order = np.lexsort((days, index))
+    return index[order], days[order], values[order], firsts[order]
+
+
+def _streaks(index, days, n_goals, today):
+    """Current and longest run of consecutive days per goal; index must be sorted."""
+    current = np.zeros(n_goals, dtype=np.int64)
+    longest = np.zeros(n_goals, dtype=np.int64)
+    if not len(days):
+        return current, longest
+
+    # A run starts at each goal boundary or gap between days
+    starts = np.ones(len(days), dtype=bool)
+    starts[1:] = (index[1:] != index[:-1]) | (days[1:] - days[:-1] != 1)
+    run_id = np.cumsum(starts) - 1
+    run_length = np.bincount(run_id)
+    run_goal = index[starts]
+    np.maximum.at(longest, run_goal, run_length)
+
+    # The last run of each goal counts as current if it reaches today or yesterday
+    ends = np.ones(len(days), dtype=bool)
+    ends[:-1] = index[:-1] != index[1:]
+    last_goal, last_day, last_run = index[ends], days[ends], run_id[ends]
+    live = last_day >= today - 1
+    current[last_goal[live]] = run_length[last_run[live]]
+    return current, longest
+
+
+def compute(goals, index, days, values, firsts=None, today=None):
+    """GoalAnalytics for report rows `goals`, sorted by id as in load_arrays."""
+    today = (today or date.today()).toordinal()
+    if firsts is None:
+        firsts = np.full(len(days), -1, dtype=np.int64)
+    archived = firsts >= 0
+    n = len(goals)
+    total_units = np.array([g.total_units for g in goals], dtype=np.float64)
+    daily_target = np.array([g.daily_target for g in goals], dtype=np.float64)
+    target_day = np.array([g.target_date.toordinal() for g in goals], dtype=np.int64)
+
+    totals = np.bincount(index, weights=values, minlength=n)
+    remaining = np.maximum(total_units - totals, 0.0)
+    days_left = np.maximum(target_day - today + 1, 0)
+
+    averages = {
+        window: np.bincount(index, weights=np.where(days > today - window, values, 0.0), minlength=n) / window
+        for window in WINDOWS
+    }
+
+    first_day = np.full(n, today, dtype=np.int64)
+    has_entries = np.bincount(index, minlength=n) > 0
+    if len(days):
+        np.minimum.at(first_day, index, np.where(archived, firsts, days))
+    elapsed = np.maximum(today - first_day + 1, 1)
+
+    # Pace for the forecast: last 30 days, else the lifetime average since the first entry
+    pace = np.where(averages[30] > 0, averages[30], np.where(has_entries, totals / elapsed, 0.0))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        days_to_finish = np.ceil(remaining / pace)
+        required_pace = np.where(days_left > 0, remaining / days_left, np.nan)
+        expected = np.minimum(daily_target * elapsed, total_units)
+        schedule_delta = np.where(daily_target > 0, (totals - expected) / daily_target, 0.0)
+    projected = np.where(np.isfinite(days_to_finish) & (days_to_finish <= date.max.toordinal() - today),
+                         today + days_to_finish, -1).astype(np.int64)
+
+    # Completed goals: the day the running total first reached total_units
+    if len(days):
+        running = np.cumsum(values)
+        goal_start = np.searchsorted(index, np.arange(n))
+        offset = np.concatenate(([0.0], running))[goal_start]
+        reached = np.flatnonzero((running - offset[index]) >= total_units[index])
+        done_goals, first_hit = np.unique(index[reached], return_index=True)
+        done = remaining[done_goals] == 0
+        projected[done_goals[done]] = days[reached[first_hit[done]]]
+
+    active = (values > 0) & ~archived
+    current, longest = _streaks(index[active], days[active], n, today)
+
+    return {
+        goal.id: GoalAnalytics(
+            goal_id=goal.id,
+            remaining=float(remaining[i]),
+            days_left=int(days_left[i]),
+            required_pace=None if np.isnan(required_pace[i]) else float(required_pace[i]),
+            average_7=float(averages[7][i]),
+            average_30=float(averages[30][i]),
+            projected_date=date.fromordinal(int(projected[i])) if projected[i] > 0 else None,
+            on_track=bool(0 < projected[i] <= target_day[i]),
+            schedule_delta_days=round(float(schedule_delta[i]), 1) if has_entries[i] else 0.0,
+            current_streak=int(current[i]),
+            longest_streak=int(longest[i]),
+        )
+        for i, goal in enumerate(goals)
+    }
+
+
+def build_analytics(user_id, goals, today=None):
+    """Analytics for the report rows of user_id, keyed by goal id."""
+    if not goals:
+        return {}
+    goals = sorted(goals, key=lambda g: g.id)
+    rows = db.session.execute(analytics_query(user_id))
+    return compute(goals, *load_arrays(rows, [g.id for g in goals]), today=today)
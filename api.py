@@ -0,0 +1,267 @@
+"""Versioned JSON API (/api/v1) with bearer-token auth.
+
+The same endpoints are served synchronously by the Flask blueprint below and
+asynchronously by asgi.py; both build their SQL from the same query functions
+and serialize with the helpers in this module.
+"""
+from datetime import datetime
+from functools import wraps
+
+from flask import Blueprint, current_app, g, jsonify, request
+from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
+from sqlalchemy import select
+
+from models import db, Goal, ProgressEntry, User
+from passwords import password_stamp
+from progress import record_batch, batch_too_large_message, MAX_BATCH_SIZE
+from ratelimit import rate_limiter
+from sync import apply_changes, change_queries, changes_page, parse_cursor, PAGE_SIZE as SYNC_PAGE_SIZE, \
+    MAX_PAGE_SIZE as SYNC_MAX_PAGE_SIZE
+
+TOKEN_SALT = 'api-token'
+DEFAULT_TOKEN_MAX_AGE = 30 * 24 * 3600
+PAGE_SIZE = 1000
+MAX_PAGE_SIZE = 5000
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400, headers=None):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+        self.headers = headers or {}
+
+
+# Tokens
+def _serializer(secret_key):
+    return URLSafeTimedSerializer(secret_key, salt=TOKEN_SALT)
+
+
+def make_token(secret_key, user_id, password_hash):
+    return _serializer(secret_key).dumps({'uid': user_id, 'pw': password_stamp(password_hash)})
+
+
+def read_token(secret_key, token, max_age):
+    """Return (user_id, stamp) from a token, or raise ApiError(401)."""
+    try:
+        data = _serializer(secret_key).loads(token, max_age=max_age)
+    except SignatureExpired:
+        raise ApiError('توکن منقضی شده است.', 401) from None
+    except BadSignature:
+        raise ApiError('توکن نامعتبر است.', 401) from None
+    return data['uid'], data['pw']
+
+
+def bearer_token(authorization):
+    if authorization and authorization.startswith('Bearer '):
+        return authorization[len('Bearer '):].strip()
+    raise ApiError('توکن ارسال نشده است.', 401)
+
+
+def check_rate_limit(limiter, ip, email):
+    wait = limiter.hit(ip=ip, account=email)
+    if wait is not None:
+        raise ApiError('تعداد تلاش‌ها بیش از حد مجاز است.', 429, {'Retry-After': str(wait)})
+
+
+def password_hash_query(user_id):
+    return select(User.password_hash).where(User.id == user_id, User.deleted_at.is_(None))
+
+
+def user_by_email_query(email):
+    return select(User).where(User.email == email, User.deleted_at.is_(None))
+
+
+# Queries and serialization shared with asgi.py
+def goals_query(user_id):
+    return (
+        select(Goal.id, Goal.title, Goal.total_units, Goal.daily_target, Goal.target_date)
+        .where(Goal.user_id == user_id)
+        .order_by(Goal.id)
+    )
+
+
+def progress_query(user_id, goal_id, start=None, end=None, after=None, limit=PAGE_SIZE):
+    """One page of a goal's entries in date order; `after` is the previous page's last date."""
+    query = (
+        select(ProgressEntry.date, ProgressEntry.value)
+        .join(Goal, Goal.id == ProgressEntry.goal_id)
+        .where(ProgressEntry.goal_id == goal_id, Goal.user_id == user_id)
+    )
+    if start is not None:
+        query = query.where(ProgressEntry.date >= start)
+    if end is not None:
+        query = query.where(ProgressEntry.date <= end)
+    if after is not None:
+        query = query.where(ProgressEntry.date > after)
+    return query.order_by(ProgressEntry.date).limit(limit)
+
+
+def goal_json(row):
+    return {
+        'id': row.id,
+        'title': row.title,
+        'total_units': row.total_units,
+        'daily_target': row.daily_target,
+        'target_date': row.target_date.isoformat(),
+    }
+
+
+def report_json(report_row):
+    data = goal_json(report_row)
+    last = report_row.last_entry
+    data.update(
+        total_progress=report_row.total_progress,
+        active_days=report_row.active_days,
+        average_daily_progress=report_row.average_daily_progress,
+        completion_percentage=report_row.completion_percentage,
+        last_entry={'date': last.date.isoformat(), 'value': last.value} if last else None,
+    )
+    return data
+
+
+def progress_page_json(rows, limit):
+    entries = [{'date': r.date.isoformat(), 'value': r.value} for r in rows]
+    return {
+        'entries': entries,
+        'next': entries[-1]['date'] if len(entries) == limit else None,
+    }
+
+
+def parse_progress_args(args):
+    """Validate ?goal_id=&from=&to=&after=&limit= from any mapping of query args."""
+    def day(name):
+        raw = args.get(name)
+        if not raw:
+            return None
+        try:
+            return datetime.strptime(raw, '%Y-%m-%d').date()
+        except ValueError:
+            raise ApiError(f'پارامتر {name} نامعتبر است.') from None
+
+    try:
+        goal_id = int(args.get('goal_id', ''))
+        limit = min(int(args.get('limit', PAGE_SIZE)), MAX_PAGE_SIZE)
+    except ValueError:
+        raise ApiError('پارامترهای goal_id یا limit نامعتبر هستند.') from None
+    if limit < 1:
+        raise ApiError('پارامتر limit نامعتبر است.')
+    return {'goal_id': goal_id, 'start': day('from'), 'end': day('to'), 'after': day('after'), 'limit': limit}
+
+
+def parse_entries(payload):
+    entries = payload.get('entries') if isinstance(payload, dict) else None
+    if not isinstance(entries, list) or not all(isinstance(e, dict) for e in entries):
+        raise ApiError('فیلد entries باید فهرستی از اشیاء باشد.')
+    if len(entries) > MAX_BATCH_SIZE:
+        raise ApiError(batch_too_large_message(), 413)
+    return [(e.get('goal_id'), e.get('date'), e.get('value')) for e in entries]
+
+
+def parse_sync_args(args):
+    """Validate ?since=&limit= for a sync pull; returns (cursor, limit)."""
+    try:
+        cursor = parse_cursor(args.get('since'))
+        limit = min(int(args.get('limit', SYNC_PAGE_SIZE)), SYNC_MAX_PAGE_SIZE)
+    except ValueError:
+        raise ApiError('پارامترهای since یا limit نامعتبر هستند.') from None
+    if limit < 1:
+        raise ApiError('پارامتر limit نامعتبر است.')
+    return cursor, limit
+
+
+def parse_changes(payload):
+    changes = payload.get('changes') if isinstance(payload, dict) else None
+    if not isinstance(changes, list) or not all(isinstance(c, dict) for c in changes):
+        raise ApiError('فیلد changes باید فهرستی از اشیاء باشد.')
+    return changes
+
+
+def parse_credentials(payload):
+    if not isinstance(payload, dict) or not payload.get('email') or not payload.get('password'):
+        raise ApiError('ایمیل و رمز عبور الزامی است.')
+    return payload['email'], payload['password']
+
+
+# Flask blueprint
+api_v1 = Blueprint('api_v1', __name__, url_prefix='/api/v1')
+
+
+@api_v1.errorhandler(ApiError)
+def handle_api_error(error):
+    return jsonify({'error': error.message}), error.status, error.headers
+
+
+def token_required(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        config = current_app.config
+        user_id, stamp = read_token(config['SECRET_KEY'], bearer_token(request.headers.get('Authorization')),
+                                    config.get('API_TOKEN_MAX_AGE', DEFAULT_TOKEN_MAX_AGE))
+        password_hash = db.session.scalar(password_hash_query(user_id))
+        if password_hash is None or password_stamp(password_hash) != stamp:
+            raise ApiError('توکن نامعتبر است.', 401)
+        g.api_user_id = user_id
+        return view(*args, **kwargs)
+    return wrapper
+
+
+@api_v1.route('/token', methods=['POST'])
+def issue_token():
+    email, password = parse_credentials(request.get_json(silent=True))
+    check_rate_limit(rate_limiter, request.remote_addr, email)
+    user = db.session.scalars(user_by_email_query(email)).first()
+    if user is None or not user.check_password(password):
+        raise ApiError('ایمیل یا رمز عبور اشتباه است.', 401)
+    if user.rehash_password(password):
+        db.session.commit()
+    max_age = current_app.config.get('API_TOKEN_MAX_AGE', DEFAULT_TOKEN_MAX_AGE)
+    return jsonify({
+        'token': make_token(current_app.config['SECRET_KEY'], user.id, user.password_hash),
+        'expires_in': max_age,
+    })
+
+
+@api_v1.route('/goals')
+@token_required
+def list_goals():
+    return jsonify({'goals': [goal_json(r) for r in db.session.execute(goals_query(g.api_user_id))]})
+
+
+@api_v1.route('/report')
+@token_required
+def report():
+    from reports import report_query, make_report_row  # NumPy; loaded on first use
+    rows = db.session.execute(report_query(g.api_user_id))
+    return jsonify({'goals': [report_json(make_report_row(r)) for r in rows]})
+
+
+@api_v1.route('/progress')
+@token_required
+def list_progress():
+    params = parse_progress_args(request.args)
+    rows = db.session.execute(progress_query(g.api_user_id, **params)).all()
+    return jsonify(progress_page_json(rows, params['limit']))
+
+
+@api_v1.route('/progress', methods=['POST'])
+@token_required
+def submit_progress():
+    results = record_batch(g.api_user_id, parse_entries(request.get_json(silent=True)))
+    return jsonify({'results': results})
+
+
+@api_v1.route('/sync')
+@token_required
+def sync_pull():
+    cursor, limit = parse_sync_args(request.args)
+    results = [db.session.execute(q).all() for q in change_queries(g.api_user_id, cursor, limit)]
+    return jsonify(changes_page(results, cursor, limit))
+
+
+@api_v1.route('/sync', methods=['POST'])
+@token_required
+def sync_push():
+    results = apply_changes(db.session, g.api_user_id, parse_changes(request.get_json(silent=True)))
+    db.session.commit()
+    return jsonify({'results': results})
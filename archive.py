@@ -0,0 +1,109 @@
+"""Compaction of old progress entries into per-goal monthly summaries.
+
+Entries dated before a cutoff month are folded into progress_archive (one row
+per goal and month: total, entry count, first/last day, largest value) and
+deleted from progress_entry, so the raw table and its indexes only hold the
+recent working set. goal_stats already counts them and is left as is; stats,
+reports, analytics, charts and exports read the summaries alongside the raw
+rows. An archived month is closed: progress.record_progress refuses new
+values for it.
+"""
+from datetime import date, timedelta
+
+from sqlalchemy import select, delete, exists, func, Date
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+from models import db, insert_for, claim_version, Goal, GoalStats, ProgressArchive, ProgressEntry
+from stats import goal_id_batches
+
+
+class month_start(FunctionElement):
+    """First day of a date column's month, computed in SQL."""
+    type = Date()
+    inherit_cache = True
+
+
+@compiles(month_start, 'sqlite')
+def _month_start_sqlite(element, compiler, **kw):
+    return "date(%s, 'start of month')" % compiler.process(element.clauses, **kw)
+
+
+@compiles(month_start, 'postgresql')
+def _month_start_postgresql(element, compiler, **kw):
+    return "CAST(date_trunc('month', %s) AS DATE)" % compiler.process(element.clauses, **kw)
+
+
+def archive_cutoff(after_days, today=None):
+    """First day of the month holding today - after_days; None when archiving is off."""
+    if not after_days:
+        return None
+    day = (today or date.today()) - timedelta(days=after_days)
+    return day.replace(day=1)
+
+
+def summary_query(goal_ids, before):
+    month = month_start(ProgressEntry.date)
+    return (
+        select(
+            ProgressEntry.goal_id, month,
+            func.sum(ProgressEntry.value), func.count(ProgressEntry.id),
+            func.min(ProgressEntry.date), func.max(ProgressEntry.date), func.max(ProgressEntry.value),
+        )
+        .where(ProgressEntry.goal_id.in_(goal_ids), ProgressEntry.date < before)
+        .group_by(ProgressEntry.goal_id, month)
+    )
+
+
+def _merge_stmt():
+    """Upsert into progress_archive that adds to a month already there."""
+    pa = ProgressArchive.__table__
+    stmt = insert_for(pa)
+    # SQLite's two-argument min()/max() are scalar, like least()/greatest()
+    least, greatest = (func.min, func.max) if db.session.get_bind().dialect.name == 'sqlite' \
+        else (func.least, func.greatest)
+    return stmt.on_conflict_do_update(
+        index_elements=[pa.c.goal_id, pa.c.month],
+        set_={
+            'total': pa.c.total + stmt.excluded.total,
+            'entry_count': pa.c.entry_count + stmt.excluded.entry_count,
+            'first_date': least(pa.c.first_date, stmt.excluded.first_date),
+            'last_date': greatest(pa.c.last_date, stmt.excluded.last_date),
+            'max_value': greatest(pa.c.max_value, stmt.excluded.max_value),
+        },
+    )
+
+
+def owners_query(goal_ids, before):
+    """Users owning a goal in goal_ids with entries to archive, in id order."""
+    due = exists().where(ProgressEntry.goal_id == Goal.id, ProgressEntry.date < before)
+    return select(Goal.user_id).distinct().where(Goal.id.in_(goal_ids), due).order_by(Goal.user_id)
+
+
+def compact(before, batch_size=500, goal_ids=None):
+    """Archive every entry dated before `before`, one transaction per batch of goals.
+
+    Returns (months, entries): summary rows written and raw rows removed.
+    """
+    months = entries = 0
+    for batch in goal_id_batches(batch_size, goal_ids):
+        # Charts and sync read the months differently once archived: each owner
+        # takes a new data version, before goal_stats as every writer does
+        for user_id in db.session.scalars(owners_query(batch, before)).all():
+            claim_version(user_id)
+        # Writers upsert goal_stats before the entry, so holding these rows keeps
+        # new entries from landing between the copy and the delete (PostgreSQL)
+        db.session.execute(select(GoalStats.goal_id).where(GoalStats.goal_id.in_(batch)).with_for_update())
+        rows = db.session.execute(summary_query(batch, before)).all()
+        if rows:
+            db.session.execute(_merge_stmt(), [
+                dict(goal_id=r[0], month=r[1], total=r[2], entry_count=r[3],
+                     first_date=r[4], last_date=r[5], max_value=r[6])
+                for r in rows
+            ])
+            entries += db.session.execute(
+                delete(ProgressEntry).where(ProgressEntry.goal_id.in_(batch), ProgressEntry.date < before)
+            ).rowcount
+            months += len(rows)
+        db.session.commit()
+    return months, entries
@@ -0,0 +1,240 @@
+"""The /api/v1 JSON API as a plain ASGI app on an async SQLAlchemy engine.
+
+Serves the same endpoints as the api_v1 blueprint, reusing its query builders,
+serializers and the models' tables, so slow mobile clients wait on the event
+loop instead of pinning gunicorn sync workers:
+
+    uvicorn asgi:app --workers 4
+
+DATABASE_URL is mapped to the async driver (aiosqlite / asyncpg).
+"""
+import asyncio
+import json
+import os
+from urllib.parse import parse_qsl
+
+from dotenv import load_dotenv
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy import update
+
+from api import (
+    ApiError, DEFAULT_TOKEN_MAX_AGE, bearer_token, check_rate_limit, goal_json, goals_query, make_token,
+    parse_changes, parse_credentials, parse_entries, parse_progress_args, parse_sync_args,
+    password_hash_query, password_stamp, progress_page_json, progress_query, read_token, report_json,
+    user_by_email_query,
+)
+from cache import default_cache_path
+from database import engine_options, install_sqlite_pragmas, normalize_database_url, sqlite_pragmas
+from models import claim_version_stmt, User
+from passwords import password_hasher
+from progress import ArchivedDateError, batch_goal_ids, owned_goals_query, upsert_statements, validate_item
+from ratelimit import RateLimiter
+from reports import make_report_row, report_query
+from sync import apply_changes, change_queries, changes_page
+
+ASYNC_DRIVERS = {'sqlite': 'sqlite+aiosqlite', 'postgresql': 'postgresql+asyncpg'}
+
+
+def async_database_url(database_url):
+    url = make_url(normalize_database_url(database_url))
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    if driver is None:
+        raise ValueError(f'No async driver configured for {url.get_backend_name()}')
+    return url.set(drivername=driver)
+
+
+def async_engine_options(database_url):
+    """engine_options() translated for the async engine and its drivers."""
+    options = engine_options(database_url)
+    options.pop('poolclass', None)
+    connect_args = options.pop('connect_args', {})
+    if 'options' in connect_args:
+        # asyncpg takes server settings instead of a libpq options string
+        timeout = connect_args['options'].split('statement_timeout=')[-1]
+        options['connect_args'] = {'server_settings': {'statement_timeout': timeout}}
+    elif connect_args:
+        options['connect_args'] = connect_args
+    return options
+
+
+class Request:
+    def __init__(self, scope, body):
+        self.method = scope['method']
+        self.client = (scope.get('client') or (None,))[0]
+        self.path = scope['path']
+        self.headers = {k.decode('latin-1').lower(): v.decode('latin-1') for k, v in scope['headers']}
+        self.args = dict(parse_qsl(scope.get('query_string', b'').decode('latin-1')))
+        self.body = body
+
+    def json(self):
+        try:
+            return json.loads(self.body or b'null')
+        except ValueError:
+            raise ApiError('بدنه درخواست JSON معتبر نیست.') from None
+
+
+class ApiApp:
+    def __init__(self, database_url=None, secret_key=None, token_max_age=None):
+        database_url = database_url or os.environ.get('DATABASE_URL')
+        self.engine = create_async_engine(async_database_url(database_url), **async_engine_options(database_url))
+        install_sqlite_pragmas(self.engine.sync_engine, sqlite_pragmas())
+        self.dialect = self.engine.dialect.name
+        self.sessions = async_sessionmaker(self.engine, expire_on_commit=False)
+        self.secret_key = secret_key or os.environ.get('SECRET_KEY', 'fallback-secret')
+        self.token_max_age = token_max_age or int(os.environ.get('API_TOKEN_MAX_AGE', DEFAULT_TOKEN_MAX_AGE))
+
+        password_hasher.configure(os.environ)
+        self.rate_limiter = RateLimiter()
+        self.rate_limiter.configure({
+            'RATELIMIT_BACKEND': os.environ.get('RATELIMIT_BACKEND', 'sqlite'),
+            'RATELIMIT_PATH': os.environ.get('RATELIMIT_PATH', os.environ.get('CACHE_PATH', default_cache_path())),
+            'RATELIMIT_IP': os.environ.get('RATELIMIT_IP'),
+            'RATELIMIT_ACCOUNT': os.environ.get('RATELIMIT_ACCOUNT'),
+        })
+
+        self.routes = {
+            ('POST', '/api/v1/token'): self.issue_token,
+            ('GET', '/api/v1/goals'): self.list_goals,
+            ('GET', '/api/v1/report'): self.report,
+            ('GET', '/api/v1/progress'): self.list_progress,
+            ('POST', '/api/v1/progress'): self.submit_progress,
+            ('GET', '/api/v1/sync'): self.sync_pull,
+            ('POST', '/api/v1/sync'): self.sync_push,
+        }
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+
+        handler = self.routes.get((scope['method'], scope['path']))
+        headers = {}
+        if handler is None:
+            allowed = any(path == scope['path'] for _, path in self.routes)
+            status, payload = (405, {'error': 'Method not allowed'}) if allowed else (404, {'error': 'Not found'})
+        else:
+            request = Request(scope, await self._read_body(receive))
+            try:
+                status, payload = await handler(request)
+            except ApiError as e:
+                status, payload, headers = e.status, {'error': e.message}, e.headers
+
+        body = json.dumps(payload, ensure_ascii=False).encode()
+        await send({'type': 'http.response.start', 'status': status, 'headers': [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode()),
+        ] + [(k.lower().encode(), v.encode()) for k, v in headers.items()]})
+        await send({'type': 'http.response.body', 'body': body})
+
+    async def _read_body(self, receive):
+        chunks = []
+        while True:
+            message = await receive()
+            chunks.append(message.get('body', b''))
+            if not message.get('more_body'):
+                return b''.join(chunks)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.engine.dispose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _authenticate(self, session, request):
+        user_id, stamp = read_token(self.secret_key, bearer_token(request.headers.get('authorization')),
+                                    self.token_max_age)
+        password_hash = await session.scalar(password_hash_query(user_id))
+        if password_hash is None or password_stamp(password_hash) != stamp:
+            raise ApiError('توکن نامعتبر است.', 401)
+        return user_id
+
+    # Handlers
+    async def issue_token(self, request):
+        email, password = parse_credentials(request.json())
+        check_rate_limit(self.rate_limiter, request.client, email)
+        async with self.sessions() as session:
+            user = (await session.scalars(user_by_email_query(email))).first()
+        # Password hashing is CPU-bound; keep it off the event loop
+        if user is None or not await asyncio.to_thread(password_hasher.verify, user.password_hash, password):
+            raise ApiError('ایمیل یا رمز عبور اشتباه است.', 401)
+        password_hash = user.password_hash
+        if password_hasher.needs_rehash(password_hash):
+            password_hash = await asyncio.to_thread(password_hasher.rehash, password)
+            async with self.sessions() as session:
+                await session.execute(update(User).where(User.id == user.id).values(password_hash=password_hash))
+                await session.commit()
+        return 200, {'token': make_token(self.secret_key, user.id, password_hash),
+                     'expires_in': self.token_max_age}
+
+    async def list_goals(self, request):
+        async with self.sessions() as session:
+            user_id = await self._authenticate(session, request)
+            rows = (await session.execute(goals_query(user_id))).all()
+        return 200, {'goals': [goal_json(r) for r in rows]}
+
+    async def report(self, request):
+        async with self.sessions() as session:
+            user_id = await self._authenticate(session, request)
+            rows = (await session.execute(report_query(user_id))).all()
+        return 200, {'goals': [report_json(make_report_row(r)) for r in rows]}
+
+    async def list_progress(self, request):
+        params = parse_progress_args(request.args)
+        async with self.sessions() as session:
+            user_id = await self._authenticate(session, request)
+            rows = (await session.execute(progress_query(user_id, **params))).all()
+        return 200, progress_page_json(rows, params['limit'])
+
+    async def submit_progress(self, request):
+        items = parse_entries(request.json())
+        async with self.sessions() as session:
+            user_id = await self._authenticate(session, request)
+            goal_ids = batch_goal_ids(items)
+            owned = set(await session.scalars(owned_goals_query(user_id, goal_ids))) if goal_ids else set()
+
+            results = []
+            version = None
+            for goal_id, date_str, value_str in items:
+                result, entry = validate_item(goal_id, date_str, value_str, owned)
+                if entry is not None:
+                    if version is None:
+                        version = (await session.execute(claim_version_stmt(user_id))).scalar_one()
+                    rollup_lock, rollup_upsert, entry_upsert = upsert_statements(
+                        goal_id, *entry, version, dialect=self.dialect)
+                    await session.execute(rollup_lock)
+                    row = (await session.execute(rollup_upsert)).first()
+                    if row is None:
+                        result.update(status='error', error=str(ArchivedDateError()))
+                    else:
+                        await session.execute(entry_upsert)
+                        result.update(status='updated' if row[0] is not None else 'created', value=entry[1])
+                results.append(result)
+            await session.commit()
+        return 200, {'results': results}
+
+    async def sync_pull(self, request):
+        cursor, limit = parse_sync_args(request.args)
+        async with self.sessions() as session:
+            user_id = await self._authenticate(session, request)
+            results = [(await session.execute(q)).all() for q in change_queries(user_id, cursor, limit)]
+        return 200, changes_page(results, cursor, limit)
+
+    async def sync_push(self, request):
+        changes = parse_changes(request.json())
+        async with self.sessions() as session:
+            user_id = await self._authenticate(session, request)
+            # The write path is shared with the Flask app; run it on the session's sync facade
+            results = await session.run_sync(apply_changes, user_id, changes)
+            await session.commit()
+        return 200, {'results': results}
+
+
+load_dotenv()
+app = ApiApp()
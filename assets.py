@@ -0,0 +1,202 @@
+"""Fingerprinted, precompressed static assets.
+
+`flask build-assets` copies every file under static/ to static/dist/ with a
+content hash in its name (style.css -> style.1a2b3c4d5e.css), rewrites url()
+references inside stylesheets to the hashed names, writes .gz (and .br when
+the brotli package is installed) next to each compressible file, and records
+the mapping in static/dist/manifest.json.
+
+Templates call asset_url('style.css') instead of url_for('static', ...): it
+returns /assets/<hashed name> when the file is in the manifest and the plain
+static URL otherwise, so the app works before the first build. Hashed files
+never change, so they are served with a year-long immutable Cache-Control, and
+the precompressed variant the client accepts is sent as is.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import re
+import shutil
+
+from flask import abort, request, send_file, url_for
+
+try:
+    import brotli
+except ImportError:  # optional; only .gz variants are built without it
+    brotli = None
+
+DIST_DIR = 'dist'
+MANIFEST = 'manifest.json'
+HASH_LENGTH = 10
+COMPRESSIBLE = {'.css', '.js', '.svg', '.json', '.txt', '.ttf', '.eot', '.otf', '.map'}
+# (Content-Encoding, file suffix), in order of preference
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+CHARTJS_VERSION = '4.4.1'
+CHARTJS_URL = f'https://cdn.jsdelivr.net/npm/chart.js@{CHARTJS_VERSION}/dist/chart.umd.js'
+CHARTJS_PATH = 'vendor/chart.umd.js'
+
+CSS_URL = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""")
+
+
+def hashed_name(path, data):
+    root, ext = posixpath.splitext(path)
+    return f'{root}.{hashlib.sha256(data).hexdigest()[:HASH_LENGTH]}{ext}'
+
+
+def rewrite_css(path, text, manifest):
+    """Point relative url()s in the stylesheet at path to their hashed names."""
+    base = posixpath.dirname(path)
+
+    def replace(match):
+        quote, ref = match.groups()
+        if re.match(r'^([a-z]+:|/|#)', ref):
+            return match.group(0)
+        # Keep the ?#iefix style suffixes old IE font declarations rely on
+        target, suffix = re.match(r'([^?#]*)(.*)', ref.strip()).groups()
+        hashed = manifest.get(posixpath.normpath(posixpath.join(base, target)))
+        if hashed is None:
+            return match.group(0)
+        return f'url({quote}{posixpath.relpath(hashed, base or ".")}{suffix}{quote})'
+
+    return CSS_URL.sub(replace, text)
+
+
+def _source_files(static_dir):
+    for root, dirs, files in os.walk(static_dir):
+        rel_root = os.path.relpath(root, static_dir)
+        if rel_root == DIST_DIR or rel_root.startswith(DIST_DIR + os.sep):
+            dirs[:] = []
+            continue
+        dirs.sort()
+        for name in sorted(files):
+            if not name.startswith('.'):
+                yield posixpath.normpath(posixpath.join(rel_root.replace(os.sep, '/'), name))
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + '.tmp', 'wb') as f:
+        f.write(data)
+    os.replace(path + '.tmp', path)
+
+
+def _compress(path, data):
+    """Write the .gz/.br variants that are smaller than data; returns the encodings written."""
+    written = []
+    variants = [('gzip', '.gz', lambda: gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.insert(0, ('br', '.br', lambda: brotli.compress(data, quality=11)))
+    for encoding, suffix, compress in variants:
+        packed = compress()
+        if len(packed) < len(data):
+            _write(path + suffix, packed)
+            written.append(encoding)
+    return written
+
+
+def build(static_dir):
+    """Fingerprint and compress everything under static_dir into static_dir/dist.
+
+    Returns the manifest: {logical path: {'path': hashed path, 'encodings': [...]}}.
+    """
+    out_dir = os.path.join(static_dir, DIST_DIR)
+    if os.path.isdir(out_dir):
+        shutil.rmtree(out_dir)
+
+    sources = list(_source_files(static_dir))
+    # Stylesheets last, so the files they reference already have hashed names
+    sources.sort(key=lambda path: path.endswith('.css'))
+    names, manifest = {}, {}
+    for path in sources:
+        with open(os.path.join(static_dir, path), 'rb') as f:
+            data = f.read()
+        if path.endswith('.css'):
+            data = rewrite_css(path, data.decode('utf-8'), names).encode('utf-8')
+        names[path] = hashed_name(path, data)
+        target = os.path.join(out_dir, names[path])
+        _write(target, data)
+        encodings = _compress(target, data) if posixpath.splitext(path)[1] in COMPRESSIBLE else []
+        manifest[path] = {'path': names[path], 'encodings': encodings}
+
+    with open(os.path.join(out_dir, MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    return manifest
+
+
+def vendor_chartjs(static_dir, url=CHARTJS_URL, timeout=30):
+    """Download the pinned Chart.js build into static/vendor; returns its path and sha256."""
+    import urllib.request
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        data = response.read()
+    if f'Chart.js v{CHARTJS_VERSION}'.encode() not in data[:200]:
+        raise ValueError(f'{url} is not Chart.js {CHARTJS_VERSION}')
+    path = os.path.join(static_dir, CHARTJS_PATH)
+    _write(path, data)
+    return path, hashlib.sha256(data).hexdigest()
+
+
+class Assets:
+    def __init__(self, app=None):
+        self.manifest = {}
+        self.files = {}
+        self.dist_dir = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.dist_dir = os.path.join(app.static_folder, DIST_DIR)
+        self.load()
+        app.add_url_rule('/assets/<path:filename>', 'asset', self.send)
+        app.add_template_global(self.url, 'asset_url')
+        app.add_template_global(self.built, 'asset_built')
+        app.add_template_global(CHARTJS_URL, 'chartjs_cdn_url')
+        app.extensions['assets'] = self
+
+    def load(self):
+        """(Re)read the manifest written by build(); an empty one if there is none."""
+        try:
+            with open(os.path.join(self.dist_dir, MANIFEST), encoding='utf-8') as f:
+                self.manifest = json.load(f)
+        except FileNotFoundError:
+            self.manifest = {}
+        self.files = {entry['path']: entry for entry in self.manifest.values()}
+
+    def built(self, filename):
+        """Whether filename is in the manifest (so asset_url points at a fingerprinted copy)."""
+        return filename in self.manifest
+
+    def url(self, filename):
+        """url_for('static', filename=...) that prefers the fingerprinted copy."""
+        entry = self.manifest.get(filename)
+        if entry is None:
+            return url_for('static', filename=filename)
+        return url_for('asset', filename=entry['path'])
+
+    def send(self, filename):
+        # Only names from the manifest are served, so no path ever reaches the disk unchecked
+        entry = self.files.get(filename)
+        if entry is None:
+            abort(404)
+        path = os.path.join(self.dist_dir, filename)
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        for encoding, suffix in ENCODINGS:
+            if encoding in entry['encodings'] and request.accept_encodings[encoding]:
+                # Named after the asset itself, not the .gz/.br file on disk
+                response = send_file(path + suffix, mimetype=mimetype, conditional=True,
+                                     download_name=posixpath.basename(filename))
+                response.headers['Content-Encoding'] = encoding
+                break
+        else:
+            response = send_file(path, mimetype=mimetype, conditional=True)
+        if entry['encodings']:
+            response.vary.add('Accept-Encoding')
+        response.headers['Cache-Control'] = IMMUTABLE
+        return response
+
+
+assets = Assets()
@@ -0,0 +1,48 @@
+"""Benchmark tooling: synthetic data, in-process route benchmarks and a load driver.
+
+Every entry point takes --database-url and sets DATABASE_URL before the app is
+imported, so run them against a scratch database:
+
+    python -m bench.datagen --database-url sqlite:///bench.db --users 50 --goals 5 --days 1095
+    python -m bench.run     --database-url sqlite:///bench.db --output results.json
+    python -m bench.load    --database-url sqlite:///bench.db --workers 4 --duration 30
+    python -m bench.compare baseline.json results.json
+"""
+import os
+import subprocess
+
+
+def use_database(url):
+    """Point the app at url; must run before `app` is imported."""
+    if url:
+        os.environ['DATABASE_URL'] = url
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def percentiles(samples):
+    """p50/p95/p99/mean/max of a list of seconds, reported in milliseconds."""
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+
+    def pick(q):
+        return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))] * 1000
+
+    return {
+        'count': len(ordered),
+        'p50_ms': round(pick(0.50), 3),
+        'p95_ms': round(pick(0.95), 3),
+        'p99_ms': round(pick(0.99), 3),
+        'mean_ms': round(sum(ordered) / len(ordered) * 1000, 3),
+        'max_ms': round(ordered[-1] * 1000, 3),
+    }
@@ -0,0 +1,204 @@
+"""Throughput of the /api/v1 endpoints: gunicorn `wsgi:app` vs uvicorn `asgi:app`.
+
+--slow-upload-ms makes every POST trickle its body in two halves, the way a
+phone on a poor connection does; a sync worker is held for the whole upload,
+the event loop is not.
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from datetime import date, timedelta
+
+from bench import use_database, git_revision, percentiles
+from bench.datagen import BENCH_PASSWORD
+from bench.load import ROOT, free_port, process_tree_peak_rss_mb
+
+SERVERS = {
+    'gunicorn': lambda port, workers: [sys.executable, '-m', 'gunicorn', '-w', str(workers),
+                                       '-b', f'127.0.0.1:{port}', 'wsgi:app'],
+    'uvicorn': lambda port, workers: [sys.executable, '-m', 'uvicorn', '--workers', str(workers),
+                                      '--host', '127.0.0.1', '--port', str(port), '--log-level', 'warning',
+                                      'asgi:app'],
+}
+MIX = (('goals', 3), ('report', 3), ('progress_page', 2), ('submit_progress', 2))
+
+
+def start_server(name, port, workers, env):
+    process = subprocess.Popen(SERVERS[name](port, workers), cwd=ROOT, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f'{name} exited: {process.stderr.read().decode()[-2000:]}')
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise SystemExit(f'{name} did not start within 30s')
+
+
+class ApiClient:
+    def __init__(self, port, slow_upload=0):
+        self.port = port
+        self.slow_upload = slow_upload
+        self.token = None
+
+    def request(self, method, path, payload=None):
+        conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=30)
+        try:
+            body = json.dumps(payload).encode() if payload is not None else b''
+            conn.putrequest(method, path)
+            conn.putheader('Content-Type', 'application/json')
+            conn.putheader('Content-Length', str(len(body)))
+            if self.token:
+                conn.putheader('Authorization', f'Bearer {self.token}')
+            conn.endheaders()
+            if body and self.slow_upload:
+                half = len(body) // 2
+                conn.send(body[:half])
+                time.sleep(self.slow_upload)
+                conn.send(body[half:])
+            elif body:
+                conn.send(body)
+            response = conn.getresponse()
+            data = response.read()
+            return response.status, data
+        finally:
+            conn.close()
+
+    def login(self, email):
+        status, data = self.request('POST', '/api/v1/token', {'email': email, 'password': BENCH_PASSWORD})
+        if status != 200:
+            raise SystemExit(f'Token request failed with {status}: {data[:200]!r}')
+        self.token = json.loads(data)['token']
+
+
+def worker(port, slow_upload, email, goal_ids, deadline, results, lock, seed):
+    rng = random.Random(seed)
+    client = ApiClient(port, slow_upload)
+    client.login(email)
+    names = [name for name, weight in MIX for _ in range(weight)]
+
+    local = {name: [] for name, _ in MIX}
+    errors = 0
+    while time.time() < deadline:
+        name = rng.choice(names)
+        if name in ('progress_page', 'submit_progress') and not goal_ids:
+            name = 'goals'
+        started = time.perf_counter()
+        if name == 'submit_progress':
+            entries = [{'goal_id': rng.choice(goal_ids),
+                        'date': (date.today() - timedelta(days=rng.randint(0, 60))).isoformat(),
+                        'value': round(rng.uniform(0, 10), 2)} for _ in range(3)]
+            status, _ = client.request('POST', '/api/v1/progress', {'entries': entries})
+        elif name == 'progress_page':
+            status, _ = client.request('GET', f'/api/v1/progress?goal_id={rng.choice(goal_ids)}&limit=100')
+        else:
+            status, _ = client.request('GET', f'/api/v1/{name}')
+        local[name].append(time.perf_counter() - started)
+        if status >= 400:
+            errors += 1
+
+    with lock:
+        for name, samples in local.items():
+            results[name].extend(samples)
+        results['errors'] += errors
+
+
+def run(server_name, users, goals, args, env):
+    port = free_port()
+    server = start_server(server_name, port, args.workers, env)
+    results = {name: [] for name, _ in MIX}
+    results['errors'] = 0
+    lock = threading.Lock()
+    try:
+        started = time.time()
+        deadline = started + args.duration
+        threads = [
+            threading.Thread(target=worker, args=(
+                port, args.slow_upload_ms / 1000, users[i % len(users)].email,
+                goals.get(users[i % len(users)].id, []), deadline, results, lock, i,
+            ))
+            for i in range(args.concurrency)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.time() - started
+        peak_rss = process_tree_peak_rss_mb(server.pid)
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+    total = sum(len(results[name]) for name, _ in MIX)
+    return {
+        'duration_s': round(elapsed, 2),
+        'requests': total,
+        'requests_per_sec': round(total / elapsed, 1) if elapsed else 0,
+        'errors': results['errors'],
+        'peak_rss_mb': peak_rss,
+        'scenarios': {name: percentiles(results[name]) for name, _ in MIX},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--database-url', help='Database seeded by bench.datagen (defaults to $DATABASE_URL).')
+    parser.add_argument('--servers', default='gunicorn,uvicorn', help='Comma-separated: gunicorn, uvicorn.')
+    parser.add_argument('--workers', type=int, default=4, help='Worker processes per server.')
+    parser.add_argument('--concurrency', type=int, default=32, help='Simultaneous clients.')
+    parser.add_argument('--duration', type=float, default=30, help='Seconds of load per server.')
+    parser.add_argument('--slow-upload-ms', type=float, default=0, help='Pause in the middle of each POST body.')
+    parser.add_argument('--output', help='Write results as JSON to this file.')
+    args = parser.parse_args(argv)
+
+    use_database(args.database_url)
+    env = dict(os.environ)
+    # Every simulated client logs in from 127.0.0.1
+    env.setdefault('RATELIMIT_BACKEND', 'none')
+
+    from app import create_app
+    app = create_app()
+    from models import db, Goal, User
+    with app.app_context():
+        dialect = db.engine.dialect.name
+        users = db.session.execute(
+            db.select(User.id, User.email).where(User.email.like('bench%@example.com')).order_by(User.id)
+        ).all()
+        if not users:
+            raise SystemExit('No bench users found; run `python -m bench.datagen` first.')
+        goals = {}
+        for goal_id, user_id in db.session.execute(db.select(Goal.id, Goal.user_id).where(
+                Goal.user_id.in_([u.id for u in users]))):
+            goals.setdefault(user_id, []).append(goal_id)
+
+    output = {
+        'kind': 'api',
+        'revision': git_revision(),
+        'dialect': dialect,
+        'python': platform.python_version(),
+        'workers': args.workers,
+        'concurrency': args.concurrency,
+        'slow_upload_ms': args.slow_upload_ms,
+        'servers': {name: run(name, users, goals, args, env) for name in args.servers.split(',')},
+    }
+    text = json.dumps(output, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    print(text)
+
+
+if __name__ == '__main__':
+    main()
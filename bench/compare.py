@@ -0,0 +1,54 @@
+"""Compare two benchmark JSON files and exit non-zero on regressions."""
+import argparse
+import json
+import sys
+
+METRICS = ('p50_ms', 'p95_ms', 'p99_ms', 'queries_per_request')
+
+
+def compare(baseline, current, threshold=0.10):
+    """Return (rows, regressions) comparing matching scenarios of two results."""
+    rows, regressions = [], []
+    for name, before in baseline.get('scenarios', {}).items():
+        after = current.get('scenarios', {}).get(name)
+        if after is None:
+            continue
+        for metric in METRICS:
+            if metric not in before or metric not in after:
+                continue
+            old, new = before[metric], after[metric]
+            change = (new - old) / old if old else (0.0 if new == old else float('inf'))
+            row = (name, metric, old, new, change)
+            rows.append(row)
+            # Any extra query is a regression; latency gets a noise allowance
+            if (metric == 'queries_per_request' and new > old) or \
+                    (metric != 'queries_per_request' and change > threshold):
+                regressions.append(row)
+    return rows, regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('baseline')
+    parser.add_argument('current')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='Allowed relative latency increase (default 0.10 = 10%%).')
+    args = parser.parse_args(argv)
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+
+    rows, regressions = compare(baseline, current, args.threshold)
+    print(f"{baseline.get('revision')} -> {current.get('revision')} ({current.get('dialect')})")
+    for name, metric, old, new, change in rows:
+        flag = ' !' if (name, metric, old, new, change) in regressions else ''
+        print(f'{name:<16} {metric:<20} {old:>10} -> {new:>10} ({change:+.1%}){flag}')
+    if regressions:
+        print(f'{len(regressions)} regression(s)')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""Seeded synthetic users × goals × daily progress, bulk-inserted in chunks."""
+import argparse
+import random
+import time
+from datetime import date, timedelta
+
+from bench import use_database
+
+BENCH_PASSWORD = 'benchpass123'
+CHUNK_SIZE = 10000
+
+
+def bench_email(n):
+    return f'bench{n}@example.com'
+
+
+def generate(users=10, goals_per_user=5, days=365, seed=42, skip_probability=0.2,
+             end=None, chunk_size=CHUNK_SIZE):
+    """Insert users, goals and roughly days × (1 - skip_probability) entries per goal.
+
+    Must be called inside an app context. Returns counts and elapsed seconds.
+    """
+    from models import db, User, Goal, ProgressEntry
+    from stats import rebuild_stats
+
+    rng = random.Random(seed)
+    end = end or date.today()
+    start = end - timedelta(days=days - 1)
+    started = time.perf_counter()
+
+    # Hashing is deliberately slow; every synthetic user shares one hash
+    template = User(name='bench', email='template@example.com')
+    template.set_password(BENCH_PASSWORD)
+
+    first_user = (db.session.scalar(db.select(db.func.max(User.id))) or 0) + 1
+    db.session.execute(User.__table__.insert(), [
+        {'name': f'Bench User {n}', 'email': bench_email(n), 'password_hash': template.password_hash}
+        for n in range(first_user, first_user + users)
+    ])
+    user_ids = db.session.scalars(
+        db.select(User.id).where(User.id >= first_user).order_by(User.id)
+    ).all()
+
+    goal_rows = []
+    for user_id in user_ids:
+        for g in range(goals_per_user):
+            daily = round(rng.uniform(0.5, 20), 2)
+            goal_rows.append({
+                'title': f'Goal {g + 1}',
+                'daily_target': daily,
+                'total_units': round(daily * days * rng.uniform(0.8, 1.5), 2),
+                'target_date': end + timedelta(days=rng.randint(0, 365)),
+                'user_id': user_id,
+            })
+    db.session.execute(Goal.__table__.insert(), goal_rows)
+    goal_ids = db.session.scalars(
+        db.select(Goal.id).where(Goal.user_id.in_(user_ids)).order_by(Goal.id)
+    ).all()
+    db.session.commit()
+
+    entries = 0
+    chunk = []
+    insert = ProgressEntry.__table__.insert()
+    for goal_id in goal_ids:
+        mean = rng.uniform(0.5, 15)
+        for offset in range(days):
+            if rng.random() < skip_probability:
+                continue
+            chunk.append({
+                'goal_id': goal_id,
+                'date': start + timedelta(days=offset),
+                'value': round(max(0.0, rng.gauss(mean, mean / 3)), 2),
+            })
+            if len(chunk) >= chunk_size:
+                db.session.execute(insert, chunk)
+                db.session.commit()
+                entries += len(chunk)
+                chunk = []
+    if chunk:
+        db.session.execute(insert, chunk)
+        db.session.commit()
+        entries += len(chunk)
+
+    rebuild_stats(goal_ids)
+    return {
+        'users': len(user_ids),
+        'goals': len(goal_ids),
+        'entries': entries,
+        'first_user_id': user_ids[0] if user_ids else None,
+        'seconds': round(time.perf_counter() - started, 3),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--database-url', help='Target database (defaults to $DATABASE_URL).')
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--goals', type=int, default=5, help='Goals per user.')
+    parser.add_argument('--days', type=int, default=365, help='Days of history per goal.')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--create-schema', action='store_true', help='Run db.create_all() first.')
+    args = parser.parse_args(argv)
+
+    use_database(args.database_url)
+    from app import create_app
+    app = create_app()
+    from models import db
+
+    with app.app_context():
+        if args.create_schema:
+            db.create_all()
+        result = generate(users=args.users, goals_per_user=args.goals, days=args.days, seed=args.seed)
+    rate = result['entries'] / result['seconds'] if result['seconds'] else 0
+    print(f"Inserted {result['users']} users, {result['goals']} goals, {result['entries']} entries "
+          f"in {result['seconds']}s ({rate:.0f} entries/sec)")
+
+
+if __name__ == '__main__':
+    main()
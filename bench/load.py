@@ -0,0 +1,192 @@
+"""Concurrent load driver against a local gunicorn serving the app."""
+import argparse
+import http.cookiejar
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import date, timedelta
+
+from bench import use_database, git_revision, percentiles
+from bench.datagen import BENCH_PASSWORD
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Relative weight of each request type in the generated traffic
+MIX = (('index', 5), ('report', 3), ('submit_progress', 2))
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_gunicorn(port, workers, env):
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-w', str(workers), '-b', f'127.0.0.1:{port}', 'wsgi:app'],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f'gunicorn exited: {process.stderr.read().decode()[-2000:]}')
+        try:
+            urllib.request.urlopen(f'http://127.0.0.1:{port}/login', timeout=1)
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise SystemExit('gunicorn did not start within 30s')
+
+
+def process_tree_peak_rss_mb(pid):
+    """Sum of VmHWM over the gunicorn master and its workers (Linux only)."""
+    total_kb = 0
+    pids = [pid]
+    try:
+        with open(f'/proc/{pid}/task/{pid}/children') as f:
+            pids += [int(p) for p in f.read().split()]
+    except OSError:
+        return None
+    for p in pids:
+        try:
+            with open(f'/proc/{p}/status') as f:
+                for line in f:
+                    if line.startswith('VmHWM:'):
+                        total_kb += int(line.split()[1])
+        except OSError:
+            pass
+    return round(total_kb / 1024, 1)
+
+
+class Client:
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()),
+        )
+
+    def request(self, path, data=None):
+        body = urllib.parse.urlencode(data).encode() if data is not None else None
+        try:
+            with self.opener.open(self.base_url + path, data=body, timeout=30) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+
+
+def worker(base_url, email, goal_ids, deadline, results, lock, seed):
+    rng = random.Random(seed)
+    client = Client(base_url)
+    client.request('/login', {'email': email, 'password': BENCH_PASSWORD})
+    names = [name for name, weight in MIX for _ in range(weight)]
+
+    local = {name: [] for name, _ in MIX}
+    errors = 0
+    while time.time() < deadline:
+        name = rng.choice(names)
+        started = time.perf_counter()
+        if name == 'submit_progress' and goal_ids:
+            day = date.today() - timedelta(days=rng.randint(0, 60))
+            status = client.request(f'/submit_progress/{rng.choice(goal_ids)}',
+                                    {'date': day.isoformat(), 'value': round(rng.uniform(0, 10), 2)})
+        else:
+            status = client.request('/' if name == 'index' else '/report')
+        local[name].append(time.perf_counter() - started)
+        if status >= 400:
+            errors += 1
+
+    with lock:
+        for name, samples in local.items():
+            results[name].extend(samples)
+        results['errors'] += errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--database-url', help='Database seeded by bench.datagen (defaults to $DATABASE_URL).')
+    parser.add_argument('--workers', type=int, default=4, help='gunicorn worker processes.')
+    parser.add_argument('--concurrency', type=int, default=16, help='Simultaneous clients.')
+    parser.add_argument('--duration', type=float, default=30, help='Seconds of load.')
+    parser.add_argument('--output', help='Write results as JSON to this file.')
+    args = parser.parse_args(argv)
+
+    use_database(args.database_url)
+    env = dict(os.environ)
+    # Every simulated client logs in from 127.0.0.1
+    env.setdefault('RATELIMIT_BACKEND', 'none')
+
+    from app import create_app
+    app = create_app()
+    from models import db, Goal, User
+    with app.app_context():
+        dialect = db.engine.dialect.name
+        users = db.session.execute(
+            db.select(User.id, User.email).where(User.email.like('bench%@example.com')).order_by(User.id)
+        ).all()
+        if not users:
+            raise SystemExit('No bench users found; run `python -m bench.datagen` first.')
+        goals = {}
+        for goal_id, user_id in db.session.execute(db.select(Goal.id, Goal.user_id).where(
+                Goal.user_id.in_([u.id for u in users]))):
+            goals.setdefault(user_id, []).append(goal_id)
+
+    port = free_port()
+    server = start_gunicorn(port, args.workers, env)
+    base_url = f'http://127.0.0.1:{port}'
+    results = {name: [] for name, _ in MIX}
+    results['errors'] = 0
+    lock = threading.Lock()
+    try:
+        started = time.time()
+        deadline = started + args.duration
+        threads = [
+            threading.Thread(target=worker, args=(
+                base_url, users[i % len(users)].email, goals.get(users[i % len(users)].id, []),
+                deadline, results, lock, i,
+            ))
+            for i in range(args.concurrency)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.time() - started
+        peak_rss = process_tree_peak_rss_mb(server.pid)
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+    total = sum(len(results[name]) for name, _ in MIX)
+    output = {
+        'kind': 'load',
+        'revision': git_revision(),
+        'dialect': dialect,
+        'python': platform.python_version(),
+        'workers': args.workers,
+        'concurrency': args.concurrency,
+        'duration_s': round(elapsed, 2),
+        'requests': total,
+        'requests_per_sec': round(total / elapsed, 1) if elapsed else 0,
+        'errors': results['errors'],
+        'peak_rss_mb': peak_rss,
+        'scenarios': {name: percentiles(results[name]) for name, _ in MIX},
+    }
+    text = json.dumps(output, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""Repeatable in-process benchmarks of the hot routes using the Flask test client."""
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import sys
+import time
+from datetime import date, timedelta
+
+from bench import use_database, git_revision, percentiles
+
+SCENARIOS = ('login', 'index', 'submit_progress', 'report')
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    return round(peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024, 1)
+
+
+class QueryCounter:
+    def __init__(self, engine):
+        from sqlalchemy import event
+        self.count = 0
+        event.listen(engine, 'after_cursor_execute', self._count)
+
+    def _count(self, *args):
+        self.count += 1
+
+
+def run(app, iterations=200, warmup=10, seed=1, user_email=None, password=None):
+    from models import db, Goal, User
+    from bench.datagen import BENCH_PASSWORD
+
+    app.config['WTF_CSRF_ENABLED'] = False
+    rng = random.Random(seed)
+
+    with app.app_context():
+        if user_email is None:
+            user = db.session.scalars(
+                db.select(User).where(User.email.like('bench%@example.com')).order_by(User.id).limit(1)
+            ).first()
+            if user is None:
+                raise SystemExit('No bench users found; run `python -m bench.datagen` first.')
+            user_email = user.email
+        user_id = db.session.scalar(db.select(User.id).where(User.email == user_email))
+        goal_ids = db.session.scalars(db.select(Goal.id).where(Goal.user_id == user_id)).all()
+        counter = QueryCounter(db.engine)
+
+    credentials = {'email': user_email, 'password': password or BENCH_PASSWORD}
+    client = app.test_client()
+    client.post('/login', data=credentials)
+
+    def do_login():
+        fresh = app.test_client()
+        return fresh.post('/login', data=credentials)
+
+    def do_submit():
+        day = date.today() - timedelta(days=rng.randint(0, 60))
+        return client.post(f'/submit_progress/{rng.choice(goal_ids)}',
+                           data={'date': day.isoformat(), 'value': round(rng.uniform(0, 10), 2)})
+
+    requests = {
+        'login': do_login,
+        'index': lambda: client.get('/'),
+        'submit_progress': do_submit,
+        'report': lambda: client.get('/report'),
+    }
+
+    results = {}
+    for name in SCENARIOS:
+        for _ in range(warmup):
+            requests[name]()
+        samples, queries, errors = [], 0, 0
+        for _ in range(iterations):
+            before = counter.count
+            started = time.perf_counter()
+            response = requests[name]()
+            samples.append(time.perf_counter() - started)
+            queries += counter.count - before
+            if response.status_code >= 400:
+                errors += 1
+        results[name] = dict(
+            percentiles(samples),
+            queries_per_request=round(queries / iterations, 2),
+            errors=errors,
+        )
+    return {'goals': len(goal_ids), 'scenarios': results}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--database-url', help='Database seeded by bench.datagen (defaults to $DATABASE_URL).')
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--user-email', help='Benchmark as this user instead of the first bench user.')
+    parser.add_argument('--cache', default='none', choices=['none', 'memory', 'sqlite'],
+                        help='Report cache backend while benchmarking (default: none, to measure the queries).')
+    parser.add_argument('--output', help='Write results as JSON to this file.')
+    args = parser.parse_args(argv)
+
+    use_database(args.database_url)
+    os.environ['CACHE_BACKEND'] = args.cache
+    os.environ.setdefault('RATELIMIT_BACKEND', 'none')
+    from app import create_app
+    app = create_app()
+
+    started = time.time()
+    with app.app_context():
+        from models import db
+        dialect = db.engine.dialect.name
+    result = run(app, iterations=args.iterations, warmup=args.warmup, user_email=args.user_email)
+    result.update(
+        kind='routes',
+        revision=git_revision(),
+        dialect=dialect,
+        python=platform.python_version(),
+        cache=args.cache,
+        iterations=args.iterations,
+        started_at=started,
+        peak_rss_mb=peak_rss_mb(),
+    )
+
+    text = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    print(text)
+
+
+if __name__ == '__main__':
+    main()
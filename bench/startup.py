@@ -0,0 +1,115 @@
+"""Cold-start cost: import time, create_app() and the first request.
+
+Each run starts a fresh interpreter with `-X importtime`, so nothing is cached
+in-process; the slowest modules app.py imports directly are listed by
+cumulative time (last run).
+With --preload the child imports wsgi (create_app plus warm_up, as the gunicorn
+master does with --preload) and the first request shows what is left for a
+forked worker to do.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+
+from bench import use_database, git_revision, percentiles
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = '''
+import json, resource, time
+started = time.perf_counter()
+if {preload!r}:
+    import wsgi
+    imported = created = time.perf_counter()
+    app = wsgi.app
+else:
+    import app as module
+    imported = time.perf_counter()
+    app = module.create_app()
+    created = time.perf_counter()
+client = app.test_client()
+response = client.get('/login')
+first = time.perf_counter()
+client.get('/login')
+second = time.perf_counter()
+print(json.dumps({{
+    'status': response.status_code,
+    'import': imported - started,
+    'create_app': created - imported,
+    'first_request': first - created,
+    'second_request': second - first,
+    'total': first - started,
+    'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+}}))
+'''
+
+
+def parse_importtime(stderr, root='app'):
+    """{module: cumulative ms} for the modules root imports directly."""
+    children, found = {}, {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        name = name.strip()
+        # -X importtime prints a module's imports before the module itself
+        own = children.pop(depth + 1, [])
+        if name == root:
+            found = dict(own)
+        children.setdefault(depth, []).append((name, int(cumulative) / 1000))
+    return found
+
+
+def run_once(preload, env):
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', CHILD.format(preload=preload)],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    if process.returncode != 0:
+        raise SystemExit(process.stderr[-2000:])
+    result = json.loads(process.stdout.strip().splitlines()[-1])
+    result['imports'] = parse_importtime(process.stderr)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--database-url', help='Database to point the app at (defaults to $DATABASE_URL).')
+    parser.add_argument('--runs', type=int, default=10, help='Fresh interpreters to start.')
+    parser.add_argument('--preload', action='store_true', help='Import wsgi (create_app + warm_up) instead of app.')
+    parser.add_argument('--top', type=int, default=15, help='Slowest imports to list.')
+    parser.add_argument('--output', help='Write results as JSON to this file.')
+    args = parser.parse_args(argv)
+
+    use_database(args.database_url)
+    env = dict(os.environ)
+    env.setdefault('RATELIMIT_BACKEND', 'none')
+    runs = [run_once(args.preload, env) for _ in range(args.runs)]
+    if any(run['status'] != 200 for run in runs):
+        raise SystemExit(f"GET /login returned {runs[-1]['status']}")
+
+    stages = ('import', 'create_app', 'first_request', 'second_request', 'total')
+    slowest = sorted(runs[-1]['imports'].items(), key=lambda item: -item[1])[:args.top]
+    output = {
+        'kind': 'startup',
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'preload': args.preload,
+        'runs': args.runs,
+        'max_rss_mb': round(max(run['max_rss_mb'] for run in runs), 1),
+        'scenarios': {stage: percentiles([run[stage] for run in runs]) for stage in stages},
+        'imports_ms': {name: round(ms, 1) for name, ms in slowest},
+    }
+    text = json.dumps(output, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,239 @@
+import os
+import pickle
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from models import request_data_version
+
+
+class MemoryCache:
+    """In-process LRU with a size cap and per-entry TTL."""
+
+    shared = False
+
+    def __init__(self, max_entries=1024, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires = time.monotonic() + (ttl or self.ttl)
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        return {'backend': 'memory', 'entries': len(self._data), 'evictions': self.evictions}
+
+
+class SQLiteCache:
+    """Cache in a local SQLite file, shared by every worker process on the host.
+
+    Oldest-written entries are evicted once max_entries is exceeded. The
+    eviction counter is per process.
+    """
+
+    shared = True
+
+    def __init__(self, path, max_entries=10000, ttl=300):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._local = threading.local()
+        self.evictions = 0
+        with self._connect() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS cache ('
+                'key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL NOT NULL, created REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS ix_cache_created ON cache (created)')
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        row = self._connect().execute(
+            'SELECT value, expires FROM cache WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None or row[1] < time.time():
+            return None
+        return pickle.loads(row[0])
+
+    def set(self, key, value, ttl=None):
+        now = time.time()
+        conn = self._connect()
+        conn.execute(
+            'INSERT OR REPLACE INTO cache (key, value, expires, created) VALUES (?, ?, ?, ?)',
+            (key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), now + (ttl or self.ttl), now),
+        )
+        count = conn.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        if count > self.max_entries:
+            conn.execute('DELETE FROM cache WHERE expires < ?', (now,))
+            excess = conn.execute('SELECT COUNT(*) FROM cache').fetchone()[0] - self.max_entries
+            if excess > 0:
+                conn.execute(
+                    'DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY created LIMIT ?)',
+                    (excess,),
+                )
+            self.evictions += count - self.max_entries
+
+    def delete(self, key):
+        self._connect().execute('DELETE FROM cache WHERE key = ?', (key,))
+
+    def clear(self):
+        self._connect().execute('DELETE FROM cache')
+
+    def stats(self):
+        entries = self._connect().execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        return {'backend': 'sqlite', 'entries': entries, 'evictions': self.evictions}
+
+
+class NullCache:
+    shared = False
+    evictions = 0
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl=None):
+        pass
+
+    def delete(self, key):
+        pass
+
+    def clear(self):
+        pass
+
+    def stats(self):
+        return {'backend': 'none', 'entries': 0, 'evictions': 0}
+
+
+def make_backend(config):
+    backend = config.get('CACHE_BACKEND', 'memory')
+    ttl = int(config.get('CACHE_TTL', 300))
+    max_entries = int(config.get('CACHE_MAX_ENTRIES', 1024))
+    if backend == 'sqlite':
+        return SQLiteCache(config['CACHE_PATH'], max_entries=max_entries, ttl=ttl)
+    if backend == 'memory':
+        return MemoryCache(max_entries=max_entries, ttl=ttl)
+    if backend == 'none':
+        return NullCache()
+    raise ValueError(f'Unknown CACHE_BACKEND {backend!r}')
+
+
+class ReportCache:
+    """Per-user cache of derived report data, keyed by the user's data version.
+
+    Entries are keyed by (name, user, version), where the version is the
+    user's sync_version (models.request_data_version): every write bumps it in the
+    write's own transaction, so a committed write makes older entries
+    unreachable in every worker, and a rolled-back one changes nothing. Old
+    entries age out through TTL and eviction.
+    """
+
+    def __init__(self, app=None):
+        self.backend = NullCache()
+        self.hits = self.misses = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.backend = make_backend(app.config)
+        app.extensions['report_cache'] = self
+
+    def get_or_set(self, user_id, name, build):
+        key = f'{name}:{user_id}:{request_data_version(user_id)}'
+        value = self.backend.get(key)
+        if value is None:
+            self.misses += 1
+            value = build()
+            self.backend.set(key, value)
+        else:
+            self.hits += 1
+        return value
+
+    def stats(self):
+        return dict(self.backend.stats(), hits=self.hits, misses=self.misses)
+
+
+class IdentityCache:
+    """Short-TTL cache of user snapshots for the Flask-Login user_loader.
+
+    Views that change or delete a user call invalidate() after committing, and
+    the invalidation has to reach every worker at once: a per-process backend
+    would let other workers accept a closed account or an old password's
+    session for up to IDENTITY_TTL. So the cache is only on with a shared
+    backend (CACHE_BACKEND=sqlite); otherwise every request loads the user.
+    """
+
+    def __init__(self, app=None):
+        self.backend = NullCache()
+        self.ttl = 60
+        self.hits = self.misses = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        backend = make_backend(app.config)
+        self.backend = backend if backend.shared else NullCache()
+        self.ttl = int(app.config.get('IDENTITY_TTL', 60))
+        app.extensions['identity_cache'] = self
+
+    def get(self, user_id):
+        snapshot = self.backend.get(f'identity:{user_id}')
+        if snapshot is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return snapshot
+
+    def set(self, user_id, snapshot):
+        self.backend.set(f'identity:{user_id}', snapshot, ttl=self.ttl)
+
+    def invalidate(self, user_id):
+        self.backend.delete(f'identity:{user_id}')
+
+    def stats(self):
+        return {'backend': self.backend.stats()['backend'], 'hits': self.hits, 'misses': self.misses}
+
+
+report_cache = ReportCache()
+identity_cache = IdentityCache()
+
+
+def default_cache_path():
+    return os.path.join(os.environ.get('CACHE_DIR', tempfile.gettempdir()), 'goal-tracker-cache.sqlite3')
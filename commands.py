@@ -0,0 +1,157 @@
+"""`flask` CLI commands, registered at the top level by create_app.
+
+Schema changes go through `flask db upgrade` (Flask-Migrate); init-db and
+reset-db are for scratch and development databases only.
+"""
+import click
+from flask import Blueprint, current_app
+
+import jobs
+from archive import archive_cutoff, compact
+from importer import import_progress, import_legacy_goals, detect_format, text_stream, FORMATS, DEFAULT_CHUNK_SIZE
+from models import db, User
+from stats import rebuild_stats, verify_stats
+
+commands = Blueprint('commands', __name__, cli_group=None)
+
+
+@commands.cli.command('init-db')
+def init_db_command():
+    """Create any missing tables (without migrations)."""
+    db.create_all()
+    click.echo('Tables created.')
+
+
+@commands.cli.command('reset-db')
+@click.confirmation_option(prompt='Drop every table and all data?')
+def reset_db_command():
+    """Drop and re-create every table."""
+    db.drop_all()
+    db.create_all()
+    click.echo('All tables dropped and re-created.')
+
+
+@commands.cli.command('rebuild-stats')
+@click.option('--batch-size', default=500, show_default=True, help='Goals per transaction.')
+@click.option('--verify', is_flag=True, help='Only report goals whose rollup is out of date.')
+@click.option('--enqueue', is_flag=True, help='Queue the rebuild for `flask worker` instead of running it here.')
+def rebuild_stats_command(batch_size, verify, enqueue):
+    """Rebuild goal_stats rollups from progress_entry."""
+    if enqueue:
+        job = jobs.enqueue('rebuild_stats', {'batch_size': batch_size})
+        db.session.commit()
+        click.echo(f'Queued job {job.id}.')
+        return
+    if verify:
+        mismatched = verify_stats(batch_size=batch_size)
+        if mismatched:
+            click.echo(f'{len(mismatched)} goal(s) out of date: {", ".join(map(str, mismatched))}')
+            raise SystemExit(1)
+        click.echo('All goal rollups match progress_entry.')
+        return
+    processed = rebuild_stats(batch_size=batch_size)
+    click.echo(f'Rebuilt rollups for {processed} goal(s).')
+
+
+@commands.cli.command('import-progress')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(FORMATS + ('legacy',)),
+              help='Input format; guessed from the file extension when omitted.')
+@click.option('--goal-id', type=int, help='Import every row into this goal.')
+@click.option('--user-email', help='Only accept goals owned by this user (required for legacy).')
+@click.option('--calendar', type=click.Choice(['auto', 'gregorian', 'jalali']), default='auto', show_default=True)
+@click.option('--chunk-size', default=DEFAULT_CHUNK_SIZE, show_default=True, help='Rows per transaction.')
+def import_progress_command(path, fmt, goal_id, user_email, calendar, chunk_size):
+    """Import progress entries from a CSV, JSON Lines or legacy goals.json file."""
+    user_id = None
+    if user_email:
+        user = User.query.filter_by(email=user_email).first()
+        if not user:
+            raise click.ClickException(f'No user with email {user_email}')
+        user_id = user.id
+
+    fmt = fmt or detect_format(path) or ('legacy' if path.endswith('.json') else None)
+    if fmt == 'legacy':
+        if user_id is None:
+            raise click.ClickException('--user-email is required for legacy goals.json files')
+        created, entries = import_legacy_goals(path, user_id)
+        click.echo(f'Created {created} goal(s) with {entries} progress entries.')
+        return
+    if fmt is None:
+        raise click.ClickException('Cannot guess the file format; pass --format')
+
+    with open(path, 'rb') as f:
+        result = import_progress(text_stream(f), fmt, goal_id=goal_id, user_id=user_id,
+                                 calendar=calendar, chunk_size=chunk_size)
+    for error in result.errors:
+        click.echo(f"line {error['line']}: {error['error']}", err=True)
+    click.echo(f'Imported {result.imported} row(s), skipped {result.skipped} '
+               f'in {result.seconds}s ({result.rows_per_sec} rows/sec).')
+
+
+@commands.cli.command('archive-progress')
+@click.option('--before', type=click.DateTime(formats=['%Y-%m-%d']),
+              help='Archive entries before this month [default: ARCHIVE_AFTER_DAYS ago].')
+@click.option('--batch-size', default=500, show_default=True, help='Goals per transaction.')
+@click.option('--enqueue', is_flag=True, help='Queue the compaction for `flask worker` instead of running it here.')
+def archive_progress_command(before, batch_size, enqueue):
+    """Compact old progress entries into monthly summaries."""
+    before = before.date().replace(day=1) if before else archive_cutoff(current_app.config['ARCHIVE_AFTER_DAYS'])
+    if before is None:
+        raise click.ClickException('Pass --before or set ARCHIVE_AFTER_DAYS')
+    if enqueue:
+        job = jobs.enqueue('archive_progress', {'before': before.isoformat(), 'batch_size': batch_size})
+        db.session.commit()
+        click.echo(f'Queued job {job.id}.')
+        return
+    months, entries = compact(before, batch_size=batch_size)
+    click.echo(f'Archived {entries} entries before {before} into {months} monthly summaries.')
+
+
+@commands.cli.command('worker')
+@click.option('--burst', is_flag=True, help='Exit once the queue is empty.')
+@click.option('--poll-interval', type=float, help='Seconds between polls of an empty queue [JOB_POLL_INTERVAL].')
+@click.option('--max-jobs', type=int, help='Exit after this many jobs.')
+def worker_command(burst, poll_interval, max_jobs):
+    """Run background jobs (account purges, exports, rollup rebuilds)."""
+    config = current_app.config
+    processed = jobs.work(burst=burst, poll_interval=poll_interval or config['JOB_POLL_INTERVAL'],
+                          timeout=config['JOB_TIMEOUT'], max_jobs=max_jobs)
+    click.echo(f'Ran {processed} job(s).')
+
+
+@commands.cli.command('prune-jobs')
+@click.option('--days', default=7, show_default=True, help='Keep finished jobs this many days.')
+def prune_jobs_command(days):
+    """Delete finished jobs and their export files."""
+    click.echo(f'Pruned {jobs.prune_jobs(days)} job(s).')
+
+
+@commands.cli.command('build-assets')
+@click.option('--vendor', is_flag=True, help='Download the pinned Chart.js into static/vendor first.')
+def build_assets_command(vendor):
+    """Fingerprint and precompress static files into static/dist."""
+    from assets import build, vendor_chartjs
+    if vendor:
+        try:
+            path, digest = vendor_chartjs(current_app.static_folder)
+        except (OSError, ValueError) as e:
+            raise click.ClickException(f'Could not download Chart.js: {e}')
+        click.echo(f'Vendored {path} (sha256 {digest}).')
+    manifest = build(current_app.static_folder)
+    compressed = sum(1 for entry in manifest.values() if entry['encodings'])
+    click.echo(f'Built {len(manifest)} asset(s), {compressed} with precompressed variants.')
+
+
+@commands.cli.command('digest')
+@click.option('--date', 'day', type=click.DateTime(formats=['%Y-%m-%d']), help='Digest date [default: today].')
+@click.option('--page-size', default=500, show_default=True, help='Users per page and transaction.')
+@click.option('--dry-run', is_flag=True, help='Scan and count without writing to the outbox.')
+def digest_command(day, page_size, dry_run):
+    """Write the daily digest of lagging goals to digest_outbox."""
+    from digest import build_digests
+    result = build_digests(today=day.date() if day else None, page_size=page_size, dry_run=dry_run)
+    verb = 'Would write' if dry_run else 'Wrote'
+    click.echo(f'Scanned {result.goals} goal(s) of {result.users} user(s) in {result.seconds}s '
+               f'({result.goals_per_sec} goals/sec): {result.lagging} lagging.')
+    click.echo(f'{verb} {result.digests} digest(s), withdrew {result.withdrawn} unsent one(s) no longer due.')
@@ -0,0 +1,208 @@
+import os
+import threading
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+# Per-dialect defaults, each overridable through the environment variable named here
+POSTGRES_DEFAULTS = {
+    'DB_POOL_SIZE': 5,
+    'DB_MAX_OVERFLOW': 5,
+    'DB_POOL_TIMEOUT': 10,
+    'DB_POOL_RECYCLE': 1800,
+    'DB_POOL_PRE_PING': True,
+    'DB_STATEMENT_TIMEOUT_MS': 30000,
+}
+SQLITE_DEFAULTS = {
+    'DB_POOL_SIZE': 5,
+    'DB_MAX_OVERFLOW': 10,
+    'DB_POOL_TIMEOUT': 10,
+    'DB_POOL_RECYCLE': -1,
+    'DB_POOL_PRE_PING': False,
+    'SQLITE_BUSY_TIMEOUT_MS': 5000,
+    'SQLITE_JOURNAL_MODE': 'WAL',
+    'SQLITE_SYNCHRONOUS': 'NORMAL',
+}
+
+
+def normalize_database_url(url):
+    """Hosting platforms still hand out postgres://, which SQLAlchemy 2 rejects."""
+    if url and url.startswith('postgres://'):
+        return 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+def _setting(name, defaults, environ):
+    default = defaults[name]
+    raw = environ.get(name)
+    if raw is None or raw == '':
+        return default
+    if isinstance(default, bool):
+        return raw.strip().lower() in ('1', 'true', 'yes', 'on')
+    if isinstance(default, int):
+        return int(raw)
+    return raw
+
+
+def _is_memory_sqlite(url):
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+
+def engine_options(database_url, environ=None):
+    """SQLALCHEMY_ENGINE_OPTIONS for database_url, driven by DB_* / SQLITE_* variables."""
+    environ = os.environ if environ is None else environ
+    if not database_url:
+        return {}
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+
+    if backend == 'postgresql':
+        defaults = POSTGRES_DEFAULTS
+    elif backend == 'sqlite':
+        defaults = SQLITE_DEFAULTS
+        if _is_memory_sqlite(url):
+            # In-memory databases live in a single connection; keep SQLAlchemy's pool
+            return {}
+    else:
+        return {}
+
+    def setting(name):
+        return _setting(name, defaults, environ)
+
+    options = {
+        'poolclass': InstrumentedQueuePool,
+        'pool_size': setting('DB_POOL_SIZE'),
+        'max_overflow': setting('DB_MAX_OVERFLOW'),
+        'pool_timeout': setting('DB_POOL_TIMEOUT'),
+        'pool_recycle': setting('DB_POOL_RECYCLE'),
+        'pool_pre_ping': setting('DB_POOL_PRE_PING'),
+    }
+
+    if backend == 'postgresql':
+        timeout = setting('DB_STATEMENT_TIMEOUT_MS')
+        if timeout:
+            options['connect_args'] = {'options': f'-c statement_timeout={timeout}'}
+    else:
+        options['connect_args'] = {'timeout': setting('SQLITE_BUSY_TIMEOUT_MS') / 1000}
+    return options
+
+
+def sqlite_pragmas(environ=None):
+    environ = os.environ if environ is None else environ
+    return {
+        'journal_mode': _setting('SQLITE_JOURNAL_MODE', SQLITE_DEFAULTS, environ),
+        'synchronous': _setting('SQLITE_SYNCHRONOUS', SQLITE_DEFAULTS, environ),
+        'busy_timeout': _setting('SQLITE_BUSY_TIMEOUT_MS', SQLITE_DEFAULTS, environ),
+        'foreign_keys': 'ON',
+    }
+
+
+def install_sqlite_pragmas(engine, pragmas):
+    """Apply PRAGMAs to every new SQLite connection through a connect event."""
+    if engine.dialect.name != 'sqlite':
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f'PRAGMA {name}={value}')
+        finally:
+            cursor.close()
+
+
+class PoolStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.checkins = 0
+        self.peak_in_use = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record_wait(self, seconds, timed_out=False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+    def checked_out(self):
+        with self._lock:
+            self.checkouts += 1
+            self.peak_in_use = max(self.peak_in_use, self.checkouts - self.checkins)
+
+    def checked_in(self):
+        with self._lock:
+            self.checkins += 1
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                'checkouts': self.checkouts,
+                'in_use': self.checkouts - self.checkins,
+                'peak_in_use': self.peak_in_use,
+                'timeouts': self.timeouts,
+                'wait_seconds_total': round(self.wait_seconds_total, 6),
+                'wait_seconds_max': round(self.wait_seconds_max, 6),
+                'wait_seconds_avg': round(self.wait_seconds_total / self.checkouts, 6) if self.checkouts else 0.0,
+            }
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.stats.record_wait(time.perf_counter() - started, timed_out=True)
+            raise
+        self.stats.record_wait(time.perf_counter() - started)
+        return connection
+
+
+def install_pool_stats(engine):
+    pool = engine.pool
+    if not isinstance(pool, InstrumentedQueuePool):
+        return
+
+    @event.listens_for(engine, 'checkout')
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        engine.pool.stats.checked_out()
+
+    @event.listens_for(engine, 'checkin')
+    def on_checkin(dbapi_connection, connection_record):
+        engine.pool.stats.checked_in()
+
+
+def pool_stats(engine):
+    pool = engine.pool
+    info = {'dialect': engine.dialect.name, 'pool': type(pool).__name__, 'status': pool.status()}
+    if isinstance(pool, QueuePool):
+        info.update(size=pool.size(), checked_out=pool.checkedout(), overflow=pool.overflow())
+    if isinstance(pool, InstrumentedQueuePool):
+        info.update(pool.stats.as_dict())
+    return info
+
+
+def init_engine(app, db):
+    """Wire connect events onto the engines (primary and any binds) Flask-SQLAlchemy created for app."""
+    with app.app_context():
+        for engine in db.engines.values():
+            install_sqlite_pragmas(engine, sqlite_pragmas())
+            install_pool_stats(engine)
@@ -0,0 +1,141 @@
+"""Daily digest of lagging goals, written to the digest_outbox table.
+
+A goal is lagging when, at its daily_target, it can no longer reach
+total_units by target_date: remaining > daily_target * days_left, where
+days_left counts today. Overdue goals with units left always qualify.
+Totals come from goal_stats, the maintained rollup of progress_entry and the
+archived months, so the scan never reads individual entries.
+
+Users are walked in keyset pages (user.id > last id seen, no OFFSET); each
+page costs two queries whatever its size: one for the page's last id and goal
+count, one that returns only its lagging goals. Each page's digests are
+upserted and committed together, so a rerun on the same day refreshes the
+unsent digests and leaves sent ones alone; an unsent digest of a user who is
+no longer lagging is withdrawn in the same transaction.
+"""
+import json
+import time
+from collections import namedtuple
+from datetime import date
+from itertools import groupby
+
+from sqlalchemy import select, delete, func
+
+from analytics import day_number
+from models import db, insert_for, utcnow, User, Goal, GoalStats, DigestOutbox
+
+DEFAULT_PAGE_SIZE = 500
+
+DigestResult = namedtuple('DigestResult', ['users', 'goals', 'lagging', 'digests', 'withdrawn',
+                                           'seconds', 'goals_per_sec'])
+
+
+def user_page(after_id, limit):
+    """The next limit open accounts after after_id, as a subquery of ids."""
+    return (
+        select(User.id)
+        .where(User.id > after_id, User.deleted_at.is_(None))
+        .order_by(User.id)
+        .limit(limit)
+        .subquery()
+    )
+
+
+def page_summary_query(page):
+    """(last user id, users, goals) for a page."""
+    return (
+        select(func.max(page.c.id), func.count(func.distinct(page.c.id)), func.count(Goal.id))
+        .select_from(page)
+        .outerjoin(Goal, Goal.user_id == page.c.id)
+    )
+
+
+def lagging_query(page, today):
+    """The page's lagging goals, ordered by user."""
+    remaining = Goal.total_units - func.coalesce(GoalStats.total, 0)
+    days_left = day_number(Goal.target_date) - today.toordinal() + 1
+    return (
+        select(
+            Goal.user_id, Goal.id, Goal.title, Goal.daily_target, Goal.target_date,
+            remaining.label('remaining'), days_left.label('days_left'),
+        )
+        .join(page, page.c.id == Goal.user_id)
+        .outerjoin(GoalStats, GoalStats.goal_id == Goal.id)
+        # days_left <= 0 makes the right-hand side <= 0, so overdue goals pass on remaining > 0
+        .where(remaining > 0, remaining > Goal.daily_target * days_left)
+        .order_by(Goal.user_id, Goal.id)
+    )
+
+
+def digest_payload(rows):
+    goals = []
+    for row in rows:
+        days_left = max(row.days_left, 0)
+        goals.append({
+            'goal_id': row.id,
+            'title': row.title,
+            'remaining': row.remaining,
+            'daily_target': row.daily_target,
+            'target_date': row.target_date.isoformat(),
+            'days_left': days_left,
+            'required_pace': row.remaining / days_left if days_left else None,
+        })
+    return json.dumps({'goals': goals}, ensure_ascii=False)
+
+
+def _write_digests(digest_date, payloads):
+    now = utcnow()
+    stmt = insert_for(DigestOutbox)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['user_id', 'digest_date'],
+        set_={'payload': stmt.excluded.payload, 'created_at': stmt.excluded.created_at},
+        where=DigestOutbox.sent_at.is_(None),
+    )
+    db.session.execute(stmt, [
+        {'user_id': user_id, 'digest_date': digest_date, 'payload': payload, 'created_at': now}
+        for user_id, payload in payloads
+    ])
+
+
+def _withdraw_digests(page, digest_date, keep_user_ids):
+    """Delete the page's unsent digests for digest_date of users not in keep_user_ids."""
+    return db.session.execute(
+        delete(DigestOutbox)
+        .where(DigestOutbox.user_id.in_(select(page.c.id)),
+               DigestOutbox.digest_date == digest_date,
+               DigestOutbox.sent_at.is_(None),
+               DigestOutbox.user_id.not_in(keep_user_ids))
+    ).rowcount
+
+
+def build_digests(today=None, page_size=DEFAULT_PAGE_SIZE, dry_run=False):
+    """Scan every open account and write one digest per user with lagging goals.
+
+    dry_run scans and counts without writing. Returns a DigestResult.
+    """
+    today = today or date.today()
+    started = time.perf_counter()
+    after_id = 0
+    users = goals = lagging = digests = withdrawn = 0
+    while True:
+        page = user_page(after_id, page_size)
+        last_id, page_users, page_goals = db.session.execute(page_summary_query(page)).one()
+        if last_id is None:
+            break
+        rows = db.session.execute(lagging_query(page, today)).all()
+        payloads = [(user_id, digest_payload(list(group)))
+                    for user_id, group in groupby(rows, key=lambda row: row.user_id)]
+        if not dry_run:
+            withdrawn += _withdraw_digests(page, today, [user_id for user_id, _ in payloads])
+            if payloads:
+                _write_digests(today, payloads)
+        db.session.commit()
+        users += page_users
+        goals += page_goals
+        lagging += len(rows)
+        digests += len(payloads)
+        after_id = last_id
+
+    seconds = time.perf_counter() - started
+    goals_per_sec = goals / seconds if seconds > 0 else 0.0
+    return DigestResult(users, goals, lagging, digests, withdrawn, round(seconds, 3), round(goals_per_sec, 1))
@@ -0,0 +1,94 @@
+import csv
+import io
+import json
+
+from sqlalchemy import select, union_all, literal_column
+
+from models import db, Goal, ProgressArchive, ProgressEntry
+
+EXPORT_COLUMNS = ('goal_id', 'goal_title', 'date', 'value', 'kind')
+# kind of each row: one day's entry, or an archived month's total dated its first day
+DAY, MONTH = 'day', 'month'
+YIELD_PER = 1000
+
+
+def _filtered(query, goal_col, date_col, goal_ids, start, end):
+    if goal_ids:
+        query = query.where(goal_col.in_(goal_ids))
+    if start is not None:
+        query = query.where(date_col >= start)
+    if end is not None:
+        query = query.where(date_col <= end)
+    return query
+
+
+def export_query(user_id, goal_ids=None, start=None, end=None):
+    """Goal ⨝ ProgressEntry for one user, ordered by goal and date.
+
+    Archived months are exported as one row each, dated the first of the month,
+    holding the month's total and marked kind=month; the importer skips them.
+    """
+    raw = _filtered(
+        select(Goal.id.label('goal_id'), Goal.title, ProgressEntry.date.label('date'), ProgressEntry.value,
+               literal_column(f"'{DAY}'").label('kind'))
+        .join(ProgressEntry, ProgressEntry.goal_id == Goal.id)
+        .where(Goal.user_id == user_id),
+        ProgressEntry.goal_id, ProgressEntry.date, goal_ids, start, end,
+    )
+    archived = _filtered(
+        select(Goal.id, Goal.title, ProgressArchive.month, ProgressArchive.total, literal_column(f"'{MONTH}'"))
+        .join(ProgressArchive, ProgressArchive.goal_id == Goal.id)
+        .where(Goal.user_id == user_id),
+        ProgressArchive.goal_id, ProgressArchive.month, goal_ids, start, end,
+    )
+    both = union_all(raw, archived).subquery()
+    return select(both).order_by(both.c.goal_id, both.c.date)
+
+
+def iter_export_rows(query):
+    """Fetch in batches of YIELD_PER; a server-side cursor is used on PostgreSQL."""
+    result = db.session.execute(query.execution_options(yield_per=YIELD_PER))
+    try:
+        for row in result:
+            yield row
+    finally:
+        result.close()
+
+
+def csv_lines(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for i, (goal_id, title, entry_date, value, kind) in enumerate(rows, start=1):
+        writer.writerow((goal_id, title, entry_date.isoformat(), value, kind))
+        if i % YIELD_PER == 0:
+            yield _drain(buffer)
+    yield _drain(buffer)
+
+
+def ndjson_lines(rows):
+    chunk = []
+    for goal_id, title, entry_date, value, kind in rows:
+        chunk.append(json.dumps(
+            {'goal_id': goal_id, 'goal_title': title, 'date': entry_date.isoformat(), 'value': value,
+             'kind': kind},
+            ensure_ascii=False,
+        ))
+        if len(chunk) >= YIELD_PER:
+            yield '\n'.join(chunk) + '\n'
+            chunk = []
+    if chunk:
+        yield '\n'.join(chunk) + '\n'
+
+
+def _drain(buffer):
+    data = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return data
+
+
+WRITERS = {
+    'csv': (csv_lines, 'text/csv'),
+    'ndjson': (ndjson_lines, 'application/x-ndjson'),
+}
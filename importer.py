@@ -0,0 +1,252 @@
+import csv
+import io
+import json
+import time
+from collections import namedtuple
+from datetime import datetime
+
+from sqlalchemy import select, tuple_
+
+from export import MONTH
+from jalali import jalali_table
+from models import db, insert_for, utcnow, claim_version, Goal, ProgressArchive, ProgressEntry
+from progress import ArchivedDateError
+from stats import refresh_stats
+
+DEFAULT_CHUNK_SIZE = 5000
+MAX_REPORTED_ERRORS = 50
+FORMATS = ('csv', 'jsonl')
+
+ImportResult = namedtuple('ImportResult', ['imported', 'skipped', 'errors', 'seconds', 'rows_per_sec'])
+
+
+class RowError(ValueError):
+    pass
+
+
+def detect_format(filename=None, mimetype=None):
+    name = (filename or '').lower()
+    mimetype = (mimetype or '').lower()
+    if name.endswith('.csv') or mimetype in ('text/csv', 'application/csv'):
+        return 'csv'
+    if name.endswith(('.jsonl', '.ndjson')) or mimetype in ('application/x-ndjson', 'application/jsonl', 'application/x-jsonlines'):
+        return 'jsonl'
+    return None
+
+
+def parse_date(text, calendar='auto'):
+    """Parse YYYY-MM-DD as Gregorian or Jalali.
+
+    With calendar='auto' years before 1700 are read as Jalali (e.g. 1403-05-12).
+    """
+    try:
+        year, month, day = map(int, str(text).strip().replace('/', '-').split('-'))
+        if calendar == 'jalali' or (calendar == 'auto' and year < 1700):
+            return jalali_table.from_jalali(year, month, day)
+        return datetime(year, month, day).date()
+    except (TypeError, ValueError) as e:
+        raise RowError(f'invalid date {text!r}') from e
+
+
+def parse_value(text):
+    try:
+        value = float(text)
+    except (TypeError, ValueError) as e:
+        raise RowError(f'invalid value {text!r}') from e
+    if value != value or value < 0:
+        raise RowError(f'value must be a non-negative number, got {text!r}')
+    return value
+
+
+def iter_records(stream, fmt):
+    """Yield (line_number, mapping_or_RowError) from a text stream, one row at a time."""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    elif fmt == 'jsonl':
+        for line_no, line in enumerate(stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                yield line_no, RowError('invalid JSON')
+                continue
+            if not isinstance(record, dict):
+                yield line_no, RowError('expected a JSON object')
+                continue
+            yield line_no, record
+    else:
+        raise ValueError(f'Unsupported format {fmt!r}; expected one of {", ".join(FORMATS)}')
+
+
+def text_stream(binary):
+    return io.TextIOWrapper(binary, encoding='utf-8-sig', newline='')
+
+
+class _GoalResolver:
+    """Checks goal ids referenced by rows, querying each unknown id once.
+
+    owners maps every id seen to its user_id (None for unknown goals).
+    """
+
+    def __init__(self, goal_id=None, user_id=None):
+        self.goal_id = goal_id
+        self.user_id = user_id
+        self.owners = {}
+
+    def __call__(self, record):
+        raw = record.get('goal_id')
+        if self.goal_id is not None and raw in (None, ''):
+            goal_id = self.goal_id
+        else:
+            try:
+                goal_id = int(raw)
+            except (TypeError, ValueError):
+                raise RowError('missing or invalid goal_id') from None
+            if self.goal_id is not None and goal_id != self.goal_id:
+                raise RowError(f'goal_id {goal_id} does not match the target goal')
+
+        if goal_id not in self.owners:
+            query = select(Goal.user_id).where(Goal.id == goal_id)
+            if self.user_id is not None:
+                query = query.where(Goal.user_id == self.user_id)
+            self.owners[goal_id] = db.session.scalar(query)
+        if self.owners[goal_id] is None:
+            raise RowError(f'unknown goal {goal_id}')
+        return goal_id
+
+
+def _archived_keys(chunk):
+    """Keys of chunk whose month is archived for that goal; those rows are refused."""
+    months = {(goal_id, entry_date.replace(day=1)) for goal_id, entry_date in chunk}
+    archived = set(db.session.execute(
+        select(ProgressArchive.goal_id, ProgressArchive.month)
+        .where(tuple_(ProgressArchive.goal_id, ProgressArchive.month).in_(months))
+    ).all())
+    if not archived:
+        return []
+    return [key for key in chunk if (key[0], key[1].replace(day=1)) in archived]
+
+
+def _write_chunk(chunk, owners):
+    """Upsert {(goal_id, date): value} with the rollups of its goals and commit.
+
+    owners maps goal_id to user_id. The rollups are refreshed in the chunk's own
+    transaction: the chunk claims a new data version, and a report cached under
+    it must already see the new totals.
+    """
+    # One change version per user and chunk, claimed in a fixed order
+    versions = {user_id: claim_version(user_id) for user_id in sorted({owners[g] for g, _ in chunk})}
+    now = utcnow()
+    stmt = insert_for(ProgressEntry)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['goal_id', 'date'],
+        set_={'value': stmt.excluded.value, 'version': stmt.excluded.version,
+              'updated_at': stmt.excluded.updated_at},
+    )
+    # executemany: one round trip per driver batch instead of one per row
+    db.session.execute(stmt, [
+        {'goal_id': goal_id, 'date': entry_date, 'value': value,
+         'version': versions[owners[goal_id]], 'updated_at': now}
+        for (goal_id, entry_date), value in chunk.items()
+    ])
+    refresh_stats({goal_id for goal_id, _ in chunk})
+    db.session.commit()
+
+
+def import_progress(stream, fmt, goal_id=None, user_id=None, calendar='auto',
+                    chunk_size=DEFAULT_CHUNK_SIZE):
+    """Stream rows from a text stream into progress_entry.
+
+    Rows are validated one at a time and upserted in chunks of chunk_size, one
+    transaction per chunk, so memory stays bounded by the chunk. A later row for
+    the same (goal, date) wins. Each chunk refreshes the rollups of its goals
+    before committing. goal_id pins every row to one goal; user_id restricts rows to goals
+    owned by that user.
+    """
+    started = time.perf_counter()
+    resolve_goal = _GoalResolver(goal_id=goal_id, user_id=user_id)
+    chunk = {}
+    lines = {}
+    imported = skipped = 0
+    errors = []
+
+    def flush():
+        nonlocal imported, skipped
+        for key in _archived_keys(chunk):
+            del chunk[key]
+            for line_no in lines[key]:
+                imported -= 1
+                skipped += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append({'line': line_no, 'error': str(ArchivedDateError())})
+        if chunk:
+            _write_chunk(chunk, resolve_goal.owners)
+        chunk.clear()
+        lines.clear()
+
+    try:
+        for line_no, record in iter_records(stream, fmt):
+            try:
+                if isinstance(record, RowError):
+                    raise record
+                if record.get('kind') == MONTH:
+                    raise RowError('archived month totals are not daily entries')
+                row_goal_id = resolve_goal(record)
+                entry_date = parse_date(record.get('date'), calendar)
+                value = parse_value(record.get('value'))
+            except RowError as e:
+                skipped += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append({'line': line_no, 'error': str(e)})
+                continue
+
+            key = (row_goal_id, entry_date)
+            chunk[key] = value
+            lines.setdefault(key, []).append(line_no)
+            imported += 1
+            if len(chunk) >= chunk_size:
+                flush()
+
+        if chunk:
+            flush()
+    finally:
+        db.session.rollback()
+
+    seconds = time.perf_counter() - started
+    rows_per_sec = imported / seconds if seconds > 0 else 0.0
+    return ImportResult(imported, skipped, errors, round(seconds, 3), round(rows_per_sec, 1))
+
+
+def import_legacy_goals(path, user_id):
+    """Create goals (and any progress) for user_id from the old goals.json layout."""
+    with open(path, encoding='utf-8') as f:
+        legacy_goals = json.load(f)
+
+    created = entries = 0
+    for item in legacy_goals:
+        goal = Goal(
+            title=item['title'],
+            total_units=float(item['total_units']),
+            daily_target=float(item['daily_target']),
+            target_date=parse_date(item['target_date']),
+            user_id=user_id,
+            version=claim_version(user_id),
+        )
+        db.session.add(goal)
+        db.session.flush()
+        created += 1
+
+        progress = item.get('progress') or []
+        if isinstance(progress, dict):
+            progress = [{'date': d, 'value': v} for d, v in progress.items()]
+        chunk = {(goal.id, parse_date(p['date'])): parse_value(p['value']) for p in progress}
+        if chunk:
+            _write_chunk(chunk, {goal.id: user_id})
+            entries += len(chunk)
+
+    db.session.commit()
+    return created, entries
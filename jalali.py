@@ -0,0 +1,135 @@
+"""Gregorian <-> Jalali conversion through a precomputed day table.
+
+The table maps every day in a configurable Gregorian year range, indexed by
+date.toordinal(), to its Jalali (year, month, day), plus the ordinal of each
+Jalali month's first day for the reverse direction. Conversions are array
+lookups, and whole NumPy arrays of ordinals can be bucketed by Jalali week,
+month or year at once. Dates outside the range fall back to jdatetime.
+NumPy is imported when the table is first built, not with the module, so
+processes that never convert a date do not pay for it.
+"""
+import threading
+from datetime import date
+
+import jdatetime
+
+DEFAULT_MIN_YEAR = 1900
+DEFAULT_MAX_YEAR = 2100
+# Jalali weeks start on Saturday; date.fromordinal(1) is a Monday
+SATURDAY_OFFSET = 1
+
+
+class JalaliTable:
+    def __init__(self, min_year=DEFAULT_MIN_YEAR, max_year=DEFAULT_MAX_YEAR):
+        self.min_year = min_year
+        self.max_year = max_year
+        self._lock = threading.Lock()
+        self._built = False
+
+    def init_app(self, app):
+        self.min_year = int(app.config.get('JALALI_MIN_YEAR', DEFAULT_MIN_YEAR))
+        self.max_year = int(app.config.get('JALALI_MAX_YEAR', DEFAULT_MAX_YEAR))
+        self._built = False
+
+    def _build(self):
+        import numpy as np
+        with self._lock:
+            if self._built:
+                return
+            first = date(self.min_year, 1, 1).toordinal()
+            last = date(self.max_year, 12, 31).toordinal()
+            size = last - first + 1
+            years = np.zeros(size, dtype=np.int16)
+            months = np.zeros(size, dtype=np.int8)
+            days = np.zeros(size, dtype=np.int8)
+            month_starts = {}
+
+            # One jdatetime call per Jalali year; months are filled as slices
+            jy = jdatetime.date.fromgregorian(date=date.fromordinal(first)).year
+            while True:
+                start = jdatetime.date(jy, 1, 1).togregorian().toordinal()
+                if start > last:
+                    break
+                for jm in range(1, 13):
+                    length = 31 if jm <= 6 else 30 if jm <= 11 else (30 if jdatetime.date(jy, 1, 1).isleap() else 29)
+                    month_starts[(jy, jm)] = start
+                    lo, hi = max(start, first), min(start + length - 1, last)
+                    if lo <= hi:
+                        years[lo - first:hi - first + 1] = jy
+                        months[lo - first:hi - first + 1] = jm
+                        days[lo - first:hi - first + 1] = np.arange(lo - start + 1, hi - start + 2)
+                    start += length
+                jy += 1
+
+            self.first, self.last = first, last
+            self.years, self.months, self.days = years, months, days
+            self.month_starts = month_starts
+            self._built = True
+
+    def _ensure(self):
+        if not self._built:
+            self._build()
+
+    def load(self):
+        """Build the table now rather than on the first conversion."""
+        self._ensure()
+
+    # Single dates
+    def to_jalali(self, value):
+        """(year, month, day) of a datetime.date in the Jalali calendar."""
+        self._ensure()
+        ordinal = value.toordinal()
+        if self.first <= ordinal <= self.last:
+            i = ordinal - self.first
+            return int(self.years[i]), int(self.months[i]), int(self.days[i])
+        j = jdatetime.date.fromgregorian(date=value)
+        return j.year, j.month, j.day
+
+    def from_jalali(self, year, month, day):
+        """Gregorian date of a Jalali day; raises ValueError if it does not exist."""
+        self._ensure()
+        start = self.month_starts.get((year, month))
+        if start is None or not 1 <= month <= 12:
+            return jdatetime.date(year, month, day).togregorian()
+        following = self.month_starts.get((year, month + 1) if month < 12 else (year + 1, 1))
+        if following is None:
+            return jdatetime.date(year, month, day).togregorian()
+        if not 1 <= day <= following - start:
+            raise ValueError(f'day is out of range for month: {year}-{month}-{day}')
+        return date.fromordinal(start + day - 1)
+
+    def format(self, value, fmt='{:04d}/{:02d}/{:02d}'):
+        return fmt.format(*self.to_jalali(value)) if value else ''
+
+    # Arrays of ordinals
+    def lookup(self, ordinals):
+        """Jalali (years, months, days) arrays for an array of ordinals."""
+        import numpy as np
+        self._ensure()
+        ordinals = np.asarray(ordinals, dtype=np.int64)
+        inside = (ordinals >= self.first) & (ordinals <= self.last)
+        i = np.clip(ordinals - self.first, 0, len(self.years) - 1)
+        years = self.years[i].astype(np.int64)
+        months = self.months[i].astype(np.int64)
+        days = self.days[i].astype(np.int64)
+        for k in np.flatnonzero(~inside):
+            years[k], months[k], days[k] = self.to_jalali(date.fromordinal(int(ordinals[k])))
+        return years, months, days
+
+    def bucket_start(self, ordinals, bucket):
+        """Ordinal of the first day of each ordinal's Jalali 'jweek', 'jmonth' or 'jyear'."""
+        import numpy as np
+        ordinals = np.asarray(ordinals, dtype=np.int64)
+        if bucket == 'jweek':
+            return ordinals - (ordinals + SATURDAY_OFFSET) % 7
+        years, months, days = self.lookup(ordinals)
+        month_start = ordinals - days + 1
+        if bucket == 'jmonth':
+            return month_start
+        if bucket == 'jyear':
+            # Months 1-6 have 31 days and 7-11 have 30
+            return month_start - np.where(months <= 7, (months - 1) * 31, 186 + (months - 7) * 30)
+        raise ValueError(f'Unknown Jalali bucket {bucket!r}')
+
+
+jalali_table = JalaliTable()
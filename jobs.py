@@ -0,0 +1,264 @@
+"""Database-backed background jobs, run by `flask worker`.
+
+Jobs are rows in the job table, so no broker is needed. A worker claims the
+oldest runnable job with a single UPDATE ... RETURNING (FOR UPDATE SKIP LOCKED
+on PostgreSQL, so workers never wait on each other's rows; SQLite serializes
+writers anyway), runs its handler and records the result. Failed jobs are
+retried with exponential backoff, and a job whose worker died is reclaimed once
+its lock is older than the timeout. Long handlers call heartbeat() between
+chunks to keep their lock.
+"""
+import json
+import os
+import signal
+import socket
+import threading
+from datetime import date, timedelta
+
+from flask import current_app
+from sqlalchemy import select, update, delete, func, and_, or_
+
+from models import db, utcnow, Job, User, Goal, GoalStats, ProgressArchive, ProgressEntry, SyncTombstone, DigestOutbox
+from archive import archive_cutoff, compact
+from stats import rebuild_stats
+from export import export_query, iter_export_rows, WRITERS
+
+STATUSES = ('queued', 'running', 'done', 'failed')
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_TIMEOUT = 600
+DEFAULT_POLL_INTERVAL = 2.0
+RETRY_BASE_SECONDS = 30
+PURGE_BATCH_SIZE = 2000
+
+HANDLERS = {}
+
+
+def handler(kind):
+    def register(func):
+        HANDLERS[kind] = func
+        return func
+    return register
+
+
+# Producer side
+def enqueue(kind, payload=None, user_id=None, max_attempts=None, delay=0):
+    """Add a job to the caller's transaction; it becomes visible to workers on commit."""
+    if kind not in HANDLERS:
+        raise ValueError(f'Unknown job kind {kind!r}')
+    now = utcnow()
+    job = Job(
+        kind=kind,
+        payload=json.dumps(payload or {}),
+        user_id=user_id,
+        max_attempts=max_attempts or current_app.config.get('JOB_MAX_ATTEMPTS', DEFAULT_MAX_ATTEMPTS),
+        run_at=now + timedelta(seconds=delay),
+        created_at=now,
+    )
+    db.session.add(job)
+    db.session.flush()
+    return job
+
+
+def job_json(job):
+    return {
+        'id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'attempts': job.attempts,
+        'result': json.loads(job.result) if job.result else None,
+        'error': job.error if job.status == 'failed' else None,
+        'created_at': job.created_at.isoformat() + 'Z',
+        'finished_at': job.finished_at.isoformat() + 'Z' if job.finished_at else None,
+    }
+
+
+def queue_depth():
+    """Job counts by status."""
+    counts = dict(db.session.execute(select(Job.status, func.count()).group_by(Job.status)).all())
+    return {status: counts.get(status, 0) for status in STATUSES}
+
+
+# Worker side
+def worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def claim_stmt(worker, now, timeout=DEFAULT_TIMEOUT):
+    runnable = or_(
+        and_(Job.status == 'queued', Job.run_at <= now),
+        # Reclaim jobs whose worker died mid-run
+        and_(Job.status == 'running', Job.locked_at < now - timedelta(seconds=timeout)),
+    )
+    next_id = (
+        select(Job.id).where(runnable)
+        .order_by(Job.run_at, Job.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    return (
+        update(Job)
+        .where(Job.id == next_id, runnable)
+        .values(status='running', locked_at=now, locked_by=worker, attempts=Job.attempts + 1)
+        .returning(Job.id)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def claim(worker, timeout=DEFAULT_TIMEOUT):
+    """Lock the next runnable job for worker; returns it or None."""
+    job_id = db.session.execute(claim_stmt(worker, utcnow(), timeout)).scalar()
+    db.session.commit()
+    return db.session.get(Job, job_id) if job_id is not None else None
+
+
+def heartbeat(job):
+    """Refresh job's lock; commits along with the handler's current chunk."""
+    db.session.execute(update(Job).where(Job.id == job.id).values(locked_at=utcnow())
+                       .execution_options(synchronize_session=False))
+
+
+def _finish(job_id, worker, **values):
+    db.session.execute(update(Job).where(Job.id == job_id, Job.locked_by == worker).values(**values)
+                       .execution_options(synchronize_session=False))
+    db.session.commit()
+
+
+def run_job(job, worker):
+    """Run a claimed job and record the outcome. Returns its final status."""
+    job_id, attempts, max_attempts = job.id, job.attempts, job.max_attempts
+    if attempts > max_attempts:
+        # Reclaimed after its last attempt died with the worker
+        _finish(job_id, worker, status='failed', error='worker lost', finished_at=utcnow())
+        return 'failed'
+    try:
+        result = HANDLERS[job.kind](job, json.loads(job.payload))
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.exception('Job %s (%s) failed on attempt %s', job_id, job.kind, attempts)
+        error = f'{type(e).__name__}: {e}'
+        if attempts < max_attempts:
+            retry_at = utcnow() + timedelta(seconds=RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+            _finish(job_id, worker, status='queued', error=error, run_at=retry_at, locked_at=None, locked_by=None)
+            return 'queued'
+        _finish(job_id, worker, status='failed', error=error, finished_at=utcnow())
+        return 'failed'
+    _finish(job_id, worker, status='done', error=None, finished_at=utcnow(),
+            result=json.dumps(result) if result is not None else None)
+    return 'done'
+
+
+def work(burst=False, poll_interval=DEFAULT_POLL_INTERVAL, timeout=DEFAULT_TIMEOUT, max_jobs=None, stop=None):
+    """Claim and run jobs until stopped (SIGTERM/SIGINT), or until the queue is empty with burst.
+
+    Returns the number of jobs run.
+    """
+    stop = stop or threading.Event()
+    if threading.current_thread() is threading.main_thread():
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, lambda *_: stop.set())
+
+    worker = worker_id()
+    processed = 0
+    while not stop.is_set() and (max_jobs is None or processed < max_jobs):
+        job = claim(worker, timeout)
+        if job is None:
+            if burst:
+                break
+            stop.wait(poll_interval)
+            continue
+        run_job(job, worker)
+        db.session.remove()
+        processed += 1
+    return processed
+
+
+def prune_jobs(days=7):
+    """Delete finished jobs older than days, with their export files. Returns the count."""
+    cutoff = utcnow() - timedelta(days=days)
+    jobs = db.session.scalars(select(Job).where(Job.status.in_(('done', 'failed')), Job.finished_at < cutoff)).all()
+    for job in jobs:
+        if job.kind == 'export_progress':
+            path = export_path(job.id, json.loads(job.payload).get('format', 'csv'))
+            if os.path.exists(path):
+                os.remove(path)
+    db.session.execute(delete(Job).where(Job.id.in_([job.id for job in jobs])))
+    db.session.commit()
+    return len(jobs)
+
+
+# Handlers
+@handler('purge_account')
+def purge_account(job, payload):
+    """Delete a closed account's rows in chunks, committing between them; safe to rerun."""
+    user_id = payload['user_id']
+    batch_size = current_app.config.get('PURGE_BATCH_SIZE', PURGE_BATCH_SIZE)
+    goal_ids = select(Goal.id).where(Goal.user_id == user_id)
+
+    entries = 0
+    while True:
+        batch = db.session.scalars(
+            select(ProgressEntry.id).where(ProgressEntry.goal_id.in_(goal_ids)).limit(batch_size)
+        ).all()
+        if not batch:
+            break
+        db.session.execute(delete(ProgressEntry).where(ProgressEntry.id.in_(batch)))
+        heartbeat(job)
+        db.session.commit()
+        entries += len(batch)
+
+    db.session.execute(delete(GoalStats).where(GoalStats.goal_id.in_(goal_ids)))
+    db.session.execute(delete(ProgressArchive).where(ProgressArchive.goal_id.in_(goal_ids)))
+    goals = db.session.execute(delete(Goal).where(Goal.user_id == user_id)).rowcount
+    db.session.execute(delete(SyncTombstone).where(SyncTombstone.user_id == user_id))
+    db.session.execute(delete(DigestOutbox).where(DigestOutbox.user_id == user_id))
+    db.session.execute(delete(User).where(User.id == user_id, User.deleted_at.is_not(None)))
+    return {'goals': goals, 'entries': entries}
+
+
+@handler('rebuild_stats')
+def rebuild_stats_job(job, payload):
+    processed = rebuild_stats(goal_ids=payload.get('goal_ids'), batch_size=payload.get('batch_size', 500))
+    return {'goals': processed}
+
+
+@handler('archive_progress')
+def archive_progress_job(job, payload):
+    before = _date(payload.get('before')) or archive_cutoff(current_app.config.get('ARCHIVE_AFTER_DAYS'))
+    if before is None:
+        return {'months': 0, 'entries': 0}
+    months, entries = compact(before, batch_size=payload.get('batch_size', 500))
+    return {'before': before.isoformat(), 'months': months, 'entries': entries}
+
+
+def export_path(job_id, fmt):
+    return os.path.join(current_app.config['EXPORT_DIR'], f'export-{job_id}.{fmt}')
+
+
+@handler('export_progress')
+def export_progress_job(job, payload):
+    fmt = payload.get('format', 'csv')
+    writer, _ = WRITERS[fmt]
+    query = export_query(job.user_id, goal_ids=payload.get('goal_ids'),
+                         start=_date(payload.get('from')), end=_date(payload.get('to')))
+
+    path = export_path(job.id, fmt)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    rows = 0
+
+    def counted(result):
+        nonlocal rows
+        for row in result:
+            rows += 1
+            yield row
+
+    with open(path + '.tmp', 'w', encoding='utf-8', newline='') as f:
+        for chunk in writer(counted(iter_export_rows(query))):
+            f.write(chunk)
+    os.replace(path + '.tmp', path)
+    return {'format': fmt, 'rows': rows, 'bytes': os.path.getsize(path)}
+
+
+def _date(text):
+    return date.fromisoformat(text) if text else None
@@ -0,0 +1,214 @@
+import threading
+import time
+from bisect import bisect_left
+
+from flask import current_app, g, has_request_context, request, template_rendered, before_render_template
+from sqlalchemy import event
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Registry:
+    """Process-local metric store rendered in the Prometheus text format.
+
+    Each gunicorn worker keeps its own numbers; scrape every worker (or run a
+    single one) to see the whole picture.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._help = {}
+
+    def describe(self, name, kind, help_text):
+        self._help[name] = (kind, help_text)
+
+    def observe(self, name, labels, value, buckets):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def inc(self, name, labels, amount=1):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def render(self, gauges=()):
+        lines = []
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+
+        seen = set()
+
+        def header(name):
+            if name not in seen and name in self._help:
+                kind, help_text = self._help[name]
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {kind}')
+            seen.add(name)
+
+        for (name, labels), value in counters:
+            header(name)
+            lines.append(f'{name}{_labels(labels)} {value}')
+
+        for (name, labels), h in histograms:
+            header(name)
+            cumulative = 0
+            for bound, count in zip(h.buckets, h.counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{_labels(labels + (("le", _num(bound)),))} {cumulative}')
+            lines.append(f'{name}_bucket{_labels(labels + (("le", "+Inf"),))} {h.count}')
+            lines.append(f'{name}_sum{_labels(labels)} {_num(h.sum)}')
+            lines.append(f'{name}_count{_labels(labels)} {h.count}')
+
+        for name, kind, help_text, labels, value in gauges:
+            if name not in seen:
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {kind}')
+                seen.add(name)
+            lines.append(f'{name}{_labels(tuple(sorted(labels.items())))} {_num(value)}')
+
+        return '\n'.join(lines) + '\n'
+
+
+def _num(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    escaped = (
+        '{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for k, v in labels
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+class RequestMetrics:
+    """Per-request latency, SQL statement count/time and template render time.
+
+    Config:
+        SLOW_REQUEST_MS          log requests slower than this, with their queries (0 = off)
+        MAX_QUERIES_PER_REQUEST  in debug/testing, fail requests issuing more queries (0 = off)
+    """
+
+    def __init__(self, app=None, db=None):
+        self.registry = Registry()
+        self.gauge_sources = []
+        for name, kind, help_text in (
+            ('http_requests_total', 'counter', 'Requests by endpoint, method and status.'),
+            ('http_request_duration_seconds', 'histogram', 'Request latency by endpoint.'),
+            ('http_request_sql_queries', 'histogram', 'SQL statements issued per request.'),
+            ('http_request_sql_seconds', 'histogram', 'Time spent in SQL per request.'),
+            ('template_render_seconds', 'histogram', 'Jinja render time by template.'),
+        ):
+            self.registry.describe(name, kind, help_text)
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db):
+        app.config.setdefault('SLOW_REQUEST_MS', 0)
+        app.config.setdefault('MAX_QUERIES_PER_REQUEST', 0)
+        app.extensions['request_metrics'] = self
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        before_render_template.connect(self._before_render, app)
+        template_rendered.connect(self._after_render, app)
+
+        # Every bind, so statements served by a read replica are counted too
+        with app.app_context():
+            engines = list(db.engines.values())
+        for engine in engines:
+            event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    def add_gauges(self, source):
+        """Register a callable returning (name, kind, help, labels, value) tuples for /metrics."""
+        self.gauge_sources.append(source)
+
+    def render(self):
+        gauges = [gauge for source in self.gauge_sources for gauge in source()]
+        return self.registry.render(gauges)
+
+    # Request lifecycle
+    def _before_request(self):
+        g._metrics_started = time.perf_counter()
+        g._metrics_queries = []
+
+    def _after_request(self, response):
+        started = g.pop('_metrics_started', None)
+        if started is None:
+            return response
+        elapsed = time.perf_counter() - started
+        queries = g.pop('_metrics_queries', [])
+        sql_seconds = sum(duration for _, duration in queries)
+
+        endpoint = request.endpoint or 'unmatched'
+        labels = {'endpoint': endpoint, 'method': request.method}
+        self.registry.inc('http_requests_total', dict(labels, status=response.status_code))
+        self.registry.observe('http_request_duration_seconds', labels, elapsed, LATENCY_BUCKETS)
+        self.registry.observe('http_request_sql_queries', labels, len(queries), QUERY_COUNT_BUCKETS)
+        self.registry.observe('http_request_sql_seconds', labels, sql_seconds, LATENCY_BUCKETS)
+
+        config = current_app.config
+        slow_ms = config['SLOW_REQUEST_MS']
+        if slow_ms and elapsed * 1000 >= slow_ms:
+            current_app.logger.warning(
+                'Slow request %s %s: %.1f ms, %d queries (%.1f ms)\n%s',
+                request.method, request.path, elapsed * 1000, len(queries), sql_seconds * 1000,
+                '\n'.join(f'  [{duration * 1000:.2f} ms] {statement}' for statement, duration in queries),
+            )
+
+        max_queries = config['MAX_QUERIES_PER_REQUEST']
+        if max_queries and (current_app.debug or current_app.testing) and len(queries) > max_queries:
+            raise AssertionError(
+                f'{request.method} {request.path} issued {len(queries)} queries '
+                f'(MAX_QUERIES_PER_REQUEST={max_queries})'
+            )
+        return response
+
+    # SQLAlchemy events
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('_metrics_started', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info['_metrics_started'].pop()
+        if has_request_context():
+            queries = g.get('_metrics_queries')
+            if queries is not None:
+                queries.append((statement, time.perf_counter() - started))
+
+    # Template signals
+    def _before_render(self, sender, template, context, **extra):
+        g.setdefault('_metrics_renders', []).append(time.perf_counter())
+
+    def _after_render(self, sender, template, context, **extra):
+        renders = g.get('_metrics_renders')
+        if renders:
+            elapsed = time.perf_counter() - renders.pop()
+            self.registry.observe('template_render_seconds', {'template': template.name or 'string'},
+                                  elapsed, LATENCY_BUCKETS)
+
+
+request_metrics = RequestMetrics()
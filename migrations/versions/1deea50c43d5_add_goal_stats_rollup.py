@@ -0,0 +1,40 @@
+"""Add goal_stats rollup table
+
+Revision ID: 1deea50c43d5
+Revises: 55fbd754ce1c
+Create Date: 2026-10-18 09:12:40.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1deea50c43d5'
+down_revision = '55fbd754ce1c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('goal_stats',
+    sa.Column('goal_id', sa.Integer(), nullable=False),
+    sa.Column('total', sa.Float(), nullable=False),
+    sa.Column('entry_count', sa.Integer(), nullable=False),
+    sa.Column('first_date', sa.Date(), nullable=True),
+    sa.Column('last_date', sa.Date(), nullable=True),
+    sa.Column('max_value', sa.Float(), nullable=True),
+    sa.ForeignKeyConstraint(['goal_id'], ['goal.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('goal_id')
+    )
+
+    # Backfill from existing entries; `flask rebuild-stats` does the same in batches
+    op.execute(
+        'INSERT INTO goal_stats (goal_id, total, entry_count, first_date, last_date, max_value) '
+        'SELECT goal_id, SUM(value), COUNT(id), MIN(date), MAX(date), MAX(value) '
+        'FROM progress_entry GROUP BY goal_id'
+    )
+
+
+def downgrade():
+    op.drop_table('goal_stats')
@@ -0,0 +1,58 @@
+"""Change versions and updated_at on goal/progress_entry, sync_tombstone table
+
+Revision ID: 3598d804fa81
+Revises: 6bb61ae06337
+Create Date: 2026-10-18 18:14:08.477533
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3598d804fa81'
+down_revision = '6bb61ae06337'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('user', sa.Column('sync_version', sa.Integer(), server_default='0', nullable=False))
+
+    for table in ('goal', 'progress_entry'):
+        op.add_column(table, sa.Column('version', sa.Integer(), server_default='0', nullable=False))
+        # SQLite only adds columns with a constant default, and rebuilding the
+        # tables in batch mode would cascade-delete their children; backfill instead
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(), server_default='1970-01-01 00:00:00',
+                                       nullable=False))
+        op.execute(f'UPDATE {table} SET updated_at = CURRENT_TIMESTAMP')
+
+    op.create_index('ix_goal_user_id_version', 'goal', ['user_id', 'version'], unique=False)
+    op.create_index('ix_progress_entry_goal_id_version', 'progress_entry', ['goal_id', 'version'], unique=False)
+
+    op.create_table('sync_tombstone',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('goal_id', sa.Integer(), nullable=False),
+    sa.Column('date', sa.Date(), nullable=True),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_sync_tombstone_user_id_version', 'sync_tombstone', ['user_id', 'version'], unique=False)
+    op.create_index('ix_sync_tombstone_goal_id_date', 'sync_tombstone', ['goal_id', 'date'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_sync_tombstone_goal_id_date', table_name='sync_tombstone')
+    op.drop_index('ix_sync_tombstone_user_id_version', table_name='sync_tombstone')
+    op.drop_table('sync_tombstone')
+
+    op.drop_index('ix_progress_entry_goal_id_version', table_name='progress_entry')
+    op.drop_index('ix_goal_user_id_version', table_name='goal')
+    for table in ('progress_entry', 'goal'):
+        op.drop_column(table, 'updated_at')
+        op.drop_column(table, 'version')
+
+    op.drop_column('user', 'sync_version')
@@ -0,0 +1,38 @@
+"""Unique (goal_id, date) index on progress_entry and goal(user_id) index
+
+Revision ID: 6bb61ae06337
+Revises: 1deea50c43d5
+Create Date: 2026-10-18 10:03:52.540917
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6bb61ae06337'
+down_revision = '1deea50c43d5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Older databases may hold several entries for the same day; keep the newest
+    op.execute(
+        'DELETE FROM progress_entry WHERE id NOT IN '
+        '(SELECT MAX(id) FROM progress_entry GROUP BY goal_id, date)'
+    )
+    op.execute('DELETE FROM goal_stats')
+    op.execute(
+        'INSERT INTO goal_stats (goal_id, total, entry_count, first_date, last_date, max_value) '
+        'SELECT goal_id, SUM(value), COUNT(id), MIN(date), MAX(date), MAX(value) '
+        'FROM progress_entry GROUP BY goal_id'
+    )
+
+    op.create_index('ix_progress_entry_goal_id_date', 'progress_entry', ['goal_id', 'date'], unique=True)
+    op.create_index(op.f('ix_goal_user_id'), 'goal', ['user_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_goal_user_id'), table_name='goal')
+    op.drop_index('ix_progress_entry_goal_id_date', table_name='progress_entry')
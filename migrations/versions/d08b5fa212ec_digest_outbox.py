@@ -0,0 +1,37 @@
+"""digest_outbox: daily lagging-goal digests written by `flask digest`
+
+Revision ID: d08b5fa212ec
+Revises: da00afc4f45c
+Create Date: 2026-10-18 18:50:04.488928
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd08b5fa212ec'
+down_revision = 'da00afc4f45c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('digest_outbox',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('digest_date', sa.Date(), nullable=False),
+    sa.Column('payload', sa.Text(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('sent_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_digest_outbox_sent_at', 'digest_outbox', ['sent_at'], unique=False)
+    op.create_index('ix_digest_outbox_user_id_digest_date', 'digest_outbox', ['user_id', 'digest_date'], unique=True)
+
+
+def downgrade():
+    op.drop_index('ix_digest_outbox_user_id_digest_date', table_name='digest_outbox')
+    op.drop_index('ix_digest_outbox_sent_at', table_name='digest_outbox')
+    op.drop_table('digest_outbox')
@@ -0,0 +1,34 @@
+"""progress_archive: monthly summaries of compacted progress entries
+
+Revision ID: da00afc4f45c
+Revises: dd94e3ec06db
+Create Date: 2026-10-18 18:33:39.964721
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'da00afc4f45c'
+down_revision = 'dd94e3ec06db'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('progress_archive',
+    sa.Column('goal_id', sa.Integer(), nullable=False),
+    sa.Column('month', sa.Date(), nullable=False),
+    sa.Column('total', sa.Float(), nullable=False),
+    sa.Column('entry_count', sa.Integer(), nullable=False),
+    sa.Column('first_date', sa.Date(), nullable=False),
+    sa.Column('last_date', sa.Date(), nullable=False),
+    sa.Column('max_value', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['goal_id'], ['goal.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('goal_id', 'month')
+    )
+
+
+def downgrade():
+    op.drop_table('progress_archive')
@@ -0,0 +1,48 @@
+"""job table for the background queue, user.deleted_at
+
+Revision ID: dd94e3ec06db
+Revises: 3598d804fa81
+Create Date: 2026-10-18 18:24:26.723591
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'dd94e3ec06db'
+down_revision = '3598d804fa81'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('job',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=50), nullable=False),
+    sa.Column('payload', sa.Text(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('max_attempts', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('run_at', sa.DateTime(), nullable=False),
+    sa.Column('locked_at', sa.DateTime(), nullable=True),
+    sa.Column('locked_by', sa.String(length=100), nullable=True),
+    sa.Column('result', sa.Text(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_job_status_run_at', 'job', ['status', 'run_at'], unique=False)
+    op.create_index('ix_job_user_id', 'job', ['user_id'], unique=False)
+
+    op.add_column('user', sa.Column('deleted_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('user', 'deleted_at')
+
+    op.drop_index('ix_job_user_id', table_name='job')
+    op.drop_index('ix_job_status_run_at', table_name='job')
+    op.drop_table('job')
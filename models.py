@@ -1,40 +1,211 @@
 #models.py
+from flask import g
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
 
-from sqlalchemy.orm import relationship
-from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey
+from sqlalchemy.orm import relationship, make_transient_to_detached
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, Text, ForeignKey, Index, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from datetime import datetime, timezone
 
-db = SQLAlchemy()
+from passwords import password_hasher, password_stamp
+from replica import RoutingSession
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+def insert_for(table, dialect=None):
+    """Dialect-specific INSERT that supports on_conflict_do_update/do_nothing.
+
+    dialect defaults to the one bound to db.session.
+    """
+    table = getattr(table, '__table__', table)
+    dialect = dialect or db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        return postgresql.insert(table)
+    if dialect == 'sqlite':
+        return sqlite.insert(table)
+    raise NotImplementedError(f'Upserts are not supported on {dialect}')
+
+def utcnow():
+    """Naive UTC timestamp, as stored in the updated_at columns."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def claim_version_stmt(user_id):
+    table = User.__table__
+    return (
+        update(table)
+        .where(table.c.id == user_id)
+        .values(sync_version=table.c.sync_version + 1)
+        .returning(table.c.sync_version)
+    )
+
+def claim_version(user_id, session=None):
+    """Take the user's next change version (see sync.py) for the current transaction.
+
+    The UPDATE keeps the user row locked until commit, so a user's changes
+    commit in version order and a sync cursor never skips one still in flight.
+    """
+    return (session or db.session).execute(claim_version_stmt(user_id)).scalar_one()
+
+def data_version(user_id, bind=None):
+    """The user's committed change version, read from the primary (or bind).
+
+    Every goal and progress write claims a new one in its own transaction, so
+    it changes exactly when the user's data does, for every worker and process.
+    """
+    return db.session.execute(select(User.sync_version).where(User.id == user_id),
+                              bind_arguments={'bind': bind or db.engine}).scalar()
+
+def request_data_version(user_id):
+    """data_version() read once per request, so the replica check and the report cache agree."""
+    versions = g.setdefault('data_versions', {})
+    if user_id not in versions:
+        versions[user_id] = data_version(user_id)
+    return versions[user_id]
 
 class User(UserMixin, db.Model):
     id = Column(Integer, primary_key=True)
     name = Column(String(512), nullable=False)
     email = Column(String(1024), unique=True, nullable=False)
     password_hash = Column(String(512), nullable=False)
+    # Last change version handed out for this user's goals and entries (see sync.py)
+    sync_version = Column(Integer, nullable=False, default=0, server_default='0')
+    # Set when the account is closed; the purge_account job removes the rows later
+    deleted_at = Column(DateTime)
 
     goals = relationship('Goal', backref='user', lazy=True, cascade='all, delete-orphan')
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hasher.hash(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return password_hasher.verify(self.password_hash, password)
+
+    def rehash_password(self, password):
+        """After a successful check: re-hash if PASSWORD_HASH_METHOD has changed. Returns True if it did."""
+        if not password_hasher.needs_rehash(self.password_hash):
+            return False
+        self.password_hash = password_hasher.rehash(password)
+        return True
+
+    # Identity snapshot for the user_loader cache; the password hash stays out of it
+    def snapshot(self):
+        return {'id': self.id, 'name': self.name, 'email': self.email,
+                'deleted_at': self.deleted_at, 'password_stamp': password_stamp(self.password_hash)}
+
+    @classmethod
+    def from_snapshot(cls, data):
+        """A detached User for current_user.
+
+        Merge it into the session with load=False: the other columns and the
+        relationships then load on first access, as on a queried User.
+        """
+        user = cls(id=data['id'], name=data['name'], email=data['email'], deleted_at=data['deleted_at'])
+        make_transient_to_detached(user)
+        return user
 
 class Goal(db.Model):
+    __table_args__ = (
+        Index('ix_goal_user_id_version', 'user_id', 'version'),
+    )
+
     id = Column(Integer, primary_key=True)
     title = Column(String(100), nullable=False)
     total_units = Column(Float, nullable=False)
     daily_target = Column(Float, nullable=False)
     target_date = Column(Date, nullable=False)
+    version = Column(Integer, nullable=False, default=0, server_default='0')
+    updated_at = Column(DateTime, nullable=False, default=utcnow)
 
-    user_id = Column(Integer, ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    user_id = Column(Integer, ForeignKey('user.id', ondelete='CASCADE'), nullable=False, index=True)
     progress_entries = relationship('ProgressEntry', backref='goal', lazy=True, cascade='all, delete-orphan')
+    stats = relationship('GoalStats', uselist=False, lazy=True, cascade='all, delete-orphan')
+    archived_months = relationship('ProgressArchive', lazy=True, cascade='all, delete-orphan')
 
 class ProgressEntry(db.Model):
+    __table_args__ = (
+        Index('ix_progress_entry_goal_id_date', 'goal_id', 'date', unique=True),
+        Index('ix_progress_entry_goal_id_version', 'goal_id', 'version'),
+    )
+
     id = Column(Integer, primary_key=True)
     date = Column(Date, nullable=False)
     value = Column(Float, nullable=False)
+    version = Column(Integer, nullable=False, default=0, server_default='0')
+    updated_at = Column(DateTime, nullable=False, default=utcnow)
+
+    goal_id = Column(Integer, ForeignKey('goal.id', ondelete='CASCADE'), nullable=False)
+
+# Per-goal rollup of progress_entry, kept up to date by progress.record_progress
+class GoalStats(db.Model):
+    __tablename__ = 'goal_stats'
+
+    goal_id = Column(Integer, ForeignKey('goal.id', ondelete='CASCADE'), primary_key=True)
+    total = Column(Float, nullable=False, default=0)
+    entry_count = Column(Integer, nullable=False, default=0)
+    first_date = Column(Date)
+    last_date = Column(Date)
+    max_value = Column(Float)
+
+# One month of a goal's entries, compacted out of progress_entry by archive.compact
+class ProgressArchive(db.Model):
+    __tablename__ = 'progress_archive'
+
+    goal_id = Column(Integer, ForeignKey('goal.id', ondelete='CASCADE'), primary_key=True)
+    month = Column(Date, primary_key=True)  # first day of the month
+    total = Column(Float, nullable=False)
+    entry_count = Column(Integer, nullable=False)
+    first_date = Column(Date, nullable=False)
+    last_date = Column(Date, nullable=False)
+    max_value = Column(Float, nullable=False)
+
+# A deleted goal (date is NULL) or progress entry, kept so sync clients learn about it
+class SyncTombstone(db.Model):
+    __tablename__ = 'sync_tombstone'
+    __table_args__ = (
+        Index('ix_sync_tombstone_user_id_version', 'user_id', 'version'),
+        Index('ix_sync_tombstone_goal_id_date', 'goal_id', 'date'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    goal_id = Column(Integer, nullable=False)
+    date = Column(Date)
+    version = Column(Integer, nullable=False)
+    updated_at = Column(DateTime, nullable=False, default=utcnow)
+
+# Background work run by `flask worker` (see jobs.py)
+class Job(db.Model):
+    __table_args__ = (
+        Index('ix_job_status_run_at', 'status', 'run_at'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(String(50), nullable=False)
+    payload = Column(Text, nullable=False, default='{}')
+    status = Column(String(20), nullable=False, default='queued')  # queued | running | done | failed
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    user_id = Column(Integer, index=True)  # no FK: purge jobs outlive their user
+    run_at = Column(DateTime, nullable=False, default=utcnow)
+    locked_at = Column(DateTime)
+    locked_by = Column(String(100))
+    result = Column(Text)
+    error = Column(Text)
+    created_at = Column(DateTime, nullable=False, default=utcnow)
+    finished_at = Column(DateTime)
+
+# One user's daily list of lagging goals, written by `flask digest` for a mailer to send
+class DigestOutbox(db.Model):
+    __tablename__ = 'digest_outbox'
+    __table_args__ = (
+        Index('ix_digest_outbox_user_id_digest_date', 'user_id', 'digest_date', unique=True),
+        Index('ix_digest_outbox_sent_at', 'sent_at'),
+    )
 
-    goal_id = Column(Integer, ForeignKey('goal.id', ondelete='CASCADE'), nullable=False)
\ No newline at end of file
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    digest_date = Column(Date, nullable=False)
+    payload = Column(Text, nullable=False)  # JSON: {"goals": [...]}
+    created_at = Column(DateTime, nullable=False, default=utcnow)
+    sent_at = Column(DateTime)
@@ -0,0 +1,71 @@
+"""Password hashing with configurable cost.
+
+PASSWORD_HASH_METHOD takes werkzeug method strings, e.g. 'scrypt:32768:8:1'
+(n:r:p) or 'pbkdf2:sha256:600000'. Hashes made with other parameters still
+verify; needs_rehash() tells the login views to re-hash them with the current
+ones while the plaintext is at hand.
+"""
+import hashlib
+import time
+
+from werkzeug.security import generate_password_hash, check_password_hash, DEFAULT_PBKDF2_ITERATIONS
+
+from metrics import request_metrics
+
+DEFAULT_METHOD = 'scrypt:32768:8:1'
+HASH_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+request_metrics.registry.describe('password_hash_seconds', 'histogram', 'Password hash time by operation.')
+request_metrics.registry.describe('password_rehashes_total', 'counter', 'Passwords re-hashed with new parameters.')
+
+
+def normalize_method(method):
+    """Spell out werkzeug's defaults so stored hash prefixes can be compared."""
+    name, *args = method.split(':')
+    if name == 'scrypt':
+        n, r, p = (args + ['32768', '8', '1'][len(args):])[:3]
+        return f'scrypt:{int(n)}:{int(r)}:{int(p)}'
+    if name == 'pbkdf2':
+        digest, iterations = (args + ['sha256', str(DEFAULT_PBKDF2_ITERATIONS)][len(args):])[:2]
+        return f'pbkdf2:{digest}:{int(iterations)}'
+    raise ValueError(f'Unsupported PASSWORD_HASH_METHOD {method!r}')
+
+
+def password_stamp(password_hash):
+    """Changes whenever the password does; sessions and API tokens carry it to be revoked with it."""
+    return hashlib.sha256(password_hash.encode()).hexdigest()[:16]
+
+
+class PasswordHasher:
+    def __init__(self, method=DEFAULT_METHOD):
+        self.method = normalize_method(method)
+
+    def init_app(self, app):
+        self.configure(app.config)
+
+    def configure(self, config):
+        self.method = normalize_method(config.get('PASSWORD_HASH_METHOD') or DEFAULT_METHOD)
+
+    def _timed(self, op, func, *args):
+        started = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            request_metrics.registry.observe('password_hash_seconds', {'op': op},
+                                             time.perf_counter() - started, HASH_BUCKETS)
+
+    def hash(self, password):
+        return self._timed('hash', generate_password_hash, password, self.method)
+
+    def verify(self, password_hash, password):
+        return self._timed('verify', check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        return password_hash.split('$', 1)[0] != self.method
+
+    def rehash(self, password):
+        request_metrics.registry.inc('password_rehashes_total', {})
+        return self.hash(password)
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,192 @@
+from datetime import datetime
+
+from sqlalchemy import select, func, case, and_, or_, exists, union_all
+
+from models import db, insert_for, utcnow, claim_version, Goal, GoalStats, ProgressArchive, ProgressEntry
+
+# Items accepted in one batch submission (dashboard form or POST /api/v1/progress)
+MAX_BATCH_SIZE = 500
+
+
+class ArchivedDateError(ValueError):
+    def __init__(self):
+        super().__init__('این ماه بایگانی شده است و پیشرفت آن قابل تغییر نیست.')
+
+
+def batch_too_large_message():
+    return f'حداکثر {MAX_BATCH_SIZE} مورد در هر درخواست قابل ثبت است.'
+
+
+def _rollup_lock(goal_id, dialect=None):
+    """Create the goal's goal_stats row if needed and lock it until commit.
+
+    Run as its own statement before _rollup_upsert: a second writer of the same
+    goal waits here, and on PostgreSQL (READ COMMITTED) its next statement then
+    starts with a snapshot that includes the first writer's entry. Without it,
+    two first submissions for the same day would both read "no previous value"
+    and both add theirs to the rollup.
+    """
+    gs = GoalStats.__table__
+    stmt = insert_for(gs, dialect).values(goal_id=goal_id, total=0, entry_count=0)
+    return stmt.on_conflict_do_update(index_elements=[gs.c.goal_id], set_={'goal_id': stmt.excluded.goal_id})
+
+
+def _rollup_upsert(goal_id, entry_date, value, dialect=None):
+    """INSERT ... ON CONFLICT for goal_stats that folds in one day's value.
+
+    It runs after _rollup_lock and before the entry itself is written, so the
+    correlated subquery on progress_entry sees the previous value for that day
+    (NULL when the day is new) on both SQLite and PostgreSQL, and RETURNING
+    hands it back. If the day's month is archived the update is skipped and no
+    row comes back.
+    """
+    pe = ProgressEntry.__table__
+    gs = GoalStats.__table__
+    pa = ProgressArchive.__table__
+
+    old = (
+        select(pe.c.value)
+        .where(pe.c.goal_id == goal_id, pe.c.date == entry_date)
+        .scalar_subquery()
+    )
+    others = union_all(
+        select(pe.c.value).where(pe.c.goal_id == goal_id, pe.c.date != entry_date),
+        select(pa.c.max_value).where(pa.c.goal_id == goal_id),
+    ).subquery()
+    other_max = select(func.max(others.c.value)).scalar_subquery()
+    archived = exists().where(pa.c.goal_id == goal_id, pa.c.month == entry_date.replace(day=1))
+
+    stmt = insert_for(gs, dialect).values(
+        goal_id=goal_id, total=value, entry_count=1,
+        first_date=entry_date, last_date=entry_date, max_value=value,
+    )
+    return stmt.on_conflict_do_update(
+        index_elements=[gs.c.goal_id],
+        set_={
+            'total': gs.c.total + value - func.coalesce(old, 0),
+            'entry_count': gs.c.entry_count + case((old.is_(None), 1), else_=0),
+            'first_date': case(
+                (or_(gs.c.first_date.is_(None), gs.c.first_date > entry_date), entry_date),
+                else_=gs.c.first_date,
+            ),
+            'last_date': case(
+                (or_(gs.c.last_date.is_(None), gs.c.last_date < entry_date), entry_date),
+                else_=gs.c.last_date,
+            ),
+            'max_value': case(
+                (or_(gs.c.max_value.is_(None), gs.c.max_value <= value), value),
+                # The previous maximum is being lowered: fall back to the other days
+                (and_(old.is_not(None), old >= gs.c.max_value),
+                 case((func.coalesce(other_max, value) > value, other_max), else_=value)),
+                else_=gs.c.max_value,
+            ),
+        },
+        where=~archived,
+    ).returning(old)
+
+
+def upsert_statements(goal_id, entry_date, value, version, updated_at=None, dialect=None):
+    """The three statements behind record_progress, in execution order.
+
+    The first locks the goal's rollup. The second returns a row holding the
+    day's previous value, or no row if the month is archived, in which case the
+    third must not run. Exposed so async callers can run them on their own
+    connection.
+    """
+    stmt = insert_for(ProgressEntry, dialect).values(
+        goal_id=goal_id, date=entry_date, value=value, version=version, updated_at=updated_at or utcnow(),
+    )
+    entry_upsert = stmt.on_conflict_do_update(
+        index_elements=['goal_id', 'date'],
+        set_={'value': stmt.excluded.value, 'version': stmt.excluded.version,
+              'updated_at': stmt.excluded.updated_at},
+    )
+    return _rollup_lock(goal_id, dialect), _rollup_upsert(goal_id, entry_date, value, dialect), entry_upsert
+
+
+def record_progress(goal_id, entry_date, value, version):
+    """Upsert one day's entry and its rollup without a read-then-write round trip.
+
+    version comes from sync.claim_version for the goal's owner. Returns the value
+    previously stored for that day, or None if the entry is new. The caller owns
+    the transaction. Raises ArchivedDateError, with nothing written, for a day in
+    an archived month.
+    """
+    rollup_lock, rollup_upsert, entry_upsert = upsert_statements(goal_id, entry_date, value, version)
+    db.session.execute(rollup_lock)
+    row = db.session.execute(rollup_upsert).first()
+    if row is None:
+        raise ArchivedDateError()
+    db.session.execute(entry_upsert)
+    return row[0]
+
+
+def parse_entry(date_str, value_str):
+    """Validate one submitted (date, value) pair; raises ValueError with a user-facing message."""
+    if not date_str or value_str in (None, ''):
+        raise ValueError('لطفاً همه فیلدها را پر کنید.')
+    try:
+        entry_date = datetime.strptime(str(date_str), '%Y-%m-%d').date()
+        value = float(value_str)
+    except (TypeError, ValueError):
+        raise ValueError('فرمت تاریخ یا مقدار پیشرفت اشتباه است.') from None
+    if value != value or value < 0:
+        raise ValueError('مقدار پیشرفت نمی‌تواند منفی باشد.')
+    return entry_date, value
+
+
+def owned_goals_query(user_id, goal_ids):
+    return select(Goal.id).where(Goal.id.in_(goal_ids), Goal.user_id == user_id)
+
+
+def _is_goal_id(value):
+    # JSON true/false are ints to Python (true == 1); they are not goal ids
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def batch_goal_ids(items):
+    return {goal_id for goal_id, _, _ in items if _is_goal_id(goal_id)}
+
+
+def validate_item(goal_id, date_str, value_str, owned):
+    """Check one batch item; returns (result dict, (date, value) or None)."""
+    result = {'goal_id': goal_id, 'date': date_str}
+    if not _is_goal_id(goal_id) or goal_id not in owned:
+        result.update(status='error', error='هدف پیدا نشد.')
+        return result, None
+    try:
+        entry = parse_entry(date_str, value_str)
+    except ValueError as e:
+        result.update(status='error', error=str(e))
+        return result, None
+    return result, entry
+
+
+def record_batch(user_id, items):
+    """Validate and upsert several (goal_id, date, value) submissions in one transaction.
+
+    Ownership of every goal is checked with a single IN query. Returns one result
+    dict per item; invalid items are reported and skipped, the rest are written
+    and committed together.
+    """
+    goal_ids = batch_goal_ids(items)
+    owned = set(db.session.scalars(owned_goals_query(user_id, goal_ids))) if goal_ids else set()
+
+    results = []
+    version = None
+    for goal_id, date_str, value_str in items:
+        result, entry = validate_item(goal_id, date_str, value_str, owned)
+        if entry is not None:
+            if version is None:
+                version = claim_version(user_id)
+            try:
+                old_value = record_progress(goal_id, *entry, version)
+            except ArchivedDateError as e:
+                result.update(status='error', error=str(e))
+            else:
+                result.update(status='updated' if old_value is not None else 'created', value=entry[1])
+        results.append(result)
+
+    if any(r['status'] != 'error' for r in results):
+        db.session.commit()
+    return results
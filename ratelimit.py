@@ -0,0 +1,172 @@
+"""Sliding-window rate limits for the endpoints that check passwords.
+
+Every attempt is counted per client IP and per account (email) before the
+password hash is computed, so a credential-stuffing burst is turned away for
+the price of a counter update. A limit of N per W seconds is enforced as a
+sliding window approximated from two fixed windows: the current window's
+count plus the previous window's, weighted by how much of it the sliding
+window still covers.
+
+Config:
+    RATELIMIT_BACKEND   memory (per worker), sqlite (shared by all workers on the host) or none
+    RATELIMIT_PATH      SQLite file for the sqlite backend
+    RATELIMIT_IP        attempts per client IP, as 'count/seconds'
+    RATELIMIT_ACCOUNT   attempts per account, as 'count/seconds'
+"""
+import math
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from metrics import request_metrics
+
+DEFAULT_LIMITS = {'ip': '20/60', 'account': '10/300'}
+MEMORY_MAX_KEYS = 100000
+PRUNE_EVERY = 1000
+
+request_metrics.registry.describe('ratelimit_rejections_total', 'counter', 'Requests rejected by a rate limit.')
+
+
+def parse_limit(text):
+    """'20/60' -> (20, 60)."""
+    try:
+        count, seconds = (int(part) for part in str(text).split('/'))
+    except ValueError:
+        raise ValueError(f'Invalid rate limit {text!r}; expected count/seconds') from None
+    if count < 1 or seconds < 1:
+        raise ValueError(f'Invalid rate limit {text!r}; expected count/seconds')
+    return count, seconds
+
+
+def _roll(stored, window):
+    """(count, previous) for window given the stored (window, count, previous)."""
+    if stored is None:
+        return 0, 0
+    stored_window, count, previous = stored
+    if stored_window == window:
+        return count, previous
+    if stored_window == window - 1:
+        return 0, count
+    return 0, 0
+
+
+class MemoryCounters:
+    """Per-process counters; least recently used keys are dropped past max_keys."""
+
+    def __init__(self, max_keys=MEMORY_MAX_KEYS):
+        self.max_keys = max_keys
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def incr(self, key, window, seconds):
+        with self._lock:
+            count, previous = _roll(self._data.get(key), window)
+            self._data[key] = (window, count + 1, previous)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_keys:
+                self._data.popitem(last=False)
+        return count + 1, previous
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class SQLiteCounters:
+    """Counters in a local SQLite file, shared by every worker process on the host."""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._calls = 0
+        self._connect().execute(
+            'CREATE TABLE IF NOT EXISTS rate_limit ('
+            'key TEXT PRIMARY KEY, bucket INTEGER NOT NULL, count INTEGER NOT NULL, '
+            'previous INTEGER NOT NULL, expires REAL NOT NULL)'
+        )
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def incr(self, key, window, seconds):
+        now = time.time()
+        conn = self._connect()
+        # SET expressions see the old row, so count/previous roll over in one statement
+        count, previous = conn.execute(
+            'INSERT INTO rate_limit (key, bucket, count, previous, expires) VALUES (?, ?, 1, 0, ?) '
+            'ON CONFLICT (key) DO UPDATE SET '
+            'previous = CASE WHEN bucket = excluded.bucket THEN previous '
+            'WHEN bucket = excluded.bucket - 1 THEN count ELSE 0 END, '
+            'count = CASE WHEN bucket = excluded.bucket THEN count + 1 ELSE 1 END, '
+            'bucket = excluded.bucket, expires = excluded.expires '
+            'RETURNING count, previous',
+            (key, window, now + 2 * seconds),
+        ).fetchone()
+        self._calls += 1
+        if self._calls % PRUNE_EVERY == 0:
+            conn.execute('DELETE FROM rate_limit WHERE expires < ?', (now,))
+        return count, previous
+
+    def clear(self):
+        self._connect().execute('DELETE FROM rate_limit')
+
+
+class RateLimiter:
+    def __init__(self, app=None):
+        self.counters = None
+        self.limits = {name: parse_limit(text) for name, text in DEFAULT_LIMITS.items()}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.configure(app.config)
+        app.extensions['rate_limiter'] = self
+
+    def configure(self, config):
+        backend = config.get('RATELIMIT_BACKEND', 'memory')
+        if backend == 'sqlite':
+            self.counters = SQLiteCounters(config['RATELIMIT_PATH'])
+        elif backend == 'memory':
+            self.counters = MemoryCounters()
+        elif backend == 'none':
+            self.counters = None
+        else:
+            raise ValueError(f'Unknown RATELIMIT_BACKEND {backend!r}')
+        self.limits = {
+            name: parse_limit(config.get(f'RATELIMIT_{name.upper()}') or default)
+            for name, default in DEFAULT_LIMITS.items()
+        }
+
+    def _hit(self, name, key, now):
+        limit, seconds = self.limits[name]
+        window = int(now // seconds)
+        count, previous = self.counters.incr(f'{name}:{key}', window, seconds)
+        overlap = 1 - (now % seconds) / seconds
+        if count + previous * overlap > limit:
+            return max(1, math.ceil(seconds - now % seconds))
+        return None
+
+    def hit(self, ip=None, account=None):
+        """Count one attempt; returns seconds to wait if any limit is exceeded, else None."""
+        if self.counters is None:
+            return None
+        now = time.time()
+        waits = []
+        for name, key in (('ip', ip), ('account', account and account.strip().lower())):
+            if not key:
+                continue
+            wait = self._hit(name, key, now)
+            if wait is not None:
+                request_metrics.registry.inc('ratelimit_rejections_total', {'limit': name})
+                waits.append(wait)
+        return max(waits) if waits else None
+
+
+rate_limiter = RateLimiter()
@@ -0,0 +1,83 @@
+"""Optional read replica for the read-only views.
+
+With DATABASE_REPLICA_URL set, the replica is registered as the 'replica'
+Flask-SQLAlchemy bind and RoutingSession sends plain SELECTs issued inside a
+@replica_reads view (dashboard, report, series, export) to it. Everything else
+goes to the primary: writes, flushes, SELECT ... FOR UPDATE, and any read after
+the request has written.
+
+Read-your-writes: every write to a user's data claims a new user.sync_version
+in its transaction, from the web views, the JSON API (Flask or ASGI), sync and
+imports alike. A @replica_reads view reads that version on both databases and
+uses the replica only when it has replayed the user's latest write, so a
+submitted value never disappears, and a report cached under the version was
+built from data at least that new. The check is server-side, so it holds
+across workers, hosts and clients without shared state.
+
+Both URLs must use the same dialect. Locally, two SQLite files work: copy the
+database to the replica path; writes land only in the primary file.
+"""
+from functools import wraps
+
+from flask import g, has_app_context
+from flask_login import current_user
+from flask_sqlalchemy.session import Session
+
+from metrics import request_metrics
+
+BIND_KEY = 'replica'
+
+request_metrics.registry.describe('replica_requests_total', 'counter',
+                                  'Read-only requests by the database that served them.')
+
+
+def replica_bind(database_url, options):
+    """SQLALCHEMY_BINDS entry for the replica."""
+    return dict(options, url=database_url)
+
+
+def _is_plain_select(clause):
+    return getattr(clause, 'is_select', False) and getattr(clause, '_for_update_arg', None) is None
+
+
+class RoutingSession(Session):
+    """Flask-SQLAlchemy session that can route reads to the replica bind."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_app_context():
+            if self._flushing or getattr(clause, 'is_dml', False):
+                g.db_wrote = True
+            elif g.get('read_replica') and not g.get('db_wrote') and _is_plain_select(clause):
+                return self._db.engines[BIND_KEY]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+class ReplicaRouter:
+    def __init__(self):
+        self.enabled = False
+
+    def init_app(self, app):
+        self.enabled = BIND_KEY in app.config.get('SQLALCHEMY_BINDS', {})
+        app.extensions['replica_router'] = self
+
+    def use_replica(self, user_id):
+        """Whether this request's reads may go to the replica: it has the user's latest write."""
+        from models import db, data_version, request_data_version  # models imports this module
+        if not self.enabled:
+            return False
+        return data_version(user_id, db.engines[BIND_KEY]) == request_data_version(user_id)
+
+
+replica_router = ReplicaRouter()
+
+
+def replica_reads(view):
+    """Serve the view's plain SELECTs from the replica once it has the user's latest write."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if replica_router.enabled:
+            g.read_replica = replica_router.use_replica(current_user.id)
+            request_metrics.registry.inc('replica_requests_total',
+                                         {'target': 'replica' if g.read_replica else 'primary'})
+        return view(*args, **kwargs)
+    return wrapper
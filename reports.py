@@ -0,0 +1,191 @@
+from collections import namedtuple
+from datetime import date
+
+import numpy as np
+from sqlalchemy import select, func, union_all
+from sqlalchemy.orm import aliased
+
+from analytics import day_number
+from jalali import jalali_table
+from models import db, Goal, GoalStats, ProgressArchive, ProgressEntry
+
+# Lightweight report rows: nothing here is attached to the session
+Entry = namedtuple('Entry', ['date', 'value'])
+GoalReport = namedtuple('GoalReport', [
+    'id', 'title', 'total_units', 'daily_target', 'target_date',
+    'total_progress', 'active_days', 'average_daily_progress',
+    'completion_percentage', 'last_entry',
+])
+DashboardRow = namedtuple('DashboardRow', [
+    'id', 'title', 'total_units', 'daily_target', 'target_date',
+    'today_value', 'total_progress', 'completion_percentage',
+])
+
+BUCKETS = ('day', 'week', 'month', 'jweek', 'jmonth', 'jyear')
+# Chart label per bucket, from the Jalali (year, month, day) of its first day
+LABELS = {'jmonth': '{:04d}/{:02d}', 'jyear': '{:04d}'}
+
+
+def report_query(user_id):
+    """The user's goals joined to their goal_stats rollup: O(goals), not O(entries)."""
+    # Latest entry per goal, resolved inside the same round trip
+    latest = (
+        select(ProgressEntry.id)
+        .where(ProgressEntry.goal_id == Goal.id)
+        .order_by(ProgressEntry.date.desc(), ProgressEntry.id.desc())
+        .limit(1)
+        .correlate(Goal)
+        .scalar_subquery()
+    )
+    last_entry = aliased(ProgressEntry)
+    # Archived months are all older than the raw entries; their day's value is not kept
+    last_archived = (
+        select(func.max(ProgressArchive.last_date))
+        .where(ProgressArchive.goal_id == Goal.id)
+        .correlate(Goal)
+        .scalar_subquery()
+    )
+
+    return (
+        select(
+            Goal.id, Goal.title, Goal.total_units, Goal.daily_target, Goal.target_date,
+            func.coalesce(GoalStats.total, 0.0).label('total_progress'),
+            func.coalesce(GoalStats.entry_count, 0).label('active_days'),
+            func.coalesce(last_entry.date, last_archived).label('last_date'),
+            last_entry.value.label('last_value'),
+        )
+        .outerjoin(GoalStats, GoalStats.goal_id == Goal.id)
+        .outerjoin(last_entry, last_entry.id == latest)
+        .where(Goal.user_id == user_id)
+        .order_by(Goal.id)
+    )
+
+
+def make_report_row(row):
+    total_progress = float(row.total_progress or 0)
+    active_days = int(row.active_days or 0)
+
+    if row.total_units > 0:
+        completion_percentage = min(100, (total_progress / row.total_units) * 100)
+    else:
+        completion_percentage = 0
+    average = total_progress / active_days if active_days > 0 else 0
+    last = Entry(row.last_date, row.last_value) if row.last_date is not None else None
+
+    return GoalReport(
+        id=row.id,
+        title=row.title,
+        total_units=row.total_units,
+        daily_target=row.daily_target,
+        target_date=row.target_date,
+        total_progress=total_progress,
+        active_days=active_days,
+        average_daily_progress=average,
+        completion_percentage=completion_percentage,
+        last_entry=last,
+    )
+
+
+def build_report(user_id):
+    return [make_report_row(r) for r in db.session.execute(report_query(user_id))]
+
+
+def dashboard_query(user_id, today):
+    """Goals with their rollup total and today's entry, if any: one indexed lookup per goal."""
+    today_entry = aliased(ProgressEntry)
+    return (
+        select(
+            Goal.id, Goal.title, Goal.total_units, Goal.daily_target, Goal.target_date,
+            today_entry.value.label('today_value'),
+            func.coalesce(GoalStats.total, 0.0).label('total_progress'),
+        )
+        .outerjoin(GoalStats, GoalStats.goal_id == Goal.id)
+        .outerjoin(today_entry, (today_entry.goal_id == Goal.id) & (today_entry.date == today))
+        .where(Goal.user_id == user_id)
+        .order_by(Goal.id)
+    )
+
+
+def build_dashboard(user_id, today=None):
+    rows = db.session.execute(dashboard_query(user_id, today or date.today()))
+    return [
+        DashboardRow(
+            *row[:6], total_progress=float(row.total_progress),
+            completion_percentage=min(100, row.total_progress / row.total_units * 100) if row.total_units > 0 else 0,
+        )
+        for row in rows
+    ]
+
+
+def bucket_starts(ordinals, bucket):
+    """First day (as an ordinal) of the bucket holding each ordinal in a NumPy array."""
+    if bucket == 'week':
+        return ordinals - (ordinals - 1) % 7
+    if bucket == 'month':
+        days = (ordinals - 1).astype('timedelta64[D]') + np.datetime64('0001-01-01')
+        return (days.astype('datetime64[M]').astype('datetime64[D]') - np.datetime64('0001-01-01')).astype(np.int64) + 1
+    if bucket in ('jweek', 'jmonth', 'jyear'):
+        return jalali_table.bucket_start(ordinals, bucket)
+    return ordinals
+
+
+def goal_series(goal_id, bucket='day'):
+    """Columnar (dates, values) for one goal, summed per Gregorian or Jalali bucket.
+
+    Archived months contribute their total on the month's first day, so they are
+    exact for 'month' and approximate for finer or Jalali buckets.
+    """
+    both = union_all(
+        select(day_number(ProgressEntry.date), ProgressEntry.value)
+        .where(ProgressEntry.goal_id == goal_id),
+        select(day_number(ProgressArchive.month), ProgressArchive.total)
+        .where(ProgressArchive.goal_id == goal_id),
+    ).subquery()
+    # A SELECT around the union: the session only routes SELECTs to the replica
+    rows = db.session.execute(select(both)).all()
+    if not rows:
+        return [], []
+    ordinals = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+    values = np.fromiter((r[1] for r in rows), dtype=np.float64, count=len(rows))
+
+    starts, slot = np.unique(bucket_starts(ordinals, bucket), return_inverse=True)
+    sums = np.bincount(slot, weights=values)
+    return [date.fromordinal(int(o)) for o in starts], sums.tolist()
+
+
+def series_labels(dates, bucket):
+    """Jalali chart labels for bucket start dates."""
+    fmt = LABELS.get(bucket, '{:04d}/{:02d}/{:02d}')
+    return [jalali_table.format(d, fmt) for d in dates]
+
+
+def lttb(dates, values, threshold):
+    """Largest-Triangle-Three-Buckets downsampling to at most `threshold` points."""
+    n = len(values)
+    if threshold >= n or threshold < 3:
+        return dates, values
+
+    xs = [d.toordinal() for d in dates]
+    sampled = [0]
+    every = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        # Average of the next bucket is the third triangle vertex
+        next_start = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        span = next_end - next_start
+        avg_x = sum(xs[next_start:next_end]) / span
+        avg_y = sum(values[next_start:next_end]) / span
+
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs((xs[a] - avg_x) * (values[j] - values[a])
+                       - (xs[a] - xs[j]) * (avg_y - values[a]))
+            if area > best_area:
+                best, best_area = j, area
+        sampled.append(best)
+        a = best
+    sampled.append(n - 1)
+    return [dates[i] for i in sampled], [values[i] for i in sampled]
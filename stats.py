@@ -0,0 +1,123 @@
+from sqlalchemy import select, delete, func, union_all
+
+from models import db, Goal, GoalStats, ProgressArchive, ProgressEntry
+
+
+def _aggregate_query(goal_ids):
+    """Per-goal totals over raw entries and archived months together."""
+    raw = (
+        select(
+            ProgressEntry.goal_id,
+            func.sum(ProgressEntry.value).label('total'),
+            func.count(ProgressEntry.id).label('entry_count'),
+            func.min(ProgressEntry.date).label('first_date'),
+            func.max(ProgressEntry.date).label('last_date'),
+            func.max(ProgressEntry.value).label('max_value'),
+        )
+        .where(ProgressEntry.goal_id.in_(goal_ids))
+        .group_by(ProgressEntry.goal_id)
+    )
+    archived = (
+        select(
+            ProgressArchive.goal_id,
+            func.sum(ProgressArchive.total),
+            func.sum(ProgressArchive.entry_count),
+            func.min(ProgressArchive.first_date),
+            func.max(ProgressArchive.last_date),
+            func.max(ProgressArchive.max_value),
+        )
+        .where(ProgressArchive.goal_id.in_(goal_ids))
+        .group_by(ProgressArchive.goal_id)
+    )
+    both = union_all(raw, archived).subquery()
+    return (
+        select(
+            both.c.goal_id,
+            func.sum(both.c.total),
+            func.sum(both.c.entry_count),
+            func.min(both.c.first_date),
+            func.max(both.c.last_date),
+            func.max(both.c.max_value),
+        )
+        .group_by(both.c.goal_id)
+    )
+
+
+def goal_id_batches(batch_size, goal_ids=None):
+    """Yield lists of goal ids in primary-key order, keyset-paginated."""
+    if goal_ids is not None:
+        goal_ids = sorted(set(goal_ids))
+        for i in range(0, len(goal_ids), batch_size):
+            yield goal_ids[i:i + batch_size]
+        return
+
+    last_id = 0
+    while True:
+        batch = db.session.scalars(
+            select(Goal.id).where(Goal.id > last_id).order_by(Goal.id).limit(batch_size)
+        ).all()
+        if not batch:
+            return
+        yield batch
+        last_id = batch[-1]
+
+
+def _rebuild_batch(batch, session=None):
+    session = session or db.session
+    rows = session.execute(_aggregate_query(batch)).all()
+    session.execute(delete(GoalStats).where(GoalStats.goal_id.in_(batch)))
+    if rows:
+        session.execute(GoalStats.__table__.insert(), [
+            dict(goal_id=r[0], total=r[1], entry_count=r[2],
+                 first_date=r[3], last_date=r[4], max_value=r[5])
+            for r in rows
+        ])
+
+
+def refresh_stats(goal_ids, batch_size=500, session=None):
+    """Recompute the rollups of specific goals inside the caller's transaction."""
+    for batch in goal_id_batches(batch_size, goal_ids):
+        _rebuild_batch(batch, session)
+
+
+def rebuild_stats(goal_ids=None, batch_size=500):
+    """Recompute rollups from progress_entry, committing once per batch.
+
+    Returns the number of goals processed.
+    """
+    processed = 0
+    for batch in goal_id_batches(batch_size, goal_ids):
+        _rebuild_batch(batch)
+        db.session.commit()
+        processed += len(batch)
+    return processed
+
+
+def verify_stats(batch_size=500):
+    """Return the ids of goals whose rollup disagrees with progress_entry."""
+    mismatched = []
+    for batch in goal_id_batches(batch_size):
+        expected = {r[0]: tuple(r[1:]) for r in db.session.execute(_aggregate_query(batch))}
+        stored = {
+            s.goal_id: (s.total, s.entry_count, s.first_date, s.last_date, s.max_value)
+            for s in db.session.scalars(select(GoalStats).where(GoalStats.goal_id.in_(batch)))
+        }
+        for goal_id in batch:
+            want, have = expected.get(goal_id), stored.get(goal_id)
+            if want is None and (have is None or have[1] == 0):
+                continue
+            if want is None or have is None or not _same(want, have):
+                mismatched.append(goal_id)
+        db.session.expunge_all()
+    return mismatched
+
+
+def _same(want, have):
+    total, count, first, last, max_value = want
+    return (
+        abs((total or 0) - (have[0] or 0)) < 1e-6
+        and count == have[1]
+        and first == have[2]
+        and last == have[3]
+        and max_value == have[4]
+    )
@@ -0,0 +1,334 @@
+"""Change tracking for offline clients (/api/v1/sync).
+
+Every write to a user's goals and progress entries is stamped with the next
+value of user.sync_version, and deletes leave a sync_tombstone row. A pull
+returns everything after the client's cursor in (version, kind, id) order, so
+its cost follows the amount of change rather than the size of the history.
+Archived months have no rows to replay, so the first page of an initial pull
+(no cursor) carries them as summaries under 'archived'.
+Pushed edits carry the client's updated_at and win or lose against the stored
+copy by it (last writer wins).
+"""
+from datetime import datetime, timezone
+
+from sqlalchemy import select, update, delete, and_, or_, true, false
+
+from models import db, utcnow, claim_version, Goal, ProgressArchive, ProgressEntry, SyncTombstone
+from progress import ArchivedDateError, parse_entry, upsert_statements
+from stats import refresh_stats
+
+KINDS = ('goal', 'entry', 'deleted')
+START = (-1, 0, 0)
+PAGE_SIZE = 500
+MAX_PAGE_SIZE = 5000
+
+
+# Versions and tombstones
+def touch_goal(goal, session=None):
+    goal.version = claim_version(goal.user_id, session)
+    goal.updated_at = utcnow()
+
+
+def tombstone_goal(goal_id, user_id, version, updated_at=None, session=None):
+    """Record a goal deletion; it supersedes the tombstones of its entries."""
+    session = session or db.session
+    session.execute(delete(SyncTombstone).where(SyncTombstone.goal_id == goal_id, SyncTombstone.user_id == user_id))
+    session.execute(SyncTombstone.__table__.insert().values(
+        user_id=user_id, goal_id=goal_id, date=None, version=version, updated_at=updated_at or utcnow(),
+    ))
+
+
+# Pull
+def format_cursor(key):
+    return '.'.join(map(str, key))
+
+
+def parse_cursor(text):
+    if not text:
+        return START
+    try:
+        version, kind, row_id = map(int, text.split('.'))
+    except ValueError:
+        raise ValueError(f'invalid cursor {text!r}') from None
+    return version, kind, row_id
+
+
+def _after(version_col, id_col, kind, cursor):
+    version, cursor_kind, row_id = cursor
+    if kind > cursor_kind:
+        same_version = true()
+    elif kind == cursor_kind:
+        same_version = id_col > row_id
+    else:
+        same_version = false()
+    return or_(version_col > version, and_(version_col == version, same_version))
+
+
+def change_queries(user_id, cursor, limit=PAGE_SIZE):
+    """Goal, entry and tombstone queries for one page, limit + 1 rows each."""
+    goals = (
+        select(Goal.id, Goal.title, Goal.total_units, Goal.daily_target, Goal.target_date,
+               Goal.version, Goal.updated_at)
+        .where(Goal.user_id == user_id, _after(Goal.version, Goal.id, 0, cursor))
+        .order_by(Goal.version, Goal.id)
+    )
+    entries = (
+        select(ProgressEntry.id, ProgressEntry.goal_id, ProgressEntry.date, ProgressEntry.value,
+               ProgressEntry.version, ProgressEntry.updated_at)
+        .join(Goal, Goal.id == ProgressEntry.goal_id)
+        .where(Goal.user_id == user_id, _after(ProgressEntry.version, ProgressEntry.id, 1, cursor))
+        .order_by(ProgressEntry.version, ProgressEntry.id)
+    )
+    tombstones = (
+        select(SyncTombstone.id, SyncTombstone.goal_id, SyncTombstone.date,
+               SyncTombstone.version, SyncTombstone.updated_at)
+        .where(SyncTombstone.user_id == user_id, _after(SyncTombstone.version, SyncTombstone.id, 2, cursor))
+        .order_by(SyncTombstone.version, SyncTombstone.id)
+    )
+    queries = [query.limit(limit + 1) for query in (goals, entries, tombstones)]
+    if cursor == START:
+        queries.append(archive_query(user_id))
+    return queries
+
+
+def archive_query(user_id):
+    return (
+        select(ProgressArchive.goal_id, ProgressArchive.month, ProgressArchive.total,
+               ProgressArchive.entry_count, ProgressArchive.first_date, ProgressArchive.last_date)
+        .join(Goal, Goal.id == ProgressArchive.goal_id)
+        .where(Goal.user_id == user_id)
+        .order_by(ProgressArchive.goal_id, ProgressArchive.month)
+    )
+
+
+def format_timestamp(value):
+    return value.isoformat() + 'Z'
+
+
+def parse_timestamp(text):
+    try:
+        value = datetime.fromisoformat(str(text))
+    except (TypeError, ValueError):
+        raise ValueError('زمان ویرایش (updated_at) نامعتبر است.') from None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def change_json(kind, row):
+    if kind == 0:
+        return {
+            'type': 'goal', 'id': row.id, 'title': row.title, 'total_units': row.total_units,
+            'daily_target': row.daily_target, 'target_date': row.target_date.isoformat(),
+            'updated_at': format_timestamp(row.updated_at),
+        }
+    if kind == 1:
+        return {
+            'type': 'entry', 'goal_id': row.goal_id, 'date': row.date.isoformat(), 'value': row.value,
+            'updated_at': format_timestamp(row.updated_at),
+        }
+    return {
+        'type': 'deleted', 'goal_id': row.goal_id, 'date': row.date.isoformat() if row.date else None,
+        'updated_at': format_timestamp(row.updated_at),
+    }
+
+
+def archive_json(row):
+    return {
+        'goal_id': row.goal_id, 'month': row.month.isoformat(), 'total': row.total,
+        'entry_count': row.entry_count, 'first_date': row.first_date.isoformat(),
+        'last_date': row.last_date.isoformat(),
+    }
+
+
+def changes_page(results, cursor, limit=PAGE_SIZE):
+    """Merge the rows of change_queries into one page in cursor order.
+
+    Returns {'changes', 'cursor', 'more'}, plus 'archived' on the first page of
+    an initial pull; clients apply the changes in order and send the cursor back
+    as ?since= until more is false.
+    """
+    results, archived = results[:len(KINDS)], results[len(KINDS):]
+    keyed = sorted(
+        ((row.version, kind, row.id), kind, row)
+        for kind, rows in enumerate(results) for row in rows
+    )
+    page = keyed[:limit]
+    data = {
+        'changes': [change_json(kind, row) for _, kind, row in page],
+        'cursor': format_cursor(page[-1][0] if page else cursor),
+        'more': len(keyed) > limit,
+    }
+    if archived:
+        data['archived'] = [archive_json(row) for row in archived[0]]
+    return data
+
+
+# Push
+def _goal_fields(change):
+    try:
+        fields = {
+            'title': str(change['title']).strip(),
+            'total_units': float(change['total_units']),
+            'daily_target': float(change['daily_target']),
+            'target_date': _parse_date(change['target_date']),
+        }
+    except (KeyError, TypeError, ValueError):
+        raise ValueError('اطلاعات هدف نامعتبر است.') from None
+    if not 0 < len(fields['title']) <= 100 or not fields['total_units'] > 0 or not fields['daily_target'] > 0:
+        raise ValueError('اطلاعات هدف نامعتبر است.')
+    return fields
+
+
+def _newest(*stamps):
+    stamps = [s for s in stamps if s is not None]
+    return max(stamps) if stamps else None
+
+
+def _prefetch(session, user_id, changes):
+    """Stored updated_at of every goal, entry and tombstone the changes refer to."""
+    goal_ids = {c.get('goal_id') for c in changes} | {c.get('id') for c in changes if c.get('type') == 'goal'}
+    goal_ids = {g for g in goal_ids if isinstance(g, int)}
+    if not goal_ids:
+        return {}, {}
+    goals = dict(session.execute(
+        select(Goal.id, Goal.updated_at).where(Goal.user_id == user_id, Goal.id.in_(goal_ids))
+    ).all())
+    if not goals:
+        return goals, {}
+
+    entries = {}
+    dates = _change_dates(changes)
+    for goal_id, entry_date, stamp in session.execute(
+            select(ProgressEntry.goal_id, ProgressEntry.date, ProgressEntry.updated_at)
+            .where(ProgressEntry.goal_id.in_(goals), ProgressEntry.date.in_(dates))):
+        entries[(goal_id, entry_date)] = stamp
+    for goal_id, entry_date, stamp in session.execute(
+            select(SyncTombstone.goal_id, SyncTombstone.date, SyncTombstone.updated_at)
+            .where(SyncTombstone.goal_id.in_(goals), SyncTombstone.date.in_(dates))):
+        entries[(goal_id, entry_date)] = _newest(entries.get((goal_id, entry_date)), stamp)
+    return goals, entries
+
+
+def _parse_date(text):
+    try:
+        return datetime.strptime(str(text), '%Y-%m-%d').date()
+    except ValueError:
+        raise ValueError('فرمت تاریخ اشتباه است.') from None
+
+
+def _change_dates(changes):
+    dates = set()
+    for change in changes:
+        try:
+            dates.add(_parse_date(change.get('date')))
+        except ValueError:
+            pass
+    return dates
+
+
+def apply_changes(session, user_id, changes):
+    """Apply pushed changes in order inside the caller's transaction.
+
+    Each change is a goal ({'type': 'goal', 'id' or 'ref', fields...}), an entry
+    ({'type': 'entry', 'goal_id' or 'goal_ref', 'date', 'value'}) or a deletion
+    ({'type': 'deleted', 'goal_id', 'date' or null}), all with the client's
+    'updated_at'. A change older than the stored copy is reported as 'stale' and
+    skipped. Returns one result dict per change; the caller commits.
+    """
+    if not changes:
+        return []
+    dialect = session.get_bind().dialect.name
+    version = claim_version(user_id, session)
+    goals, entries = _prefetch(session, user_id, changes)
+    refs = {}
+    deleted_entries = set()
+
+    results = []
+    for change in changes:
+        kind = change.get('type')
+        result = {'type': kind}
+        try:
+            stamp = parse_timestamp(change.get('updated_at'))
+            if kind == 'goal':
+                fields = _goal_fields(change)
+                if change.get('id') is None:
+                    goal = Goal(user_id=user_id, version=version, updated_at=stamp, **fields)
+                    session.add(goal)
+                    session.flush()
+                    goals[goal.id] = stamp
+                    if change.get('ref') is not None:
+                        refs[str(change['ref'])] = goal.id
+                    result.update(id=goal.id, ref=change.get('ref'), status='created')
+                else:
+                    goal_id = change['id']
+                    result['id'] = goal_id
+                    if goal_id not in goals:
+                        raise ValueError('هدف پیدا نشد.')
+                    if stamp < goals[goal_id]:
+                        result['status'] = 'stale'
+                    else:
+                        session.execute(update(Goal).where(Goal.id == goal_id)
+                                        .values(version=version, updated_at=stamp, **fields))
+                        goals[goal_id] = stamp
+                        result['status'] = 'updated'
+
+            elif kind == 'entry':
+                goal_id = refs.get(str(change['goal_ref'])) if 'goal_ref' in change else change.get('goal_id')
+                result.update(goal_id=goal_id, date=change.get('date'))
+                if goal_id not in goals:
+                    raise ValueError('هدف پیدا نشد.')
+                entry_date, value = parse_entry(change.get('date'), change.get('value'))
+                key = (goal_id, entry_date)
+                if entries.get(key) is not None and stamp < entries[key]:
+                    result['status'] = 'stale'
+                else:
+                    rollup_lock, rollup_upsert, entry_upsert = upsert_statements(
+                        goal_id, entry_date, value, version, updated_at=stamp, dialect=dialect)
+                    session.execute(rollup_lock)
+                    row = session.execute(rollup_upsert).first()
+                    if row is None:
+                        raise ArchivedDateError()
+                    session.execute(entry_upsert)
+                    entries[key] = stamp
+                    result.update(status='updated' if row[0] is not None else 'created', value=value)
+
+            elif kind == 'deleted':
+                goal_id = change.get('goal_id')
+                result.update(goal_id=goal_id, date=change.get('date'))
+                if goal_id not in goals:
+                    raise ValueError('هدف پیدا نشد.')
+                if change.get('date') is None:
+                    if stamp < goals[goal_id]:
+                        result['status'] = 'stale'
+                    else:
+                        # Entries and the rollup go with it through ON DELETE CASCADE
+                        session.execute(delete(Goal).where(Goal.id == goal_id))
+                        tombstone_goal(goal_id, user_id, version, stamp, session)
+                        del goals[goal_id]
+                        deleted_entries.discard(goal_id)
+                        result['status'] = 'deleted'
+                else:
+                    key = (goal_id, _parse_date(change['date']))
+                    if entries.get(key) is not None and stamp < entries[key]:
+                        result['status'] = 'stale'
+                    else:
+                        removed = session.execute(delete(ProgressEntry).where(
+                            ProgressEntry.goal_id == goal_id, ProgressEntry.date == key[1])).rowcount
+                        session.execute(SyncTombstone.__table__.insert().values(
+                            user_id=user_id, goal_id=goal_id, date=key[1], version=version, updated_at=stamp,
+                        ))
+                        entries[key] = stamp
+                        if removed:
+                            deleted_entries.add(goal_id)
+                        result['status'] = 'deleted'
+
+            else:
+                raise ValueError('نوع تغییر نامعتبر است.')
+        except ValueError as e:
+            result.update(status='error', error=str(e))
+        results.append(result)
+
+    if deleted_entries:
+        refresh_stats(deleted_entries, session=session)
+    return results
@@ -0,0 +1,125 @@
+"""Fixtures for the test suite: a fresh SQLite database and app per test."""
+import asyncio
+import json
+
+import pytest
+from sqlalchemy import select, func
+
+from app import create_app
+from models import db, Goal
+
+PASSWORD = 'pass1234x'
+
+
+async def asgi_request(app, method, path, json_body=None, headers=None, client='127.0.0.1'):
+    """One request through an ASGI app; returns (status, headers, decoded JSON body)."""
+    body = b'' if json_body is None else json.dumps(json_body).encode()
+    path, _, query = path.partition('?')
+    scope = {
+        'type': 'http', 'method': method, 'path': path, 'query_string': query.encode(),
+        'headers': [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()],
+        'client': (client, 12345),
+    }
+    sent = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': body, 'more_body': False}
+
+    async def send(message):
+        sent.append(message)
+
+    await app(scope, receive, send)
+    start, response = sent
+    response_headers = {k.decode(): v.decode() for k, v in start['headers']}
+    return start['status'], response_headers, json.loads(response['body'])
+
+
+@pytest.fixture
+def make_app(tmp_path, monkeypatch):
+    """Build an app on a new database under tmp_path; keyword arguments override settings."""
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'app.db'}")
+    monkeypatch.setenv('CACHE_DIR', str(tmp_path))
+    for name in ('DATABASE_REPLICA_URL', 'CACHE_BACKEND', 'CACHE_PATH', 'METRICS_TOKEN', 'ARCHIVE_AFTER_DAYS'):
+        monkeypatch.delenv(name, raising=False)
+
+    def make(**config):
+        app = create_app(dict({
+            'TESTING': True, 'WTF_CSRF_ENABLED': False, 'SECRET_KEY': 'test', 'RATELIMIT_BACKEND': 'none',
+        }, **config))
+        with app.app_context():
+            # db is shared by every app: another test's replica bind may still be in db.metadatas
+            db.create_all(bind_key=None)
+        return app
+    return make
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
+
+
+@pytest.fixture
+def ctx(app):
+    """An app context for direct database work.
+
+    Keep client requests out of it: a request reuses the pushed context, and
+    with it g and the session, where each real request starts fresh.
+    """
+    with app.app_context():
+        yield
+
+
+@pytest.fixture
+def login(app):
+    """Register (once) and sign in a client; returns the client."""
+    def login(client=None, email='ali@example.com', password=PASSWORD):
+        client = client or app.test_client()
+        client.post('/register', data=dict(name='Ali', email=email, password=password, confirm_password=password))
+        response = client.post('/login', data=dict(email=email, password=password))
+        assert response.status_code == 302, response.get_data(as_text=True)
+        return client
+    return login
+
+
+@pytest.fixture
+def client(login):
+    return login()
+
+
+@pytest.fixture
+def api_headers(client):
+    """Authorization header for the JSON API, as the signed-in user of client."""
+    response = client.post('/api/v1/token', json={'email': 'ali@example.com', 'password': PASSWORD})
+    return {'Authorization': f"Bearer {response.get_json()['token']}"}
+
+
+@pytest.fixture
+def add_goal(app):
+    """Create a goal through the dashboard form; returns its id."""
+    def add_goal(client, title='مطالعه', total_units=100, daily_target=5):
+        response = client.post('/add_goal', data=dict(
+            title=title, total_units=total_units, daily_target=daily_target, target_date='1410-01-01'))
+        assert response.status_code == 302
+        with app.app_context():
+            return db.session.scalar(select(func.max(Goal.id)))
+    return add_goal
+
+
+@pytest.fixture
+def run_asgi(app, monkeypatch):
+    """Run scenario(api) on a fresh ASGI ApiApp over app's database; keyword arguments set its environment."""
+    def run(scenario, **environ):
+        monkeypatch.setenv('SECRET_KEY', app.config['SECRET_KEY'])
+        monkeypatch.setenv('RATELIMIT_BACKEND', 'none')
+        for name, value in environ.items():
+            monkeypatch.setenv(name, value)
+        from asgi import ApiApp
+
+        async def main():
+            api = ApiApp()
+            try:
+                return await scenario(api)
+            finally:
+                await api.engine.dispose()
+        return asyncio.run(main())
+    return run
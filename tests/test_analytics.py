@@ -0,0 +1,117 @@
+from datetime import date
+
+import pytest
+
+from analytics import build_analytics
+from models import db, utcnow, Goal, ProgressArchive, ProgressEntry, User
+from reports import build_report
+
+TODAY = date(2025, 3, 20)
+
+
+@pytest.fixture
+def user_id(ctx):
+    user = User(name='Ali', email='ali@example.com', password_hash='x')
+    db.session.add(user)
+    db.session.commit()
+    return user.id
+
+
+def add_goal(user_id, total_units, daily_target, target_date, entries=()):
+    goal = Goal(title='هدف', total_units=total_units, daily_target=daily_target, target_date=target_date,
+                user_id=user_id, version=1)
+    db.session.add(goal)
+    db.session.flush()
+    for day, value in entries:
+        db.session.add(ProgressEntry(goal_id=goal.id, date=day, value=value, version=1, updated_at=utcnow()))
+    db.session.commit()
+    return goal.id
+
+
+def test_goals_newer_than_the_report_rows_are_skipped(user_id):
+    first = add_goal(user_id, 10, 1, date(2025, 4, 1), [(date(2025, 3, 19), 2)])
+    goals = build_report(user_id)
+    add_goal(user_id, 10, 1, date(2025, 4, 1), [(date(2025, 3, 19), 5)])
+    analytics = build_analytics(user_id, goals, today=TODAY)
+    assert list(analytics) == [first]
+    assert analytics[first].remaining == 8
+
+
+def analytics_of(user_id, goal_id):
+    return build_analytics(user_id, build_report(user_id), today=TODAY)[goal_id]
+
+
+def days(start, end, value):
+    return [(date(2025, 3, day), value) for day in range(start, end + 1)]
+
+
+def test_a_gap_breaks_the_streak(user_id):
+    # 10-12 March at 4, nothing on the 13th and 14th, then 15-19 March at 2; none yet today
+    goal_id = add_goal(user_id, 100, 5, date(2025, 3, 29), days(10, 12, 4) + days(15, 19, 2))
+    a = analytics_of(user_id, goal_id)
+    assert (a.current_streak, a.longest_streak) == (5, 5)
+    assert a.remaining == 78
+    assert a.days_left == 10
+    assert a.required_pace == pytest.approx(7.8)
+    assert a.average_7 == pytest.approx(10 / 7)
+    assert a.average_30 == pytest.approx(22 / 30)
+    # 78 units at 22/30 a day: ceil(106.4) = 107 days
+    assert a.projected_date == date(2025, 7, 5)
+    assert not a.on_track
+    # 11 days since the first entry at 5 a day: 55 expected, 22 done
+    assert a.schedule_delta_days == -6.6
+
+
+def test_zero_values_and_an_old_run_are_not_a_current_streak(user_id):
+    goal_id = add_goal(user_id, 100, 5, date(2025, 3, 29),
+                       days(1, 3, 1) + [(date(2025, 3, 18), 0), (date(2025, 3, 19), 0), (date(2025, 3, 20), 0)])
+    a = analytics_of(user_id, goal_id)
+    assert (a.current_streak, a.longest_streak) == (0, 3)
+
+
+def test_archived_months_count_in_totals_but_not_in_streaks(user_id):
+    # Target date already passed, with units left
+    goal_id = add_goal(user_id, 50, 1, date(2025, 3, 1), days(1, 2, 1))
+    db.session.add(ProgressArchive(goal_id=goal_id, month=date(2025, 2, 1), total=30, entry_count=28,
+                                   first_date=date(2025, 2, 1), last_date=date(2025, 2, 28), max_value=2))
+    db.session.commit()
+    a = analytics_of(user_id, goal_id)
+    # 28 February (archived) and 1 March are adjacent, but only the raw days form a run
+    assert (a.current_streak, a.longest_streak) == (0, 2)
+    assert a.remaining == 18
+    assert (a.days_left, a.required_pace) == (0, None)
+    # The month counts as one entry on its last day, inside the 30-day window
+    assert a.average_7 == 0
+    assert a.average_30 == pytest.approx(32 / 30)
+    assert a.projected_date == date(2025, 4, 6)
+    assert not a.on_track
+    # The schedule starts at the archived month's first day: 48 days, 48 expected
+    assert a.schedule_delta_days == -16.0
+
+
+def test_zero_pace_has_no_projection(user_id):
+    goal_id = add_goal(user_id, 10, 1, date(2025, 4, 18))
+    a = analytics_of(user_id, goal_id)
+    assert (a.remaining, a.days_left) == (10, 30)
+    assert a.required_pace == pytest.approx(1 / 3)
+    assert (a.average_7, a.average_30) == (0, 0)
+    assert (a.projected_date, a.on_track) == (None, False)
+    assert (a.schedule_delta_days, a.current_streak, a.longest_streak) == (0.0, 0, 0)
+
+
+def test_a_completed_goal_is_projected_on_the_day_it_finished(user_id):
+    goal_id = add_goal(user_id, 5, 1, date(2025, 3, 25), days(17, 19, 2))
+    a = analytics_of(user_id, goal_id)
+    assert a.remaining == 0
+    assert a.projected_date == date(2025, 3, 19)
+    assert a.on_track
+    assert a.current_streak == 3
+
+
+def test_goals_are_computed_independently(user_id):
+    # The same figures whether a goal is alone or next to others
+    first = add_goal(user_id, 100, 5, date(2025, 3, 29), days(10, 12, 4) + days(15, 19, 2))
+    alone = analytics_of(user_id, first)
+    add_goal(user_id, 5, 1, date(2025, 3, 25), days(11, 19, 2))
+    add_goal(user_id, 10, 1, date(2025, 4, 18))
+    assert analytics_of(user_id, first) == alone
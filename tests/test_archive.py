@@ -0,0 +1,120 @@
+import csv
+import io
+from datetime import date
+
+import pytest
+from sqlalchemy import select, func
+
+from archive import archive_cutoff, compact
+from models import db, data_version, Goal, GoalStats, ProgressArchive, ProgressEntry
+from stats import verify_stats
+
+CUTOFF = date(2025, 3, 1)
+
+
+@pytest.fixture
+def goal_id(client, add_goal):
+    goal_id = add_goal(client)
+    client.post('/submit_progress/batch', json={'entries': [
+        {'goal_id': goal_id, 'date': day, 'value': value}
+        for day, value in (('2025-01-05', 2), ('2025-01-20', 6), ('2025-02-03', 1), ('2025-03-10', 4))
+    ]})
+    return goal_id
+
+
+def compact_all(app, before=CUTOFF):
+    with app.app_context():
+        return compact(before, batch_size=1)
+
+
+def rollup(app, goal_id):
+    with app.app_context():
+        stats = db.session.get(GoalStats, goal_id)
+        return stats.total, stats.entry_count, stats.first_date, stats.last_date, stats.max_value
+
+
+def report(client, api_headers):
+    return client.get('/api/v1/report', headers=api_headers).get_json()['goals'][0]
+
+
+def test_archive_cutoff_is_the_start_of_a_month():
+    assert archive_cutoff(0) is None
+    assert archive_cutoff(30, today=date(2025, 4, 15)) == date(2025, 3, 1)
+
+
+def test_compaction_keeps_totals_and_is_idempotent(app, client, api_headers, goal_id):
+    before = rollup(app, goal_id), report(client, api_headers)
+    assert compact_all(app) == (2, 3)
+    assert compact_all(app) == (0, 0)
+    with app.app_context():
+        assert db.session.scalar(select(func.count(ProgressEntry.id))) == 1
+        months = db.session.execute(
+            select(ProgressArchive.month, ProgressArchive.total, ProgressArchive.entry_count,
+                   ProgressArchive.first_date, ProgressArchive.last_date, ProgressArchive.max_value)
+            .order_by(ProgressArchive.month)
+        ).all()
+        assert months == [(date(2025, 1, 1), 8, 2, date(2025, 1, 5), date(2025, 1, 20), 6),
+                          (date(2025, 2, 1), 1, 1, date(2025, 2, 3), date(2025, 2, 3), 1)]
+        assert verify_stats() == []
+    assert (rollup(app, goal_id), report(client, api_headers)) == before
+
+
+def test_later_compactions_merge_into_existing_months(app, client, goal_id):
+    compact_all(app, before=date(2025, 1, 15))
+    client.post('/submit_progress/batch', json={'entries': [
+        {'goal_id': goal_id, 'date': '2025-01-25', 'value': 3},
+    ]})
+    # The 25th sits in an archived month and is refused; the 20th is merged in
+    with app.app_context():
+        assert db.session.scalar(select(ProgressEntry.id).where(ProgressEntry.date == date(2025, 1, 25))) is None
+    compact_all(app, before=date(2025, 2, 1))
+    with app.app_context():
+        january = db.session.get(ProgressArchive, (goal_id, date(2025, 1, 1)))
+        assert (january.total, january.entry_count, january.last_date) == (8, 2, date(2025, 1, 20))
+        assert verify_stats() == []
+
+
+def test_last_entry_falls_back_to_the_last_archived_day(app, client, api_headers, goal_id):
+    compact_all(app, before=date(2025, 4, 1))
+    assert report(client, api_headers)['last_entry'] == {'date': '2025-03-10', 'value': None}
+
+
+def test_exports_mark_archived_months_and_imports_skip_them(app, client, goal_id):
+    compact_all(app)
+    rows = list(csv.DictReader(io.StringIO(client.get('/export/progress.csv').get_data(as_text=True))))
+    assert [(r['date'], float(r['value']), r['kind']) for r in rows] == [
+        ('2025-01-01', 8, 'month'), ('2025-02-01', 1, 'month'), ('2025-03-10', 4, 'day'),
+    ]
+
+    exported = client.get('/export/progress.csv').get_data()
+    response = client.post(f'/api/goals/{goal_id}/progress/bulk', data=exported, content_type='text/csv')
+    result = response.get_json()
+    assert (result['imported'], result['skipped']) == (1, 2)
+    assert rollup(app, goal_id)[:2] == (13, 4)
+
+
+def test_an_initial_sync_pull_lists_archived_months(app, client, api_headers, goal_id):
+    compact_all(app)
+    page = client.get('/api/v1/sync', headers=api_headers).get_json()
+    assert [(a['month'], a['total'], a['entry_count']) for a in page['archived']] == [
+        ('2025-01-01', 8, 2), ('2025-02-01', 1, 1),
+    ]
+    assert [c['date'] for c in page['changes'] if c['type'] == 'entry'] == ['2025-03-10']
+    page = client.get('/api/v1/sync', query_string={'since': page['cursor']}, headers=api_headers).get_json()
+    assert 'archived' not in page
+
+
+def test_compaction_claims_a_version_so_cached_series_are_rebuilt(app, client, goal_id):
+    with app.app_context():
+        user_id = db.session.get(Goal, goal_id).user_id
+        version = data_version(user_id)
+    url = f'/api/goals/{goal_id}/series'
+    assert client.get(url).get_json()['values'] == [2, 6, 1, 4]
+
+    compact_all(app)
+    with app.app_context():
+        assert data_version(user_id) == version + 1
+    assert client.get(url).get_json()['values'] == [8, 1, 4]
+    compact_all(app)
+    with app.app_context():
+        assert data_version(user_id) == version + 1
@@ -0,0 +1,122 @@
+from conftest import asgi_request, PASSWORD
+
+
+async def token(api, password=PASSWORD):
+    status, _, body = await asgi_request(api, 'POST', '/api/v1/token',
+                                         {'email': 'ali@example.com', 'password': password})
+    assert status == 200, body
+    return {'Authorization': f"Bearer {body['token']}"}
+
+
+def test_token_errors(client, run_asgi):
+    async def scenario(api):
+        return [
+            await asgi_request(api, 'POST', '/api/v1/token', {'email': 'ali@example.com', 'password': 'wrong-pass'}),
+            await asgi_request(api, 'POST', '/api/v1/token', {'email': 'ali@example.com'}),
+            await asgi_request(api, 'GET', '/api/v1/goals'),
+            await asgi_request(api, 'GET', '/api/v1/token'),
+            await asgi_request(api, 'GET', '/api/v1/nothing'),
+        ]
+    assert [status for status, _, _ in run_asgi(scenario)] == [401, 400, 401, 405, 404]
+
+
+def test_report_matches_the_flask_api(client, api_headers, add_goal, run_asgi):
+    goal_id = add_goal(client)
+    for day, value in (('2025-01-01', 3), ('2025-01-03', 4)):
+        client.post(f'/submit_progress/{goal_id}', data=dict(date=day, value=value))
+
+    async def scenario(api):
+        headers = await token(api)
+        return [await asgi_request(api, 'GET', path, headers=headers) for path in ('/api/v1/goals', '/api/v1/report')]
+
+    (goals_status, _, goals), (report_status, _, report) = run_asgi(scenario)
+    assert (goals_status, report_status) == (200, 200)
+    assert goals == client.get('/api/v1/goals', headers=api_headers).get_json()
+    assert report == client.get('/api/v1/report', headers=api_headers).get_json()
+    row, = report['goals']
+    assert (row['total_progress'], row['active_days']) == (7, 2)
+    assert row['last_entry'] == {'date': '2025-01-03', 'value': 4}
+
+
+def test_batch_submit_then_page_through_progress(client, add_goal, login, run_asgi):
+    goal_id = add_goal(client)
+    other_goal_id = add_goal(login(email='sara@example.com'))
+
+    async def scenario(api):
+        headers = await token(api)
+        entries = [{'goal_id': goal_id, 'date': f'2025-01-0{day}', 'value': day} for day in range(1, 6)]
+        entries += [{'goal_id': goal_id, 'date': '2025-01-01', 'value': 7},
+                    {'goal_id': other_goal_id, 'date': '2025-01-01', 'value': 1},
+                    {'goal_id': goal_id, 'date': 'soon', 'value': 1}]
+        status, _, body = await asgi_request(api, 'POST', '/api/v1/progress', {'entries': entries}, headers)
+        assert status == 200
+        statuses = [r['status'] for r in body['results']]
+
+        pages, after = [], ''
+        while after is not None:
+            status, _, page = await asgi_request(
+                api, 'GET', f'/api/v1/progress?goal_id={goal_id}&limit=2&after={after}', headers=headers)
+            assert status == 200
+            pages.append(page['entries'])
+            after = page['next']
+        _, _, window = await asgi_request(
+            api, 'GET', f'/api/v1/progress?goal_id={goal_id}&from=2025-01-02&to=2025-01-03', headers=headers)
+        bad = await asgi_request(api, 'GET', '/api/v1/progress?goal_id=x', headers=headers)
+        return statuses, pages, window, bad[0]
+
+    statuses, pages, window, bad_status = run_asgi(scenario)
+    assert statuses == ['created'] * 5 + ['updated', 'error', 'error']
+    assert [[e['date'][-2:] for e in page] for page in pages] == [['01', '02'], ['03', '04'], ['05']]
+    assert pages[0][0] == {'date': '2025-01-01', 'value': 7}
+    assert window == {'entries': [{'date': '2025-01-02', 'value': 2}, {'date': '2025-01-03', 'value': 3}],
+                      'next': None}
+    assert bad_status == 400
+    # 7 + 2 + 3 + 4 + 5
+    assert '21.00 واحد' in client.get('/report').get_data(as_text=True)
+
+
+def test_sync_push_and_pull(client, add_goal, run_asgi):
+    goal_id = add_goal(client)
+
+    async def scenario(api):
+        headers = await token(api)
+        status, _, pushed = await asgi_request(api, 'POST', '/api/v1/sync', {'changes': [
+            {'type': 'goal', 'ref': 'new', 'title': 'ورزش', 'total_units': 50, 'daily_target': 2,
+             'target_date': '2025-12-31', 'updated_at': '2030-01-01T00:00:00Z'},
+            {'type': 'entry', 'goal_ref': 'new', 'date': '2025-01-01', 'value': 2,
+             'updated_at': '2030-01-01T00:00:00Z'},
+            {'type': 'entry', 'goal_id': goal_id, 'date': '2025-01-01', 'value': 4,
+             'updated_at': '2030-01-01T00:00:00Z'},
+        ]}, headers)
+        assert status == 200
+        status, _, pulled = await asgi_request(api, 'GET', '/api/v1/sync', headers=headers)
+        assert status == 200
+        _, _, later = await asgi_request(api, 'GET', f"/api/v1/sync?since={pulled['cursor']}", headers=headers)
+        return pushed, pulled, later
+
+    pushed, pulled, later = run_asgi(scenario)
+    assert [r['status'] for r in pushed['results']] == ['created'] * 3
+    new_id = pushed['results'][0]['id']
+    kinds = {(c['type'], c.get('id', c.get('goal_id')), c.get('date')) for c in pulled['changes']}
+    assert kinds == {('goal', goal_id, None), ('goal', new_id, None),
+                     ('entry', new_id, '2025-01-01'), ('entry', goal_id, '2025-01-01')}
+    assert pulled['more'] is False
+    assert later == {'changes': [], 'cursor': pulled['cursor'], 'more': False}
+
+
+def test_a_password_change_revokes_tokens(client, run_asgi):
+    async def issue(api):
+        return await token(api)
+    headers = run_asgi(issue)
+
+    response = client.post('/profile/change_password', data=dict(
+        old_password=PASSWORD, new_password='newpass5678', confirm_password='newpass5678'))
+    assert response.status_code == 302
+
+    async def scenario(api):
+        old = await asgi_request(api, 'GET', '/api/v1/report', headers=headers)
+        new = await asgi_request(api, 'GET', '/api/v1/report', headers=await token(api, 'newpass5678'))
+        return old, new
+    (old_status, _, old_body), (new_status, _, _) = run_asgi(scenario)
+    assert (old_status, old_body) == (401, {'error': 'توکن نامعتبر است.'})
+    assert new_status == 200
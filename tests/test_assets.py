@@ -0,0 +1,52 @@
+import gzip
+
+import pytest
+
+import assets as assets_module
+from assets import assets, build, CHARTJS_PATH, CHARTJS_URL, IMMUTABLE
+
+
+@pytest.fixture
+def built(app, tmp_path):
+    """Build a small static tree under tmp_path and serve it as the app's dist."""
+    static = tmp_path / 'static'
+    (static / 'vendor').mkdir(parents=True)
+    (static / 'vendor' / 'chart.umd.js').write_text('/* chart */' * 200)
+    (static / 'images').mkdir()
+    (static / 'images' / 'bg.png').write_bytes(b'\x89PNG')
+    (static / 'style.css').write_text('body { background: url(images/bg.png); }')
+    manifest = build(str(static))
+    app_dist_dir, assets.dist_dir = assets.dist_dir, str(static / 'dist')
+    assets.load()
+    yield manifest
+    assets.dist_dir = app_dist_dir
+    assets.load()
+
+
+def test_report_falls_back_to_the_chartjs_cdn_without_a_build(client):
+    html = client.get('/report').get_data(as_text=True)
+    assert f'<script src="{CHARTJS_URL}">' in html
+
+
+def test_report_uses_the_vendored_chartjs_once_built(client, built):
+    html = client.get('/report').get_data(as_text=True)
+    assert f"/assets/{built[CHARTJS_PATH]['path']}" in html
+    assert CHARTJS_URL not in html
+
+
+def test_precompressed_assets_keep_the_asset_name(client, built, monkeypatch):
+    monkeypatch.setattr(assets_module, 'ENCODINGS', (('gzip', '.gz'),))
+    entry = built[CHARTJS_PATH]
+    response = client.get(f"/assets/{entry['path']}", headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.headers['Cache-Control'] == IMMUTABLE
+    assert response.mimetype == 'text/javascript'
+    assert response.headers['Content-Disposition'] == f"inline; filename={entry['path'].split('/')[-1]}"
+    assert gzip.decompress(response.data).startswith(b'/* chart */')
+
+
+def test_stylesheets_point_at_hashed_files(client, built):
+    css = client.get(f"/assets/{built['style.css']['path']}").get_data(as_text=True)
+    assert f"url({built['images/bg.png']['path']})" in css
+    assert client.get('/assets/style.css').status_code == 404
@@ -0,0 +1,127 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import select
+
+from cache import report_cache
+from conftest import PASSWORD
+from models import db, claim_version, data_version, User
+from progress import record_progress
+from views.auth import load_user
+
+METRICS_TOKEN = 's3cret'
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def app(request, make_app):
+    return make_app(CACHE_BACKEND=request.param, METRICS_TOKEN=METRICS_TOKEN)
+
+
+def cache_stats(client):
+    response = client.get('/api/cache/stats', headers={'Authorization': f'Bearer {METRICS_TOKEN}'})
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def series(client, goal_id):
+    return client.get(f'/api/goals/{goal_id}/series').get_json()['values']
+
+
+def test_repeated_reads_are_served_from_the_cache(client, add_goal):
+    goal_id = add_goal(client)
+    client.post(f'/submit_progress/{goal_id}', data=dict(date='2025-01-01', value=3))
+    assert series(client, goal_id) == [3]
+    misses = cache_stats(client)['misses']
+    assert series(client, goal_id) == [3]
+    stats = cache_stats(client)
+    assert stats['misses'] == misses and stats['hits'] >= 1
+
+
+def test_a_write_through_the_views_invalidates_the_report(client, add_goal):
+    goal_id = add_goal(client)
+    client.post(f'/submit_progress/{goal_id}', data=dict(date='2025-01-01', value=3))
+    assert '3.00 واحد' in client.get('/report').get_data(as_text=True)
+    client.post(f'/submit_progress/{goal_id}', data=dict(date='2025-01-02', value=4))
+    assert '7.00 واحد' in client.get('/report').get_data(as_text=True)
+    assert series(client, goal_id) == [3, 4]
+
+
+def test_a_write_outside_the_web_process_invalidates_the_report(app, client, add_goal):
+    # A worker, the ASGI API or a CLI import only touches the database
+    goal_id = add_goal(client)
+    assert series(client, goal_id) == []
+    with app.app_context():
+        user_id = db.session.scalar(select(User.id))
+        record_progress(goal_id, date(2025, 1, 1), 5, claim_version(user_id))
+        db.session.commit()
+    assert series(client, goal_id) == [5]
+
+
+def test_a_rolled_back_write_keeps_cached_entries(app, client):
+    builds = []
+
+    def probe():
+        with app.test_request_context():
+            return report_cache.get_or_set(user_id, 'probe', lambda: builds.append(1) or len(builds))
+
+    def claim(commit):
+        with app.app_context():
+            claim_version(user_id)
+            if commit:
+                db.session.commit()
+            else:
+                db.session.rollback()
+            return data_version(user_id)
+
+    with app.app_context():
+        user_id = db.session.scalar(select(User.id))
+        version = data_version(user_id)
+    assert probe() == 1
+    assert claim(commit=False) == version
+    assert probe() == 1
+    assert claim(commit=True) == version + 1
+    assert probe() == 2
+
+
+def test_cache_stats_need_the_metrics_token(client):
+    assert client.get('/api/cache/stats').status_code == 401
+    assert client.get('/api/cache/stats', headers={'Authorization': 'Bearer nope'}).status_code == 401
+
+
+def test_identity_cache_is_off_without_a_shared_backend(app, client):
+    backend = cache_stats(client)['identity']['backend']
+    assert backend == ('sqlite' if app.config['CACHE_BACKEND'] == 'sqlite' else 'none')
+
+
+@pytest.mark.parametrize('app', ['sqlite'], indirect=True)
+def test_cached_identity_loads_like_a_queried_user(app, client, add_goal):
+    add_goal(client)
+    client.get('/profile')
+    assert cache_stats(client)['identity']['hits'] >= 1
+    with app.test_request_context():
+        user = load_user('1')
+        assert user.email == 'ali@example.com'
+        assert [goal.title for goal in user.goals] == ['مطالعه']
+        assert user.password_hash and user.sync_version == 1
+
+
+def test_profile_changes_reach_other_sessions(login):
+    first, second = login(), login()
+    response = first.post('/profile/update', data=dict(name='Reza', email='reza@example.com'))
+    assert response.status_code == 302
+    assert 'reza@example.com' in second.get('/profile').get_data(as_text=True)
+
+
+def test_a_password_change_ends_other_sessions(login):
+    first, second = login(), login()
+    response = first.post('/profile/change_password', data=dict(
+        old_password=PASSWORD, new_password='newpass123', confirm_password='newpass123'))
+    assert response.status_code == 302
+    assert first.get('/profile').status_code == 200
+    assert second.get('/profile').status_code == 302
+
+
+def test_closing_the_account_ends_other_sessions(login):
+    first, second = login(), login()
+    assert first.post('/confirm_delete').status_code == 200
+    assert second.get('/profile').status_code == 302
@@ -0,0 +1,91 @@
+import json
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import select, delete
+
+from digest import build_digests
+from models import db, Goal, GoalStats, DigestOutbox, User
+
+TODAY = date(2026, 10, 18)
+
+
+def add_user(name, *goals, closed=False):
+    """goals: (total_units, daily_target, days until target_date, units done)."""
+    user = User(name=name, email=f'{name}@example.com', password_hash='x', deleted_at=TODAY if closed else None)
+    db.session.add(user)
+    db.session.flush()
+    for total_units, daily_target, days_left, done in goals:
+        goal = Goal(title=f'{name} goal', total_units=total_units, daily_target=daily_target,
+                    target_date=TODAY + timedelta(days=days_left), user_id=user.id)
+        db.session.add(goal)
+        db.session.flush()
+        if done:
+            db.session.add(GoalStats(goal_id=goal.id, total=done, entry_count=1))
+    return user.id
+
+
+def outbox():
+    return {row.user_id: row for row in db.session.scalars(select(DigestOutbox))}
+
+
+@pytest.fixture
+def users(ctx):
+    users = {
+        'on_pace': add_user('on_pace', (100, 5, 30, 0)),
+        'behind': add_user('behind', (100, 5, 2, 0), (50, 1, 100, 0)),
+        'overdue': add_user('overdue', (100, 5, -3, 50)),
+        'done': add_user('done', (100, 5, -3, 100)),
+        'closed': add_user('closed', (100, 5, 1, 0), closed=True),
+    }
+    db.session.commit()
+    return users
+
+
+def test_digests_list_lagging_goals_only(users):
+    result = build_digests(today=TODAY, page_size=2)
+    assert (result.users, result.goals, result.lagging, result.digests) == (4, 5, 2, 2)
+    digests = outbox()
+    assert set(digests) == {users['behind'], users['overdue']}
+    goals = json.loads(digests[users['overdue']].payload)['goals']
+    assert goals[0]['remaining'] == 50 and goals[0]['days_left'] == 0 and goals[0]['required_pace'] is None
+    goals = json.loads(digests[users['behind']].payload)['goals']
+    assert [(g['remaining'], g['days_left'], g['required_pace']) for g in goals] == [(100, 3, 100 / 3)]
+
+
+def test_a_dry_run_writes_nothing(users):
+    assert build_digests(today=TODAY, dry_run=True).digests == 2
+    assert outbox() == {}
+
+
+def test_a_rerun_refreshes_unsent_digests_and_keeps_sent_ones(users):
+    build_digests(today=TODAY)
+    sent = outbox()[users['behind']]
+    sent.sent_at = TODAY
+    sent_payload = sent.payload
+    db.session.execute(Goal.__table__.update().values(title='renamed'))
+    db.session.commit()
+
+    result = build_digests(today=TODAY)
+    digests = outbox()
+    assert digests[users['behind']].payload == sent_payload
+    assert 'renamed' in digests[users['overdue']].payload
+    assert result.withdrawn == 0
+
+
+def test_a_rerun_withdraws_unsent_digests_no_longer_due(users):
+    build_digests(today=TODAY)
+    outbox()[users['behind']].sent_at = TODAY
+    db.session.execute(delete(Goal).where(Goal.user_id.in_([users['behind'], users['overdue']])))
+    db.session.commit()
+
+    result = build_digests(today=TODAY, page_size=2)
+    assert (result.digests, result.withdrawn) == (0, 1)
+    assert set(outbox()) == {users['behind']}
+
+
+def test_the_command_reports_its_counts(app, users):
+    output = app.test_cli_runner().invoke(args=['digest', '--date', TODAY.isoformat()]).output
+    assert 'Scanned 5 goal(s) of 4 user(s)' in output
+    assert '2 digest(s), withdrew 0' in output
+    assert set(outbox()) == {users['behind'], users['overdue']}
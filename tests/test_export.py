@@ -0,0 +1,59 @@
+import csv
+import io
+import json
+
+import pytest
+
+
+@pytest.fixture
+def goals(login, client, add_goal):
+    reading, running = add_goal(client), add_goal(client, 'دویدن')
+    for goal_id in (reading, running):
+        for day, value in (('2025-01-01', 1), ('2025-01-15', 2), ('2025-02-01', 3)):
+            client.post(f'/submit_progress/{goal_id}', data=dict(date=day, value=value))
+    stranger = login(email='sara@example.com')
+    stranger_goal = add_goal(stranger, 'خواب')
+    stranger.post(f'/submit_progress/{stranger_goal}', data=dict(date='2025-01-15', value=9))
+    return reading, running
+
+
+def export_csv(client, query=''):
+    response = client.get(f'/export/progress.csv{query}')
+    assert response.status_code == 200
+    assert response.headers['Content-Disposition'] == 'attachment; filename=progress.csv'
+    rows = csv.DictReader(io.StringIO(response.get_data(as_text=True)))
+    return [(int(r['goal_id']), r['date'], float(r['value'])) for r in rows]
+
+
+def export_ndjson(client, query=''):
+    response = client.get(f'/export/progress.ndjson{query}')
+    assert response.status_code == 200
+    rows = map(json.loads, response.get_data(as_text=True).splitlines())
+    return [(r['goal_id'], r['date'], r['value']) for r in rows]
+
+
+@pytest.mark.parametrize('export', [export_csv, export_ndjson])
+def test_export_filters(client, goals, export):
+    reading, running = goals
+    everything = [(goal_id, day, value) for goal_id in (reading, running)
+                  for day, value in (('2025-01-01', 1), ('2025-01-15', 2), ('2025-02-01', 3))]
+    assert export(client) == everything
+    assert export(client, f'?goal_id={running}') == [row for row in everything if row[0] == running]
+    assert export(client, f'?goal_id={reading}&goal_id={running}') == everything
+    assert export(client, '?from=2025-01-15') == [row for row in everything if row[1] >= '2025-01-15']
+    assert export(client, '?to=2025-01-15') == [row for row in everything if row[1] <= '2025-01-15']
+    assert export(client, f'?goal_id={reading}&from=2025-01-02&to=2025-01-31') == [(reading, '2025-01-15', 2)]
+    assert export(client, '?from=2025-03-01') == []
+
+
+def test_export_stays_within_the_users_goals(login, goals):
+    stranger = login(email='sara@example.com')
+    assert [row[1:] for row in export_ndjson(stranger)] == [('2025-01-15', 9)]
+    assert export_ndjson(stranger, f'?goal_id={goals[0]}') == []
+
+
+@pytest.mark.parametrize('query', ['?goal_id=x', '?from=2025-13-01', '?to=1403-01-01x'])
+def test_bad_filters_are_rejected(client, query):
+    response = client.get(f'/export/progress.csv{query}')
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'پارامترهای فیلتر نامعتبر هستند.'}
@@ -0,0 +1,31 @@
+from datetime import date, timedelta
+
+
+def submit(client, goal_id, day, value):
+    response = client.post(f'/submit_progress/{goal_id}', data=dict(date=day.isoformat(), value=value))
+    assert response.status_code == 302
+
+
+def goal_card(page, title):
+    start = page.index(f'<span>🎯 {title}</span>')
+    return page[start:page.find('</form>', start)]
+
+
+def test_the_dashboard_shows_today_and_the_total(client, add_goal):
+    today = date.today()
+    reading, running = add_goal(client), add_goal(client, 'دویدن', total_units=50)
+    submit(client, reading, today - timedelta(days=1), 3)
+    submit(client, reading, today, 4)
+    submit(client, running, today - timedelta(days=2), 2.5)
+
+    page = client.get('/').get_data(as_text=True)
+    assert 'ثبت امروز: 4.00 واحد' in goal_card(page, 'مطالعه')
+    assert 'پیشرفت کل: 7.00 از 100.0 واحد' in goal_card(page, 'مطالعه')
+    assert 'ثبت امروز: هنوز ثبت نشده' in goal_card(page, 'دویدن')
+    assert 'پیشرفت کل: 2.50 از 50.0 واحد' in goal_card(page, 'دویدن')
+
+    # Re-submitting today replaces its value
+    submit(client, reading, today, 6)
+    page = client.get('/').get_data(as_text=True)
+    assert 'ثبت امروز: 6.00 واحد' in goal_card(page, 'مطالعه')
+    assert 'پیشرفت کل: 9.00 از 100.0 واحد' in goal_card(page, 'مطالعه')
@@ -0,0 +1,189 @@
+import io
+import json
+from datetime import date
+
+import pytest
+
+import importer
+from importer import import_progress, parse_date, RowError
+from models import db, Goal, ProgressEntry, User
+from stats import verify_stats
+
+
+def csv_stream(*rows):
+    return io.StringIO('goal_id,date,value\n' + ''.join(f'{g},{d},{v}\n' for g, d, v in rows))
+
+
+def test_each_chunk_commits_with_its_rollups(app, client, add_goal, monkeypatch):
+    goal_id = add_goal(client)
+    write_chunk = importer._write_chunk
+
+    def checked(chunk, owners):
+        write_chunk(chunk, owners)
+        assert verify_stats() == []
+    monkeypatch.setattr(importer, '_write_chunk', checked)
+    with app.app_context():
+        result = import_progress(csv_stream(*[(goal_id, f'2025-01-{day:02d}', day) for day in range(1, 8)]),
+                                 'csv', chunk_size=2)
+    assert result.imported == 7
+
+
+def test_an_import_refreshes_a_cached_report(client, add_goal):
+    goal_id = add_goal(client)
+    client.post(f'/submit_progress/{goal_id}', data=dict(date='2025-01-01', value=3))
+    assert '3.00 واحد' in client.get('/report').get_data(as_text=True)
+    response = client.post(f'/api/goals/{goal_id}/progress/bulk', content_type='text/csv',
+                           data=csv_stream((goal_id, '2025-01-02', 4), (goal_id, '2025-01-03', 5)).getvalue())
+    assert response.get_json()['imported'] == 2
+    assert '12.00 واحد' in client.get('/report').get_data(as_text=True)
+
+
+def entries(app):
+    with app.app_context():
+        return {(e.goal_id, e.date): e.value for e in ProgressEntry.query}
+
+
+def jsonl(*records):
+    return '\n'.join(r if isinstance(r, str) else json.dumps(r) for r in records) + '\n'
+
+
+def test_csv_rows_with_gregorian_and_jalali_dates(app, client, add_goal):
+    goal_id = add_goal(client)
+    with app.app_context():
+        result = import_progress(csv_stream((goal_id, '2025-03-19', 1), (goal_id, '1403-12-30', 2.5),
+                                            (goal_id, '1404/01/01', 3)), 'csv')
+    assert (result.imported, result.skipped, result.errors) == (3, 0, [])
+    assert entries(app) == {(goal_id, date(2025, 3, 19)): 1, (goal_id, date(2025, 3, 20)): 2.5,
+                            (goal_id, date(2025, 3, 21)): 3}
+
+
+def test_a_calendar_can_be_forced(app, client, add_goal):
+    goal_id = add_goal(client)
+    with app.app_context():
+        import_progress(csv_stream((goal_id, '1800-01-01', 1)), 'csv', calendar='jalali')
+    assert entries(app) == {(goal_id, date(2421, 3, 21)): 1}
+    assert parse_date('1403-12-30', 'gregorian') == date(1403, 12, 30)
+    with pytest.raises(RowError):
+        parse_date('1402-12-30', 'jalali')
+
+
+def test_bad_rows_are_skipped_and_reported_by_line(app, client, add_goal):
+    goal_id = add_goal(client)
+    stream = csv_stream((goal_id, '2025-01-01', 1), ('x', '2025-01-02', 1), (goal_id, '2025-02-30', 1),
+                        (goal_id, '2025-01-03', -1), (goal_id, '2025-01-04', 'nan'), (goal_id + 1, '2025-01-05', 1))
+    with app.app_context():
+        result = import_progress(stream, 'csv')
+    assert (result.imported, result.skipped) == (1, 5)
+    assert result.errors == [
+        {'line': 3, 'error': 'missing or invalid goal_id'},
+        {'line': 4, 'error': "invalid date '2025-02-30'"},
+        {'line': 5, 'error': "value must be a non-negative number, got '-1'"},
+        {'line': 6, 'error': "value must be a non-negative number, got 'nan'"},
+        {'line': 7, 'error': f'unknown goal {goal_id + 1}'},
+    ]
+    assert entries(app) == {(goal_id, date(2025, 1, 1)): 1}
+
+
+def test_json_lines(app, client, add_goal):
+    goal_id = add_goal(client)
+    stream = io.StringIO(jsonl(
+        {'goal_id': goal_id, 'date': '2025-01-01', 'value': 2},
+        '',
+        '{not json',
+        '[1, 2]',
+        {'goal_id': goal_id, 'kind': 'month', 'date': '2025-01-01', 'value': 40},
+        {'goal_id': str(goal_id), 'date': '1403-10-13', 'value': '4'},
+    ))
+    with app.app_context():
+        result = import_progress(stream, 'jsonl')
+    assert (result.imported, result.skipped) == (2, 3)
+    assert result.errors == [
+        {'line': 3, 'error': 'invalid JSON'},
+        {'line': 4, 'error': 'expected a JSON object'},
+        {'line': 5, 'error': 'archived month totals are not daily entries'},
+    ]
+    assert entries(app) == {(goal_id, date(2025, 1, 1)): 2, (goal_id, date(2025, 1, 2)): 4}
+
+
+def test_the_last_row_for_a_day_wins_across_chunks(app, client, add_goal):
+    goal_id = add_goal(client)
+    stream = csv_stream((goal_id, '2025-01-01', 1), (goal_id, '2025-01-01', 2), (goal_id, '2025-01-02', 3),
+                        (goal_id, '2025-01-03', 4), (goal_id, '2025-01-01', 5))
+    with app.app_context():
+        result = import_progress(stream, 'csv', chunk_size=2)
+        assert verify_stats() == []
+    assert result.imported == 5
+    assert entries(app) == {(goal_id, date(2025, 1, 1)): 5, (goal_id, date(2025, 1, 2)): 3,
+                            (goal_id, date(2025, 1, 3)): 4}
+
+
+def test_rows_for_another_users_goal_are_refused(app, login, client, add_goal):
+    goal_id = add_goal(client)
+    other_goal_id = add_goal(login(email='sara@example.com'))
+    with app.app_context():
+        user_id = db.session.get(Goal, goal_id).user_id
+        result = import_progress(csv_stream((goal_id, '2025-01-01', 1), (other_goal_id, '2025-01-01', 1)),
+                                 'csv', user_id=user_id)
+    assert result.errors == [{'line': 3, 'error': f'unknown goal {other_goal_id}'}]
+    assert entries(app) == {(goal_id, date(2025, 1, 1)): 1}
+
+
+def test_the_bulk_endpoint(app, login, client, add_goal):
+    goal_id = add_goal(client)
+    other_goal_id = add_goal(client, title='ورزش')
+    upload = jsonl({'date': '2025-01-01', 'value': 1}, {'goal_id': other_goal_id, 'date': '2025-01-02', 'value': 1})
+    response = client.post(f'/api/goals/{goal_id}/progress/bulk',
+                           data={'file': (io.BytesIO(upload.encode()), 'progress.jsonl')})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert (body['imported'], body['skipped']) == (1, 1)
+    assert body['errors'] == [{'line': 2, 'error': f'goal_id {other_goal_id} does not match the target goal'}]
+    assert entries(app) == {(goal_id, date(2025, 1, 1)): 1}
+
+    response = client.post(f'/api/goals/{goal_id}/progress/bulk', data='x', content_type='text/plain')
+    assert response.status_code == 415
+    response = client.post(f'/api/goals/{goal_id}/progress/bulk?calendar=hijri', data='x', content_type='text/csv')
+    assert response.status_code == 400
+    stranger = login(app.test_client(), email='sara@example.com')
+    response = stranger.post(f'/api/goals/{goal_id}/progress/bulk', data='date,value\n2025-01-03,1\n',
+                             content_type='text/csv')
+    assert response.status_code == 404
+
+
+def test_the_import_progress_command(app, client, add_goal, tmp_path):
+    goal_id = add_goal(client)
+    path = tmp_path / 'progress.csv'
+    path.write_text(csv_stream((goal_id, '2025-01-01', 1), (goal_id, 'soon', 1)).getvalue())
+    result = app.test_cli_runner().invoke(args=['import-progress', str(path), '--user-email', 'ali@example.com'])
+    assert result.exit_code == 0, result.output
+    assert 'line 3: invalid date' in result.output
+    assert 'Imported 1 row(s), skipped 1' in result.output
+    assert entries(app) == {(goal_id, date(2025, 1, 1)): 1}
+
+    result = app.test_cli_runner().invoke(args=['import-progress', str(path), '--user-email', 'nobody@example.com'])
+    assert result.exit_code != 0
+    assert 'No user with email nobody@example.com' in result.output
+
+
+def test_a_legacy_goals_file(app, client, tmp_path):
+    path = tmp_path / 'goals.json'
+    path.write_text(json.dumps([
+        {'title': 'کتاب', 'total_units': 300, 'daily_target': 10, 'target_date': '1404-06-31',
+         'progress': {'1403-12-30': 12, '2025-03-21': 8}},
+        {'title': 'دویدن', 'total_units': 100, 'daily_target': 2, 'target_date': '2025-12-31'},
+    ], ensure_ascii=False), encoding='utf-8')
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=['import-progress', str(path)])
+    assert result.exit_code != 0
+    assert '--user-email is required' in result.output
+
+    result = runner.invoke(args=['import-progress', str(path), '--user-email', 'ali@example.com'])
+    assert result.exit_code == 0, result.output
+    assert 'Created 2 goal(s) with 2 progress entries.' in result.output
+    with app.app_context():
+        user = User.query.filter_by(email='ali@example.com').one()
+        goals = {g.title: g for g in Goal.query.filter_by(user_id=user.id)}
+        assert goals['کتاب'].target_date == date(2025, 9, 22)
+        assert verify_stats() == []
+    book = goals['کتاب'].id
+    assert entries(app) == {(book, date(2025, 3, 20)): 12, (book, date(2025, 3, 21)): 8}
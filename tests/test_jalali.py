@@ -0,0 +1,93 @@
+from datetime import date, timedelta
+
+import jdatetime
+import numpy as np
+import pytest
+
+from jalali import JalaliTable, jalali_table
+from models import db, utcnow, Goal, ProgressEntry, User
+from reports import goal_series, series_labels
+
+
+def jalali(value):
+    j = jdatetime.date.fromgregorian(date=value)
+    return j.year, j.month, j.day
+
+
+@pytest.fixture(scope='module')
+def table():
+    table = JalaliTable()
+    table.load()
+    return table
+
+
+def test_every_day_of_the_range_matches_jdatetime(table):
+    ordinals = np.arange(table.first, table.last + 1)
+    years, months, days = table.lookup(ordinals)
+    for i in range(len(ordinals)):
+        value = date.fromordinal(int(ordinals[i]))
+        assert (years[i], months[i], days[i]) == jalali(value), value
+
+
+def test_month_starts_match_jdatetime(table):
+    for (year, month), start in table.month_starts.items():
+        assert date.fromordinal(start) == jdatetime.date(year, month, 1).togregorian()
+
+
+@pytest.mark.parametrize('year, leap', [(1399, True), (1402, False), (1403, True), (1404, False)])
+def test_esfand_has_30_days_only_in_leap_years(table, year, leap):
+    assert table.from_jalali(year, 12, 29) == jdatetime.date(year, 12, 29).togregorian()
+    assert table.from_jalali(year + 1, 1, 1) == jdatetime.date(year + 1, 1, 1).togregorian()
+    if leap:
+        last = table.from_jalali(year, 12, 30)
+        assert last == jdatetime.date(year, 12, 30).togregorian()
+        assert table.to_jalali(last) == (year, 12, 30)
+        assert table.to_jalali(last + timedelta(days=1)) == (year + 1, 1, 1)
+    else:
+        with pytest.raises(ValueError):
+            table.from_jalali(year, 12, 30)
+
+
+def test_dates_outside_the_range_fall_back_to_jdatetime():
+    table = JalaliTable(min_year=2000, max_year=2001)
+    for value in (date(1850, 3, 21), date(1999, 12, 31), date(2002, 1, 1), date(2300, 6, 1)):
+        assert table.to_jalali(value) == jalali(value)
+    assert table.from_jalali(1300, 1, 1) == jdatetime.date(1300, 1, 1).togregorian()
+    values = [date(1999, 12, 31), date(2000, 6, 1), date(2002, 1, 1)]
+    years, months, days = table.lookup([v.toordinal() for v in values])
+    assert list(zip(years, months, days)) == [jalali(v) for v in values]
+
+
+def test_buckets_start_on_saturday_and_on_the_first_of_the_month_and_year(table):
+    values = [date(2025, 3, 20), date(2025, 3, 21), date(2025, 3, 22), date(2025, 9, 22), date(2026, 3, 19)]
+    ordinals = [v.toordinal() for v in values]
+    weeks = [date.fromordinal(int(o)) for o in table.bucket_start(ordinals, 'jweek')]
+    assert [w.weekday() for w in weeks] == [5] * len(values)  # Saturday
+    assert all(0 <= (v - w).days < 7 for v, w in zip(values, weeks))
+    months = [date.fromordinal(int(o)) for o in table.bucket_start(ordinals, 'jmonth')]
+    assert months == [jdatetime.date(*jalali(v)[:2], 1).togregorian() for v in values]
+    years = [date.fromordinal(int(o)) for o in table.bucket_start(ordinals, 'jyear')]
+    assert years == [jdatetime.date(jalali(v)[0], 1, 1).togregorian() for v in values]
+    with pytest.raises(ValueError):
+        table.bucket_start(ordinals, 'jdecade')
+
+
+def test_goal_series_by_jalali_month(ctx):
+    user = User(name='Ali', email='ali@example.com', password_hash='x')
+    db.session.add(user)
+    db.session.flush()
+    goal = Goal(title='هدف', total_units=100, daily_target=1, target_date=date(2026, 1, 1), user_id=user.id)
+    db.session.add(goal)
+    db.session.flush()
+    # 1 and 30 Esfand 1403, then 1 Farvardin 1404
+    for day, value in ((date(2025, 2, 19), 1), (date(2025, 3, 20), 2), (date(2025, 3, 21), 4)):
+        db.session.add(ProgressEntry(goal_id=goal.id, date=day, value=value, updated_at=utcnow()))
+    db.session.commit()
+
+    dates, values = goal_series(goal.id, 'jmonth')
+    assert (dates, values) == ([date(2025, 2, 19), date(2025, 3, 21)], [3, 4])
+    assert series_labels(dates, 'jmonth') == ['1403/12', '1404/01']
+    dates, values = goal_series(goal.id, 'jyear')
+    assert (series_labels(dates, 'jyear'), values) == (['1403', '1404'], [3, 4])
+    dates, _ = goal_series(goal.id, 'jweek')
+    assert series_labels(dates, 'jweek')[0] == jalali_table.format(date(2025, 2, 15))
@@ -0,0 +1,78 @@
+from datetime import timedelta
+
+from sqlalchemy import select, update, func
+
+import jobs
+from models import db, utcnow, Goal, Job, ProgressEntry, User
+
+
+def run_queue(worker='test-worker'):
+    """Run every runnable job; jobs.work() would also take over SIGINT."""
+    statuses = []
+    while (job := jobs.claim(worker)) is not None:
+        statuses.append(jobs.run_job(job, worker))
+    return statuses
+
+
+def test_closing_an_account_frees_its_email_and_the_worker_purges_it(app, login, add_goal):
+    client = login()
+    goal_id = add_goal(client)
+    client.post('/submit_progress/batch', json={'entries': [
+        {'goal_id': goal_id, 'date': f'2025-01-0{day}', 'value': day} for day in range(1, 6)
+    ]})
+    assert client.post('/confirm_delete').status_code == 200
+
+    new_client = login()
+    add_goal(new_client, 'دوباره')
+    app.config['PURGE_BATCH_SIZE'] = 2
+    with app.app_context():
+        assert run_queue() == ['done']
+        assert [u.email for u in db.session.scalars(select(User))] == ['ali@example.com']
+        assert [g.title for g in db.session.scalars(select(Goal))] == ['دوباره']
+        assert db.session.scalar(select(func.count(ProgressEntry.id))) == 0
+        assert run_queue() == []
+
+
+def test_a_closed_account_keeps_a_short_placeholder_email(app, login):
+    # 120 characters: the email column's length in the initial migration
+    email = 'a' * 64 + '@' + 'd' * 51 + '.com'
+    client = login(email=email)
+    assert client.post('/confirm_delete').status_code == 200
+    with app.app_context():
+        user = db.session.scalars(select(User)).one()
+        assert user.email == f'deleted:{user.id}'
+        assert user.deleted_at is not None
+
+
+def test_failed_jobs_are_retried_with_backoff_then_fail(ctx, monkeypatch):
+    calls = []
+
+    def explode(job, payload):
+        calls.append(job.attempts)
+        raise RuntimeError('boom')
+    monkeypatch.setitem(jobs.HANDLERS, 'explode', explode)
+    job_id = jobs.enqueue('explode', max_attempts=2).id
+    db.session.commit()
+
+    assert run_queue() == ['queued']
+    job = db.session.get(Job, job_id, populate_existing=True)
+    assert job.error == 'RuntimeError: boom' and job.run_at > utcnow() + timedelta(seconds=20)
+    assert run_queue() == []
+
+    db.session.execute(update(Job).values(run_at=utcnow()))
+    db.session.commit()
+    assert run_queue() == ['failed']
+    assert calls == [1, 2]
+
+
+def test_jobs_of_a_dead_worker_are_reclaimed(ctx, monkeypatch):
+    monkeypatch.setitem(jobs.HANDLERS, 'noop', lambda job, payload: {'ok': True})
+    job_id = jobs.enqueue('noop').id
+    db.session.commit()
+    assert jobs.claim('dead-worker').id == job_id
+    assert run_queue() == []
+
+    db.session.execute(update(Job).values(locked_at=utcnow() - timedelta(seconds=jobs.DEFAULT_TIMEOUT + 1)))
+    db.session.commit()
+    assert run_queue() == ['done']
+    assert jobs.job_json(db.session.get(Job, job_id, populate_existing=True))['result'] == {'ok': True}
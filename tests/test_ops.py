@@ -0,0 +1,20 @@
+import pytest
+
+TOKEN = 's3cret'
+
+
+@pytest.mark.parametrize('config, headers, status', [
+    ({}, {}, 403),
+    ({}, {'Authorization': f'Bearer {TOKEN}'}, 403),
+    ({'METRICS_TOKEN': TOKEN}, {}, 401),
+    ({'METRICS_TOKEN': TOKEN}, {'Authorization': 'Bearer wrong'}, 401),
+    ({'METRICS_TOKEN': TOKEN}, {'Authorization': f'Bearer {TOKEN}'}, 200),
+])
+@pytest.mark.parametrize('path', ['/metrics', '/api/db/pool'])
+def test_ops_endpoints_need_the_token(make_app, config, headers, status, path):
+    response = make_app(**config).test_client().get(path, headers=headers)
+    assert response.status_code == status
+    if status == 200 and path == '/metrics':
+        assert 'http_requests_total' in response.get_data(as_text=True)
+    elif status == 200:
+        assert 'checkouts' in response.get_json()
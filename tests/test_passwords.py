@@ -0,0 +1,60 @@
+from sqlalchemy import select
+
+from conftest import asgi_request, PASSWORD
+from models import db, User
+
+OLD_METHOD = 'pbkdf2:sha256:1000'
+NEW_METHOD = 'scrypt:16384:8:1'
+
+
+def stored_hash(app):
+    with app.app_context():
+        return db.session.scalar(select(User.password_hash))
+
+
+def register_with_old_method(make_app):
+    old = make_app(PASSWORD_HASH_METHOD=OLD_METHOD)
+    old.test_client().post('/register', data=dict(
+        name='Ali', email='ali@example.com', password=PASSWORD, confirm_password=PASSWORD))
+    assert stored_hash(old).startswith(OLD_METHOD + '$')
+
+
+def test_web_login_rehashes_with_the_new_method(make_app):
+    register_with_old_method(make_app)
+    app = make_app(PASSWORD_HASH_METHOD=NEW_METHOD)
+    client = app.test_client()
+    client.post('/login', data=dict(email='ali@example.com', password='wrong-pass'))
+    assert stored_hash(app).startswith(OLD_METHOD + '$')
+
+    response = client.post('/login', data=dict(email='ali@example.com', password=PASSWORD))
+    assert response.status_code == 302
+    assert stored_hash(app).startswith(NEW_METHOD + '$')
+    assert client.get('/').status_code == 200
+    # and the new hash still checks out
+    assert app.test_client().post('/login', data=dict(email='ali@example.com', password=PASSWORD)).status_code == 302
+
+
+def test_api_token_rehashes_and_signs_with_the_new_hash(make_app):
+    register_with_old_method(make_app)
+    app = make_app(PASSWORD_HASH_METHOD=NEW_METHOD)
+    client = app.test_client()
+    response = client.post('/api/v1/token', json={'email': 'ali@example.com', 'password': PASSWORD})
+    assert response.status_code == 200
+    assert stored_hash(app).startswith(NEW_METHOD + '$')
+    headers = {'Authorization': f"Bearer {response.get_json()['token']}"}
+    assert client.get('/api/v1/goals', headers=headers).status_code == 200
+
+
+def test_asgi_token_rehashes_and_signs_with_the_new_hash(make_app, run_asgi):
+    register_with_old_method(make_app)
+
+    async def scenario(api):
+        status, _, body = await asgi_request(api, 'POST', '/api/v1/token',
+                                             {'email': 'ali@example.com', 'password': PASSWORD})
+        assert status == 200
+        headers = {'Authorization': f"Bearer {body['token']}"}
+        return await asgi_request(api, 'GET', '/api/v1/goals', headers=headers)
+
+    status, _, body = run_asgi(scenario, PASSWORD_HASH_METHOD=NEW_METHOD)
+    assert (status, body) == (200, {'goals': []})
+    assert stored_hash(make_app()).startswith(NEW_METHOD + '$')
@@ -0,0 +1,120 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+from models import db, claim_version, Goal, GoalStats, ProgressArchive, ProgressEntry, User
+from progress import record_progress, upsert_statements, ArchivedDateError, MAX_BATCH_SIZE
+from stats import verify_stats
+
+
+@pytest.fixture
+def goal_id(ctx):
+    user = User(name='Ali', email='ali@example.com', password_hash='x')
+    db.session.add(user)
+    db.session.flush()
+    goal = Goal(title='مطالعه', total_units=100, daily_target=5, target_date=date(2030, 1, 1),
+                user_id=user.id, version=claim_version(user.id))
+    db.session.add(goal)
+    db.session.commit()
+    return goal.id
+
+
+def record(goal_id, day, value):
+    user_id = db.session.scalar(select(User.id))
+    old = record_progress(goal_id, day, value, claim_version(user_id))
+    db.session.commit()
+    return old
+
+
+def rollup(goal_id):
+    stats = db.session.get(GoalStats, goal_id, populate_existing=True)
+    return stats.total, stats.entry_count, stats.first_date, stats.last_date, stats.max_value
+
+
+def test_new_days_are_added_to_the_rollup(goal_id):
+    assert record(goal_id, date(2025, 1, 2), 3) is None
+    assert record(goal_id, date(2025, 1, 1), 4) is None
+    assert rollup(goal_id) == (7, 2, date(2025, 1, 1), date(2025, 1, 2), 4)
+
+
+def test_resubmitting_a_day_replaces_its_value(goal_id):
+    record(goal_id, date(2025, 1, 1), 3)
+    record(goal_id, date(2025, 1, 2), 5)
+    assert record(goal_id, date(2025, 1, 2), 2) == 5
+    assert rollup(goal_id) == (5, 2, date(2025, 1, 1), date(2025, 1, 2), 3)
+    assert db.session.scalar(select(ProgressEntry.value).where(ProgressEntry.date == date(2025, 1, 2))) == 2
+    assert verify_stats() == []
+
+
+def test_lowering_the_maximum_falls_back_to_archived_months(goal_id):
+    db.session.add(ProgressArchive(goal_id=goal_id, month=date(2024, 1, 1), total=6, entry_count=1,
+                                   first_date=date(2024, 1, 5), last_date=date(2024, 1, 5), max_value=6))
+    db.session.add(GoalStats(goal_id=goal_id, total=6, entry_count=1, first_date=date(2024, 1, 5),
+                             last_date=date(2024, 1, 5), max_value=6))
+    db.session.commit()
+    record(goal_id, date(2025, 1, 1), 9)
+    record(goal_id, date(2025, 1, 1), 1)
+    assert rollup(goal_id) == (7, 2, date(2024, 1, 5), date(2025, 1, 1), 6)
+    assert verify_stats() == []
+
+
+def test_archived_month_is_refused_without_writing(goal_id):
+    record(goal_id, date(2025, 2, 1), 2)
+    db.session.add(ProgressArchive(goal_id=goal_id, month=date(2025, 1, 1), total=0, entry_count=0,
+                                   first_date=date(2025, 1, 1), last_date=date(2025, 1, 1), max_value=0))
+    db.session.commit()
+    with pytest.raises(ArchivedDateError):
+        record(goal_id, date(2025, 1, 20), 5)
+    db.session.rollback()
+    assert rollup(goal_id)[:2] == (2, 1)
+    assert db.session.scalar(select(ProgressEntry.id).where(ProgressEntry.date == date(2025, 1, 20))) is None
+
+
+def test_rollup_row_is_created_and_locked_before_the_day_is_read(goal_id):
+    lock, rollup_upsert, entry_upsert = upsert_statements(goal_id, date(2025, 1, 1), 3, version=1)
+    db.session.execute(lock)
+    assert rollup(goal_id)[:2] == (0, 0)
+    assert db.session.execute(rollup_upsert).first() == (None,)
+    db.session.execute(entry_upsert)
+    db.session.commit()
+    assert rollup(goal_id) == (3, 1, date(2025, 1, 1), date(2025, 1, 1), 3)
+
+
+def test_rollup_lock_compiles_for_postgresql():
+    lock = upsert_statements(1, date(2025, 1, 1), 3, version=1, dialect='postgresql')[0]
+    assert 'ON CONFLICT (goal_id) DO UPDATE' in str(lock.compile(dialect=postgresql.dialect()))
+
+
+def test_dashboard_batch_updates_rollups(app, client, add_goal):
+    first, second = add_goal(client), add_goal(client, 'ورزش')
+    response = client.post('/submit_progress/batch', json={'entries': [
+        {'goal_id': first, 'date': '2025-01-01', 'value': 2},
+        {'goal_id': second, 'date': '2025-01-01', 'value': 3},
+        {'goal_id': first, 'date': '2025-01-01', 'value': 4},
+    ]})
+    assert [r['status'] for r in response.get_json()['results']] == ['created', 'created', 'updated']
+    with app.app_context():
+        assert rollup(first)[:2] == (4, 1)
+        assert rollup(second)[:2] == (3, 1)
+
+
+def test_boolean_goal_ids_are_not_goal_one(app, client, add_goal):
+    assert add_goal(client) == 1
+    response = client.post('/submit_progress/batch', json={'entries': [
+        {'goal_id': True, 'date': '2025-01-01', 'value': 2},
+    ]})
+    assert response.get_json()['results'][0]['status'] == 'error'
+    with app.app_context():
+        assert db.session.scalar(select(ProgressEntry.id)) is None
+
+
+def test_batches_over_the_cap_are_rejected(app, client, api_headers, add_goal):
+    goal_id = add_goal(client)
+    entries = [{'goal_id': goal_id, 'date': '2025-01-01', 'value': 1}] * (MAX_BATCH_SIZE + 1)
+    assert client.post('/submit_progress/batch', json={'entries': entries}).status_code == 413
+    response = client.post('/api/v1/progress', json={'entries': entries}, headers=api_headers)
+    assert response.status_code == 413
+    with app.app_context():
+        assert db.session.scalar(select(ProgressEntry.id)) is None
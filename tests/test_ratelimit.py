@@ -0,0 +1,60 @@
+import pytest
+
+from ratelimit import RateLimiter, parse_limit
+
+FORWARDED = {'X-Forwarded-For': '203.0.113.7'}
+
+
+def token(client, email='ali@example.com', headers=None):
+    return client.post('/api/v1/token', json={'email': email, 'password': 'wrong-pass'}, headers=headers)
+
+
+def test_the_ip_limit_answers_429_with_retry_after(make_app):
+    client = make_app(RATELIMIT_BACKEND='memory', RATELIMIT_IP='3/60', RATELIMIT_ACCOUNT='100/60').test_client()
+    for i in range(3):
+        response = client.post('/login', data=dict(email=f'user{i}@example.com', password='wrong-pass'))
+        assert response.status_code == 200
+    response = client.post('/login', data=dict(email='other@example.com', password='wrong-pass'))
+    assert response.status_code == 429
+    assert 1 <= int(response.headers['Retry-After']) <= 60
+    assert 'تعداد تلاش‌ها بیش از حد مجاز است' in response.get_data(as_text=True)
+
+
+def test_the_account_limit_counts_each_email(make_app):
+    client = make_app(RATELIMIT_BACKEND='memory', RATELIMIT_IP='100/60', RATELIMIT_ACCOUNT='2/60').test_client()
+    assert [token(client).status_code for _ in range(2)] == [401, 401]
+    response = token(client, email=' ALI@example.com')
+    assert response.status_code == 429
+    assert 1 <= int(response.headers['Retry-After']) <= 60
+    assert response.get_json() == {'error': 'تعداد تلاش‌ها بیش از حد مجاز است.'}
+    assert token(client, email='sara@example.com').status_code == 401
+
+
+def test_behind_a_trusted_proxy_the_forwarded_address_is_the_key(make_app):
+    client = make_app(RATELIMIT_BACKEND='memory', RATELIMIT_IP='1/60', TRUSTED_PROXIES=1).test_client()
+    assert token(client, headers=FORWARDED).status_code == 401
+    assert token(client, email='a@example.com', headers=FORWARDED).status_code == 429
+    assert token(client, email='b@example.com', headers={'X-Forwarded-For': '203.0.113.8'}).status_code == 401
+
+
+def test_without_trusted_proxies_the_forwarded_header_is_ignored(make_app):
+    client = make_app(RATELIMIT_BACKEND='memory', RATELIMIT_IP='1/60').test_client()
+    assert token(client, headers=FORWARDED).status_code == 401
+    assert token(client, email='a@example.com', headers={'X-Forwarded-For': '203.0.113.8'}).status_code == 429
+
+
+def test_sqlite_counters_are_shared_between_limiters(tmp_path):
+    config = {'RATELIMIT_BACKEND': 'sqlite', 'RATELIMIT_PATH': str(tmp_path / 'limits.db'), 'RATELIMIT_IP': '2/60'}
+    first, second = RateLimiter(), RateLimiter()
+    first.configure(config)
+    second.configure(config)
+    assert first.hit(ip='10.0.0.1') is None
+    assert second.hit(ip='10.0.0.1') is None
+    assert first.hit(ip='10.0.0.1') is not None
+    assert second.hit(ip='10.0.0.2') is None
+
+
+@pytest.mark.parametrize('text', ['20', '0/60', '20/0', 'a/b'])
+def test_invalid_limits_are_rejected(text):
+    with pytest.raises(ValueError):
+        parse_limit(text)
@@ -0,0 +1,73 @@
+import sqlite3
+from datetime import date
+
+import pytest
+from sqlalchemy import event, update
+
+from metrics import request_metrics
+from models import db, Goal, ProgressEntry
+from replica import BIND_KEY
+
+METRICS_TOKEN = 's3cret'
+
+
+@pytest.fixture
+def app(make_app, tmp_path):
+    return make_app(DATABASE_REPLICA_URL=f"sqlite:///{tmp_path / 'replica.db'}", METRICS_TOKEN=METRICS_TOKEN)
+
+
+@pytest.fixture
+def catch_up(app, tmp_path):
+    """Copy the primary to the replica, marking its goals and entries to tell the copies apart."""
+    def catch_up():
+        primary, replica = sqlite3.connect(tmp_path / 'app.db'), sqlite3.connect(tmp_path / 'replica.db')
+        primary.backup(replica)
+        primary.close()
+        replica.close()
+        with app.app_context():
+            engine = db.engines[BIND_KEY]
+            engine.dispose()
+            with engine.begin() as conn:
+                conn.execute(update(Goal).values(title='replica copy'))
+                conn.execute(update(ProgressEntry).values(value=99))
+    return catch_up
+
+
+def test_reads_use_a_replica_that_has_the_latest_write(client, add_goal, catch_up):
+    add_goal(client)
+    catch_up()
+    assert 'replica copy' in client.get('/').get_data(as_text=True)
+    assert 'replica copy' in client.get('/report').get_data(as_text=True)
+    assert 'replica_requests_total{target="replica"} 2' in client.get(
+        '/metrics', headers={'Authorization': f'Bearer {METRICS_TOKEN}'}).get_data(as_text=True)
+
+
+def test_reads_after_a_write_use_the_primary_until_the_replica_catches_up(client, api_headers, login, add_goal,
+                                                                           catch_up):
+    goal_id = add_goal(client)
+    catch_up()
+    # Written through the JSON API: no session cookie is involved
+    response = client.post('/api/v1/progress', headers=api_headers, json={'entries': [
+        {'goal_id': goal_id, 'date': '2025-01-01', 'value': 3},
+    ]})
+    assert response.status_code == 200
+    for session in (client, login()):
+        assert 'مطالعه' in session.get('/').get_data(as_text=True)
+        assert '3.00 واحد' in session.get('/report').get_data(as_text=True)
+    catch_up()
+    assert 'replica copy' in client.get('/').get_data(as_text=True)
+
+
+def test_series_and_analytics_read_the_replica(client, add_goal, catch_up):
+    goal_id = add_goal(client)
+    client.post(f'/submit_progress/{goal_id}', data=dict(date=date.today().isoformat(), value=3))
+    catch_up()
+    assert client.get(f'/api/goals/{goal_id}/series').get_json()['values'] == [99]
+    # The 7-day average comes from the analytics query: 99 / 7
+    assert '14.14 واحد' in client.get('/report').get_data(as_text=True)
+
+
+def test_replica_statements_are_counted_per_request(app):
+    with app.app_context():
+        engine = db.engines[BIND_KEY]
+    assert event.contains(engine, 'after_cursor_execute', request_metrics._after_cursor_execute)
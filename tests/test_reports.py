@@ -0,0 +1,103 @@
+import math
+from datetime import date, timedelta
+
+import pytest
+
+from conftest import PASSWORD
+from reports import lttb
+
+
+def submit(client, goal_id, *entries):
+    for day, value in entries:
+        response = client.post(f'/submit_progress/{goal_id}', data=dict(date=day, value=value))
+        assert response.status_code == 302
+
+
+def test_lttb_keeps_the_endpoints_and_the_peak():
+    dates = [date(2025, 1, 1) + timedelta(days=i) for i in range(100)]
+    values = [math.sin(i / 10) for i in range(100)]
+    values[57] = 10
+    sampled_dates, sampled_values = lttb(dates, values, 12)
+    assert len(sampled_dates) == len(sampled_values) == 12
+    assert (sampled_dates[0], sampled_dates[-1]) == (dates[0], dates[-1])
+    assert sampled_dates == sorted(set(sampled_dates))
+    assert all(values[(d - dates[0]).days] == v for d, v in zip(sampled_dates, sampled_values))
+    assert 10 in sampled_values
+
+
+@pytest.mark.parametrize('threshold', [2, 5, 6])
+def test_lttb_leaves_short_series_alone(threshold):
+    dates = [date(2025, 1, day) for day in range(1, 6)]
+    assert lttb(dates, [1, 2, 3, 4, 5], threshold) == (dates, [1, 2, 3, 4, 5])
+
+
+@pytest.mark.parametrize('bucket, dates, values', [
+    ('day', ['2025-01-05', '2025-01-06', '2025-01-07', '2025-02-01'], [1, 2, 3, 4]),
+    ('week', ['2024-12-30', '2025-01-06', '2025-01-27'], [1, 5, 4]),
+    ('month', ['2025-01-01', '2025-02-01'], [6, 4]),
+])
+def test_series_sums_per_bucket(client, add_goal, bucket, dates, values):
+    goal_id = add_goal(client)
+    submit(client, goal_id, ('2025-01-05', 1), ('2025-01-06', 2), ('2025-01-07', 3), ('2025-02-01', 4))
+    body = client.get(f'/api/goals/{goal_id}/series?bucket={bucket}').get_json()
+    assert (body['bucket'], body['dates'], body['values']) == (bucket, dates, values)
+
+
+def test_series_points_and_bad_arguments(login, client, add_goal):
+    goal_id = add_goal(client)
+    submit(client, goal_id, *[(f'2025-01-{day:02d}', day) for day in range(1, 11)])
+    body = client.get(f'/api/goals/{goal_id}/series?points=4').get_json()
+    assert len(body['values']) == 4
+    assert (body['dates'][0], body['dates'][-1]) == ('2025-01-01', '2025-01-10')
+    assert client.get(f'/api/goals/{goal_id}/series?points=2').status_code == 400
+    assert client.get(f'/api/goals/{goal_id}/series?bucket=year').status_code == 400
+    assert login(email='sara@example.com').get(f'/api/goals/{goal_id}/series').status_code == 404
+
+
+def test_series_answers_304_while_unchanged(client, add_goal):
+    goal_id = add_goal(client)
+    submit(client, goal_id, ('2025-01-01', 3))
+    url = f'/api/goals/{goal_id}/series'
+    first = client.get(url)
+    etag = first.headers['ETag']
+    assert first.headers['Cache-Control'] == 'private, no-cache'
+
+    again = client.get(url, headers={'If-None-Match': etag})
+    assert again.status_code == 304
+    assert again.get_data() == b''
+
+    submit(client, goal_id, ('2025-01-02', 4))
+    changed = client.get(url, headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+    assert changed.get_json()['values'] == [3, 4]
+
+
+def report_card(page, title):
+    start = page.index(f'<span>🎯 {title}</span>')
+    return page[start:page.find('accordion-item', start)]
+
+
+def test_report_totals_and_active_days(login, client, add_goal):
+    reading, running = add_goal(client), add_goal(client, 'دویدن', total_units=50)
+    submit(client, reading, ('2025-01-01', 3), ('2025-01-02', 4.5), ('2025-01-05', 1), ('2025-01-05', 2.5))
+    stranger = login(email='sara@example.com')
+    submit(stranger, add_goal(stranger, 'مطالعه'), ('2025-01-01', 40))
+
+    page = client.get('/report').get_data(as_text=True)
+    card = report_card(page, 'مطالعه')
+    assert '<span>٪10.0</span>' in card
+    assert 'پیشرفت کل: <strong>10.00 واحد</strong>' in card
+    assert 'روزهای فعال: <strong>3 روز</strong>' in card
+    assert 'میانگین روزانه: <strong>3.33 واحد</strong>' in card
+    card = report_card(page, 'دویدن')
+    assert 'پیشرفت کل: <strong>0.00 واحد</strong>' in card
+    assert 'روزهای فعال: <strong>0 روز</strong>' in card
+    assert 'هنوز هیچ پیشرفتی برای این هدف ثبت نشده است' in card
+
+    api = client.post('/api/v1/token', json={'email': 'ali@example.com', 'password': PASSWORD}).get_json()
+    goals = client.get('/api/v1/report', headers={'Authorization': f"Bearer {api['token']}"}).get_json()['goals']
+    assert [(g['id'], g['total_progress'], g['active_days'], g['last_entry']) for g in goals] == [
+        (reading, 10, 3, {'date': '2025-01-05', 'value': 2.5}),
+        (running, 0, 0, None),
+    ]
@@ -0,0 +1,31 @@
+from sqlalchemy import delete, update
+
+from models import db, GoalStats
+
+
+def submit(client, goal_id, *entries):
+    for day, value in entries:
+        client.post(f'/submit_progress/{goal_id}', data=dict(date=day, value=value))
+
+
+def test_rebuild_stats_verify_finds_and_rebuild_fixes_stale_rollups(app, client, add_goal):
+    first, second, third = add_goal(client), add_goal(client, 'ورزش'), add_goal(client, 'خواب')
+    for goal_id in (first, second, third):
+        submit(client, goal_id, ('2025-01-01', 2), ('2025-01-02', 3))
+    runner = app.test_cli_runner()
+
+    result = runner.invoke(args=['rebuild-stats', '--verify', '--batch-size', '2'])
+    assert (result.exit_code, result.output) == (0, 'All goal rollups match progress_entry.\n')
+
+    with app.app_context():
+        db.session.execute(update(GoalStats).where(GoalStats.goal_id == first).values(total=4))
+        db.session.execute(delete(GoalStats).where(GoalStats.goal_id == third))
+        db.session.commit()
+    result = runner.invoke(args=['rebuild-stats', '--verify', '--batch-size', '2'])
+    assert result.exit_code == 1
+    assert result.output == f'2 goal(s) out of date: {first}, {third}\n'
+
+    result = runner.invoke(args=['rebuild-stats', '--batch-size', '2'])
+    assert (result.exit_code, result.output) == (0, 'Rebuilt rollups for 3 goal(s).\n')
+    result = runner.invoke(args=['rebuild-stats', '--verify'])
+    assert (result.exit_code, result.output) == (0, 'All goal rollups match progress_entry.\n')
@@ -0,0 +1,78 @@
+import pytest
+
+
+@pytest.fixture
+def pull(client, api_headers):
+    def pull(since=None, limit=None):
+        args = {k: v for k, v in (('since', since), ('limit', limit)) if v is not None}
+        response = client.get('/api/v1/sync', query_string=args, headers=api_headers)
+        assert response.status_code == 200, response.get_json()
+        return response.get_json()
+    return pull
+
+
+@pytest.fixture
+def push(client, api_headers):
+    def push(*changes):
+        response = client.post('/api/v1/sync', json={'changes': list(changes)}, headers=api_headers)
+        assert response.status_code == 200, response.get_json()
+        return [r['status'] for r in response.get_json()['results']]
+    return push
+
+
+def pull_all(pull, since=None, limit=None):
+    changes, pages = [], 0
+    while True:
+        page = pull(since, limit)
+        changes += page['changes']
+        since, pages = page['cursor'], pages + 1
+        if not page['more']:
+            return changes, since, pages
+
+
+def key(change):
+    return change['type'], change.get('id', change.get('goal_id')), change.get('date')
+
+
+def test_small_pages_return_every_change_once(client, add_goal, pull, push):
+    first, second = add_goal(client), add_goal(client, 'ورزش')
+    # One batch claims one version for all its entries, so pages split inside it
+    client.post('/submit_progress/batch', json={'entries': [
+        {'goal_id': goal_id, 'date': f'2025-01-0{day}', 'value': day}
+        for goal_id in (first, second) for day in range(1, 5)
+    ]})
+    push({'type': 'deleted', 'goal_id': first, 'date': '2025-01-02', 'updated_at': '2030-01-01T00:00:00Z'})
+
+    everything, cursor, pages = pull_all(pull)
+    paged, paged_cursor, paged_pages = pull_all(pull, limit=3)
+    assert paged == everything and paged_cursor == cursor
+    assert pages == 1 and paged_pages == 4
+    keys = [key(c) for c in paged]
+    assert len(keys) == len(set(keys)) == 2 + 7 + 1  # the deleted entry is only a tombstone
+    assert keys[-1] == ('deleted', first, '2025-01-02')
+
+
+def test_a_cursor_only_returns_later_changes(client, add_goal, pull, push):
+    goal_id = add_goal(client)
+    _, cursor, _ = pull_all(pull)
+    assert pull(cursor) == {'changes': [], 'cursor': cursor, 'more': False}
+
+    client.post(f'/submit_progress/{goal_id}', data=dict(date='2025-01-01', value=3))
+    page = pull(cursor)
+    assert [key(c) for c in page['changes']] == [('entry', goal_id, '2025-01-01')]
+    assert page['changes'][0]['value'] == 3
+    assert 'archived' not in page
+
+
+def test_older_pushes_lose_to_the_stored_copy(client, add_goal, pull, push):
+    goal_id = add_goal(client)
+    entry = {'type': 'entry', 'goal_id': goal_id, 'date': '2025-01-01'}
+    assert push(dict(entry, value=5, updated_at='2030-01-02T00:00:00Z')) == ['created']
+    assert push(dict(entry, value=1, updated_at='2030-01-01T00:00:00Z')) == ['stale']
+    changes, _, _ = pull_all(pull)
+    assert [c['value'] for c in changes if c['type'] == 'entry'] == [5]
+
+
+def test_invalid_cursors_are_rejected(client, api_headers):
+    for args in ({'since': 'abc'}, {'limit': 0}):
+        assert client.get('/api/v1/sync', query_string=args, headers=api_headers).status_code == 400
@@ -0,0 +1,6 @@
+"""HTML views, one blueprint per area; create_app registers them.
+
+Modules that pull in NumPy (reports, analytics) are imported inside the views
+that use them, so importing the app stays cheap; wsgi.warm_up loads them in the
+gunicorn master before workers fork.
+"""
@@ -0,0 +1,121 @@
+import traceback
+
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session
+from flask_login import LoginManager, login_user, logout_user, current_user
+
+from cache import identity_cache
+from forms import LoginForm, RegistrationForm
+from models import db, User
+from passwords import password_stamp
+from ratelimit import rate_limiter
+
+auth = Blueprint('auth', __name__)
+
+login_manager = LoginManager()
+login_manager.login_view = 'auth.login'
+login_manager.login_message = 'لطفاً وارد شوید تا بتوانید به این صفحه دسترسی پیدا کنید.'
+
+# Password stamp of the login session; a password change elsewhere ends the session
+SESSION_STAMP_KEY = '_password_stamp'
+
+
+def remember_password(user):
+    session[SESSION_STAMP_KEY] = password_stamp(user.password_hash)
+
+
+def _session_valid(snapshot):
+    if snapshot['deleted_at'] is not None:
+        return False
+    # Sessions from before stamps existed take the current one
+    return session.setdefault(SESSION_STAMP_KEY, snapshot['password_stamp']) == snapshot['password_stamp']
+
+
+@login_manager.user_loader
+def load_user(user_id):
+    user_id = int(user_id)
+    snapshot = identity_cache.get(user_id)
+    if snapshot is not None:
+        if not _session_valid(snapshot):
+            return None
+        return db.session.merge(User.from_snapshot(snapshot), load=False)
+
+    user = db.session.get(User, user_id)
+    if user is None:
+        return None
+    snapshot = user.snapshot()
+    if not _session_valid(snapshot):
+        return None
+    identity_cache.set(user_id, snapshot)
+    return user
+
+
+def rate_limited(template, form, account=None):
+    """Count a password attempt; a 429 response if the client or account is over its limit."""
+    wait = rate_limiter.hit(ip=request.remote_addr, account=account)
+    if wait is None:
+        return None
+    flash(f'تعداد تلاش‌ها بیش از حد مجاز است. لطفاً {wait} ثانیه دیگر دوباره امتحان کنید.', 'error')
+    return render_template(template, form=form), 429, {'Retry-After': str(wait)}
+
+
+@auth.route('/login', methods=['GET', 'POST'])
+def login():
+    if current_user.is_authenticated:
+        return redirect(url_for('goals.index'))
+
+    form = LoginForm()
+    if form.validate_on_submit():
+        limited = rate_limited('login.html', form, account=form.email.data)
+        if limited:
+            return limited
+        user = User.query.filter_by(email=form.email.data, deleted_at=None).first()
+        if not user:
+            flash('اکانتی با این ایمیل وجود ندارد.', 'error')
+        elif user and user.check_password(form.password.data):
+            if user.rehash_password(form.password.data):
+                db.session.commit()
+            login_user(user)
+            remember_password(user)
+            flash('با موفقیت وارد شدید.', 'success')
+            next_page = request.args.get('next')
+            return redirect(next_page) if next_page else redirect(url_for('goals.index'))
+        else:
+            flash('رمز عبور اشتباه است.', 'error')
+
+    return render_template('login.html', form=form)
+
+
+@auth.route('/register', methods=['GET', 'POST'])
+def register():
+    if current_user.is_authenticated:
+        return redirect(url_for('goals.index'))
+
+    form = RegistrationForm()
+    if form.validate_on_submit():
+        limited = rate_limited('register.html', form)
+        if limited:
+            return limited
+        existing_user = User.query.filter_by(email=form.email.data).first()
+        if existing_user:
+            flash('این ایمیل قبلاً ثبت‌نام کرده است.', 'error')
+        else:
+            try:
+                user = User(email=form.email.data, name=form.name.data)
+                user.set_password(form.password.data)
+                db.session.add(user)
+                db.session.commit()
+                flash('ثبت‌نام با موفقیت انجام شد. لطفاً وارد شوید.', 'success')
+                return redirect(url_for('auth.login'))
+            except Exception as e:
+                db.session.rollback()
+                print("🔥 Registration error:", e)
+                traceback.print_exc()  # لاگ کامل خطا
+                flash('خطایی در ثبت‌نام رخ داده است.', 'error')
+
+    return render_template('register.html', form=form)
+
+
+@auth.route('/logout')
+def logout():
+    logout_user()
+    return redirect(url_for('auth.login'))
@@ -0,0 +1,189 @@
+from datetime import date
+
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
+from flask_login import login_required, current_user
+
+from forms import GoalForm
+from importer import import_progress, detect_format, text_stream, FORMATS
+from jalali import jalali_table
+from models import db, claim_version, Goal
+from progress import record_progress, record_batch, parse_entry, batch_too_large_message, ArchivedDateError, \
+    MAX_BATCH_SIZE
+from replica import replica_reads
+from sync import touch_goal, tombstone_goal
+
+goals = Blueprint('goals', __name__)
+
+
+# Dashboard
+@goals.route('/')
+@login_required
+@replica_reads
+def index():
+    from reports import build_dashboard
+    today = date.today()
+    user_goals = build_dashboard(current_user.id, today)
+    return render_template('index.html', goals=user_goals, today_date=today.strftime('%Y-%m-%d'))
+
+
+# Goal Management
+@goals.route('/add_goal', methods=['GET', 'POST'])
+@login_required
+def add_goal():
+    form = GoalForm()
+    if request.method == 'POST':
+        # دریافت مقدار تاریخ شمسی به‌صورت رشته
+        shamsi_date_str = request.form.get("target_date")
+        try:
+            year, month, day = map(int, shamsi_date_str.split('-'))
+            miladi_date = jalali_table.from_jalali(year, month, day)
+        except:
+            flash("تاریخ وارد شده نامعتبر است.", "error")
+            return redirect(url_for("goals.add_goal"))
+
+        if form.validate_on_submit():
+            goal = Goal(
+                title=form.title.data,
+                total_units=form.total_units.data,
+                daily_target=form.daily_target.data,
+                target_date=miladi_date,  # تاریخ به صورت date واقعی
+                user_id=current_user.id,
+                version=claim_version(current_user.id)
+            )
+            db.session.add(goal)
+            db.session.commit()
+            flash(f'هدف "{goal.title}" با موفقیت ایجاد شد.', 'success')
+            return redirect(url_for('goals.index'))
+
+    return render_template('add_goal.html', form=form)
+
+
+@goals.route('/edit_goal/<int:goal_id>', methods=['GET', 'POST'])
+@login_required
+def edit_goal(goal_id):
+    goal = Goal.query.filter_by(id=goal_id, user_id=current_user.id).first_or_404()
+    form = GoalForm(obj=goal)
+    if form.validate_on_submit():
+        goal.title = form.title.data
+        goal.total_units = form.total_units.data
+        goal.daily_target = form.daily_target.data
+        goal.target_date = form.target_date.data
+        touch_goal(goal)
+        db.session.commit()
+        flash(f'هدف "{goal.title}" با موفقیت به‌روزرسانی شد.', 'success')
+        return redirect(url_for('goals.index'))
+    return render_template('edit_goal.html', form=form, goal=goal)
+
+
+@goals.route('/delete_goal/<int:goal_id>', methods=['POST'])
+@login_required
+def delete_goal(goal_id):
+    goal = Goal.query.filter_by(id=goal_id, user_id=current_user.id).first_or_404()
+    goal_title = goal.title
+    tombstone_goal(goal.id, goal.user_id, claim_version(goal.user_id))
+    db.session.delete(goal)
+    db.session.commit()
+    flash(f'هدف "{goal_title}" با موفقیت حذف شد.', 'success')
+    return redirect(url_for('goals.index'))
+
+
+# Progress Submission
+@goals.route('/submit_progress/<int:goal_id>', methods=['POST'])
+@login_required
+def submit_progress(goal_id):
+    goal = Goal.query.filter_by(id=goal_id, user_id=current_user.id).first_or_404()
+
+    progress_date_str = request.form.get('date')
+    try:
+        progress_date, progress_value = parse_entry(progress_date_str, request.form.get('value'))
+    except ValueError as e:
+        flash(str(e), 'error')
+        return redirect(url_for('goals.index'))
+
+    try:
+        old_value = record_progress(goal.id, progress_date, progress_value, claim_version(current_user.id))
+        db.session.commit()
+
+        if old_value is not None:
+            flash(f'پیشرفت برای تاریخ {progress_date_str} آپدیت شد.', 'success')
+        else:
+            flash(f'پیشرفت برای تاریخ {progress_date_str} ثبت شد.', 'success')
+    except ArchivedDateError as e:
+        db.session.rollback()
+        flash(str(e), 'error')
+    except Exception as e:
+        db.session.rollback()
+        flash('خطایی در ثبت پیشرفت رخ داده است.', 'error')
+
+    return redirect(url_for('goals.index'))
+
+
+@goals.route('/submit_progress/batch', methods=['POST'])
+@login_required
+def submit_progress_batch():
+    if request.is_json:
+        payload = request.get_json(silent=True) or {}
+        entries = payload.get('entries')
+        if not isinstance(entries, list) or not all(isinstance(e, dict) for e in entries):
+            return jsonify({'error': 'فیلد entries باید فهرستی از اشیاء باشد.'}), 400
+        items = [(e.get('goal_id'), e.get('date'), e.get('value')) for e in entries]
+    else:
+        # Dashboard form: value_<goal_id> / date_<goal_id>; empty values are skipped
+        items = []
+        for key, value in request.form.items():
+            if key.startswith('value_') and value.strip():
+                goal_id = key[len('value_'):]
+                if goal_id.isdigit():
+                    items.append((int(goal_id), request.form.get(f'date_{goal_id}'), value))
+
+    if len(items) > MAX_BATCH_SIZE:
+        if request.is_json:
+            return jsonify({'error': batch_too_large_message()}), 413
+        flash(batch_too_large_message(), 'error')
+        return redirect(url_for('goals.index'))
+
+    try:
+        results = record_batch(current_user.id, items)
+    except Exception:
+        db.session.rollback()
+        if request.is_json:
+            return jsonify({'error': 'خطایی در ثبت پیشرفت رخ داده است.'}), 500
+        flash('خطایی در ثبت پیشرفت رخ داده است.', 'error')
+        return redirect(url_for('goals.index'))
+
+    if request.is_json:
+        return jsonify({'results': results}), 200
+
+    saved = [r for r in results if r['status'] != 'error']
+    if saved:
+        flash(f'پیشرفت {len(saved)} هدف ثبت شد.', 'success')
+    elif not results:
+        flash('هیچ مقداری برای ثبت وارد نشده است.', 'error')
+    for r in results:
+        if r['status'] == 'error':
+            flash(f"هدف {r['goal_id']}: {r['error']}", 'error')
+    return redirect(url_for('goals.index'))
+
+
+@goals.route('/api/goals/<int:goal_id>/progress/bulk', methods=['POST'])
+@login_required
+def bulk_progress(goal_id):
+    goal = Goal.query.filter_by(id=goal_id, user_id=current_user.id).first_or_404()
+
+    upload = request.files.get('file')
+    if upload:
+        binary = upload.stream
+        fmt = request.args.get('format') or detect_format(upload.filename, upload.mimetype)
+    else:
+        binary = request.stream
+        fmt = request.args.get('format') or detect_format(mimetype=request.mimetype)
+    if fmt not in FORMATS:
+        return jsonify({'error': 'فرمت فایل باید CSV یا JSON Lines باشد.'}), 415
+
+    calendar = request.args.get('calendar', 'auto')
+    if calendar not in ('auto', 'gregorian', 'jalali'):
+        return jsonify({'error': 'تقویم نامعتبر است.'}), 400
+
+    result = import_progress(text_stream(binary), fmt, goal_id=goal.id,
+                             user_id=current_user.id, calendar=calendar)
+    return jsonify(result._asdict()), 200
@@ -0,0 +1,62 @@
+import hmac
+from functools import wraps
+
+from flask import Blueprint, current_app, request, jsonify, Response
+
+import jobs
+from cache import report_cache, identity_cache
+from database import pool_stats
+from metrics import request_metrics
+from models import db
+from replica import BIND_KEY
+
+ops = Blueprint('ops', __name__)
+
+
+def metrics_token_required(view):
+    """Traffic, activity and internals are not public: no METRICS_TOKEN, no access."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        token = current_app.config['METRICS_TOKEN']
+        if not token:
+            return Response('Set METRICS_TOKEN to enable this endpoint\n', status=403, mimetype='text/plain')
+        if not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            return Response('Unauthorized\n', status=401, mimetype='text/plain')
+        return view(*args, **kwargs)
+    return wrapper
+
+
+@ops.route('/api/cache/stats')
+@metrics_token_required
+def cache_stats():
+    return jsonify(dict(report_cache.stats(), identity=identity_cache.stats()))
+
+
+@ops.route('/api/db/pool')
+@metrics_token_required
+def db_pool_stats():
+    stats = pool_stats(db.engine)
+    if BIND_KEY in db.engines:
+        stats['replica'] = pool_stats(db.engines[BIND_KEY])
+    return jsonify(stats)
+
+
+def runtime_gauges():
+    pool = pool_stats(db.engine)
+    for key in ('checked_out', 'peak_in_use', 'checkouts', 'timeouts', 'wait_seconds_total', 'wait_seconds_max'):
+        if key in pool:
+            kind = 'counter' if key in ('checkouts', 'timeouts', 'wait_seconds_total') else 'gauge'
+            yield (f'db_pool_{key}', kind, f'Connection pool {key.replace("_", " ")}.', {}, pool[key])
+    for name, cache in (('report', report_cache), ('identity', identity_cache)):
+        stats = cache.stats()
+        for key in ('hits', 'misses', 'evictions'):
+            if key in stats:
+                yield (f'cache_{key}_total', 'counter', f'Cache {key}.', {'cache': name}, stats[key])
+    for status, count in jobs.queue_depth().items():
+        yield ('jobs', 'gauge', 'Background jobs by status.', {'status': status}, count)
+
+
+@ops.route('/metrics')
+@metrics_token_required
+def metrics():
+    return Response(request_metrics.render(), mimetype='text/plain; version=0.0.4')
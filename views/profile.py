@@ -0,0 +1,88 @@
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
+from flask_login import login_required, logout_user, current_user
+
+import jobs
+from cache import identity_cache
+from forms import UpdateProfileForm, ChangePasswordForm
+from models import db, utcnow, User
+from views.auth import rate_limited, remember_password
+
+profile = Blueprint('profile', __name__)
+
+
+@profile.route('/profile')
+@login_required
+def index():
+    return render_template('profile.html')
+
+
+@profile.route('/profile/update', methods=['GET', 'POST'])
+@login_required
+def update_profile():
+    form = UpdateProfileForm(obj=current_user)
+    if form.validate_on_submit():
+        if form.email.data != current_user.email:
+            existing_user = User.query.filter_by(email=form.email.data).first()
+            if existing_user:
+                flash('این ایمیل قبلاً توسط کاربر دیگری استفاده شده است.', 'error')
+                return render_template('update_profile.html', form=form)
+
+        user = db.session.get(User, current_user.id)
+        user.name = form.name.data
+        user.email = form.email.data
+        db.session.commit()
+        identity_cache.invalidate(user.id)
+        flash('اطلاعات حساب شما با موفقیت به‌روزرسانی شد.', 'success')
+        return redirect(url_for('profile.index'))
+    elif request.method == 'GET':
+        form.name.data = current_user.name
+        form.email.data = current_user.email
+    return render_template('update_profile.html', form=form)
+
+
+@profile.route('/profile/change_password', methods=['GET', 'POST'])
+@login_required
+def change_password():
+    form = ChangePasswordForm()
+    if form.validate_on_submit():
+        limited = rate_limited('change_password.html', form, account=current_user.email)
+        if limited:
+            return limited
+        user = db.session.get(User, current_user.id)
+        if not user.check_password(form.old_password.data):
+            flash('رمز عبور فعلی اشتباه است.', 'error')
+        elif form.new_password.data != form.confirm_password.data:
+            flash('رمز جدید و تکرار آن مطابقت ندارند.', 'error')
+        else:
+            user.set_password(form.new_password.data)
+            db.session.commit()
+            identity_cache.invalidate(user.id)
+            # Keep this session; the user's other sessions end on their next request
+            remember_password(user)
+            flash('رمز عبور شما با موفقیت تغییر کرد.', 'success')
+            return redirect(url_for('profile.index'))
+    return render_template('change_password.html', form=form)
+
+
+@profile.route('/profile/delete')
+@login_required
+def delete_account():
+    return render_template('delete_account.html')
+
+
+@profile.route('/confirm_delete', methods=['POST'])
+@login_required
+def confirm_delete():
+    user_id = current_user.id
+    username = current_user.name or current_user.email
+    logout_user()
+    # Close the account now; its goals and entries are purged by a worker in chunks.
+    # The email is released at once, so it can sign up again before the purge runs.
+    # The placeholder is unique and short, whatever the length of the email it replaces.
+    db.session.execute(db.update(User).where(User.id == user_id).values(
+        deleted_at=utcnow(), email=f'deleted:{user_id}',
+    ))
+    job = jobs.enqueue('purge_account', {'user_id': user_id}, user_id=user_id)
+    db.session.commit()
+    identity_cache.invalidate(user_id)
+    return jsonify({'message': f'حساب کاربری {username} حذف شد.', 'job_id': job.id}), 200
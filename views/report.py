@@ -0,0 +1,121 @@
+import json
+from datetime import date, datetime
+
+from flask import Blueprint, render_template, request, url_for, jsonify, Response, stream_with_context, send_file
+from flask_login import login_required, current_user
+
+import jobs
+from cache import report_cache
+from export import export_query, iter_export_rows, WRITERS
+from models import db, Goal, Job
+from replica import replica_reads
+
+report = Blueprint('report', __name__)
+
+
+@report.route('/report')
+@login_required
+@replica_reads
+def index():
+    from analytics import build_analytics
+    from reports import build_report
+    user_goals = report_cache.get_or_set(current_user.id, 'report', lambda: build_report(current_user.id))
+    # Keyed by day: streaks and paces move at midnight even without new entries
+    today = date.today()
+    analytics = report_cache.get_or_set(current_user.id, f'analytics:{today.isoformat()}',
+                                        lambda: build_analytics(current_user.id, user_goals, today))
+    return render_template('report.html', goals=user_goals, analytics=analytics)
+
+
+@report.route('/api/goals/<int:goal_id>/series')
+@login_required
+@replica_reads
+def goal_series_api(goal_id):
+    from reports import goal_series, series_labels, lttb, BUCKETS
+    goal = Goal.query.filter_by(id=goal_id, user_id=current_user.id).first_or_404()
+
+    bucket = request.args.get('bucket', 'day')
+    points = request.args.get('points', type=int)
+    if bucket not in BUCKETS or (points is not None and points < 3):
+        return jsonify({'error': 'پارامترهای نمودار نامعتبر هستند.'}), 400
+
+    def build():
+        dates, values = goal_series(goal.id, bucket)
+        return lttb(dates, values, points) if points else (dates, values)
+
+    dates, values = report_cache.get_or_set(current_user.id, f'series:{goal.id}:{bucket}:{points}', build)
+
+    response = jsonify({
+        'goal_id': goal.id,
+        'bucket': bucket,
+        'dates': [d.isoformat() for d in dates],
+        'labels': series_labels(dates, bucket),
+        'values': values,
+    })
+    response.add_etag()
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
+
+
+# Export
+@report.route('/export/progress.<any(csv, ndjson):fmt>')
+@login_required
+@replica_reads
+def export_progress(fmt):
+    try:
+        goal_ids = [int(g) for g in request.args.getlist('goal_id')]
+        start = request.args.get('from')
+        end = request.args.get('to')
+        start = datetime.strptime(start, '%Y-%m-%d').date() if start else None
+        end = datetime.strptime(end, '%Y-%m-%d').date() if end else None
+    except ValueError:
+        return jsonify({'error': 'پارامترهای فیلتر نامعتبر هستند.'}), 400
+
+    query = export_query(current_user.id, goal_ids=goal_ids, start=start, end=end)
+    writer, mimetype = WRITERS[fmt]
+    return Response(
+        stream_with_context(writer(iter_export_rows(query))),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename=progress.{fmt}'},
+    )
+
+
+@report.route('/export/progress.<any(csv, ndjson):fmt>/job', methods=['POST'])
+@login_required
+def export_progress_job(fmt):
+    """Build the export in the background; poll /jobs/<id> and fetch /jobs/<id>/download."""
+    try:
+        goal_ids = [int(g) for g in request.args.getlist('goal_id')]
+        start = request.args.get('from')
+        end = request.args.get('to')
+        start = datetime.strptime(start, '%Y-%m-%d').date().isoformat() if start else None
+        end = datetime.strptime(end, '%Y-%m-%d').date().isoformat() if end else None
+    except ValueError:
+        return jsonify({'error': 'پارامترهای فیلتر نامعتبر هستند.'}), 400
+
+    job = jobs.enqueue('export_progress', {'format': fmt, 'goal_ids': goal_ids, 'from': start, 'to': end},
+                       user_id=current_user.id)
+    db.session.commit()
+    return jsonify(jobs.job_json(job)), 202, {'Location': url_for('report.job_status', job_id=job.id)}
+
+
+# Background jobs
+def _own_job(job_id):
+    return Job.query.filter_by(id=job_id, user_id=current_user.id).first_or_404()
+
+
+@report.route('/jobs/<int:job_id>')
+@login_required
+def job_status(job_id):
+    return jsonify(jobs.job_json(_own_job(job_id)))
+
+
+@report.route('/jobs/<int:job_id>/download')
+@login_required
+def job_download(job_id):
+    job = _own_job(job_id)
+    if job.kind != 'export_progress' or job.status != 'done':
+        return jsonify({'error': 'خروجی هنوز آماده نیست.'}), 409
+    fmt = json.loads(job.payload)['format']
+    return send_file(jobs.export_path(job.id, fmt), mimetype=WRITERS[fmt][1],
+                     as_attachment=True, download_name=f'progress.{fmt}')
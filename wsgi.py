@@ -0,0 +1,31 @@
+"""WSGI entry point: `gunicorn --preload wsgi:app`.
+
+With --preload the gunicorn master builds the app and runs warm_up() once,
+before forking, so every worker starts with the heavy modules, the Jalali
+table and the compiled templates already in memory pages it shares with the
+master (copy-on-write) instead of building its own copy on its first requests.
+"""
+import gc
+
+from app import create_app
+from jalali import jalali_table
+from models import db
+
+
+def warm_up(app):
+    """Load what requests would otherwise load lazily, then freeze it for forking."""
+    import analytics, reports  # noqa: F401  (NumPy)
+    jalali_table.load()
+    for name in app.jinja_env.list_templates():
+        app.jinja_env.get_template(name)
+    with app.app_context():
+        # No connection may cross the fork; workers open their own
+        for engine in db.engines.values():
+            engine.dispose()
+    # Keep the collector from touching (and so copying) the master's objects in workers
+    gc.collect()
+    gc.freeze()
+
+
+app = create_app()
+warm_up(app)